@@ -0,0 +1,77 @@
+"""add articles.excerpt / word_count / reading_minutes
+
+Revision ID: 20261016_article_excerpt
+Revises: 20261016_score_histogram
+Create Date: 2026-10-16
+"""
+import html
+import math
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261016_article_excerpt'
+down_revision = '20261016_score_histogram'
+branch_labels = None
+depends_on = None
+
+# 与 app/utils/article_text.summarize（及 sanitize.html_to_text）一致，冻结在迁移里
+EXCERPT_LENGTH = 160
+WORDS_PER_MINUTE = 400
+
+_SCRIPT_RE = re.compile(r"<\s*script[^>]*>.*?<\s*/\s*script\s*>", re.I | re.S)
+_STYLE_RE = re.compile(r"<\s*style[^>]*>.*?<\s*/\s*style\s*>", re.I | re.S)
+_BLOCK_TAG_RE = re.compile(
+    r"<\s*/?\s*(?:p|br|div|li|ul|ol|h[1-6]|hr|blockquote|pre|img|tr|td|th|table)\b[^>]*>",
+    re.I,
+)
+_TAG_RE = re.compile(r"<[^>]*>")
+_SPACE_RE = re.compile(r"\s+")
+_CJK_CHAR_RE = re.compile(r"[㐀-䶿一-鿿豈-﫿]")
+_WORD_RE = re.compile(r"[^\W_㐀-䶿一-鿿豈-﫿]+")
+
+
+def _summarize(content):
+    if not content:
+        text = ""
+    else:
+        text = _SCRIPT_RE.sub(" ", content)
+        text = _STYLE_RE.sub(" ", text)
+        text = _BLOCK_TAG_RE.sub(" ", text)
+        text = _TAG_RE.sub("", text)
+        text = _SPACE_RE.sub(" ", html.unescape(text)).strip()
+    if len(text) > EXCERPT_LENGTH:
+        excerpt = text[:EXCERPT_LENGTH].rstrip() + "..."
+    else:
+        excerpt = text
+    words = len(_CJK_CHAR_RE.findall(text)) + len(_WORD_RE.findall(text))
+    minutes = math.ceil(words / WORDS_PER_MINUTE) if words else 0
+    return excerpt, words, max(minutes, 1 if words else 0)
+
+
+def upgrade() -> None:
+    op.add_column('articles', sa.Column('excerpt', sa.String(length=200), nullable=True))
+    op.add_column('articles', sa.Column('word_count', sa.Integer(), nullable=True))
+    op.add_column('articles', sa.Column('reading_minutes', sa.Integer(), nullable=True))
+
+    # 回填：摘要要先去掉 HTML，在 Python 里算
+    bind = op.get_bind()
+    rows = bind.execute(sa.text("SELECT id, content FROM articles")).all()
+    update = sa.text(
+        "UPDATE articles SET excerpt = :excerpt, word_count = :words, "
+        "reading_minutes = :minutes WHERE id = :id"
+    )
+    for article_id, content in rows:
+        excerpt, words, minutes = _summarize(content)
+        bind.execute(
+            update,
+            {"excerpt": excerpt, "words": words, "minutes": minutes, "id": article_id},
+        )
+
+
+def downgrade() -> None:
+    op.drop_column('articles', 'reading_minutes')
+    op.drop_column('articles', 'word_count')
+    op.drop_column('articles', 'excerpt')
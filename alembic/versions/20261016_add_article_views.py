@@ -0,0 +1,33 @@
+"""add article_views
+
+Revision ID: 20261016_article_views
+Revises: 20261016_tags
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261016_article_views'
+down_revision = '20261016_tags'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'article_views',
+        sa.Column('article_id', sa.Integer(), nullable=False),
+        sa.Column('view_count', sa.BigInteger(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['article_id'], ['articles.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('article_id'),
+    )
+    op.create_index(
+        op.f('ix_article_views_view_count'), 'article_views', ['view_count'], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_article_views_view_count'), table_name='article_views')
+    op.drop_table('article_views')
@@ -0,0 +1,52 @@
+"""add cards.updated_at / change_seq and card_tombstones
+
+Revision ID: 20261016_card_changes
+Revises: 20261016_site_counters
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261016_card_changes'
+down_revision = '20261016_site_counters'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('cards', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.add_column(
+        'cards',
+        sa.Column('change_seq', sa.BigInteger(), nullable=False, server_default='1'),
+    )
+    op.alter_column('cards', 'change_seq', server_default=None)
+    op.create_index('ix_cards_change_seq', 'cards', ['change_seq'])
+    op.execute("UPDATE cards SET updated_at = CURRENT_TIMESTAMP")
+
+    op.create_table(
+        'card_tombstones',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('card_id', sa.Integer(), nullable=True),
+        sa.Column('deleted_seq', sa.BigInteger(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_card_tombstones_deleted_seq', 'card_tombstones', ['deleted_seq'])
+
+    # 现有卡牌都记为序号 1
+    op.execute(
+        """
+        INSERT INTO site_counters (name, value, updated_at)
+        VALUES ('card_changes', 1, CURRENT_TIMESTAMP)
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM site_counters WHERE name = 'card_changes'")
+    op.drop_index('ix_card_tombstones_deleted_seq', table_name='card_tombstones')
+    op.drop_table('card_tombstones')
+    op.drop_index('ix_cards_change_seq', table_name='cards')
+    op.drop_column('cards', 'change_seq')
+    op.drop_column('cards', 'updated_at')
@@ -0,0 +1,63 @@
+"""add card_review_stats
+
+Revision ID: 20261016_card_review_stats
+Revises: 20251213_add_status_pin
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261016_card_review_stats'
+down_revision = '20251213_add_status_pin'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'card_review_stats',
+        sa.Column('card_id', sa.Integer(), nullable=False),
+        sa.Column('review_count', sa.Integer(), nullable=False),
+        sa.Column('avg_score', sa.Float(), nullable=True),
+        sa.Column('top_review_id', sa.Integer(), nullable=True),
+        sa.Column('top_review_content', sa.Text(), nullable=True),
+        sa.Column('top_reviewer_nickname', sa.String(length=50), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['card_id'], ['cards.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('card_id'),
+    )
+
+    # 回填：与 app/utils/card_stats.py 的规则一致
+    # （影响力高的点评优先，影响力为空排后，同影响力取最新）
+    op.execute(
+        """
+        INSERT INTO card_review_stats
+            (card_id, review_count, avg_score, top_review_id,
+             top_review_content, top_reviewer_nickname, updated_at)
+        SELECT agg.card_id, agg.cnt, agg.avg_score, top.id,
+               top.content, top.nick, CURRENT_TIMESTAMP
+        FROM (
+            SELECT card_id, COUNT(*) AS cnt, AVG(score) AS avg_score
+            FROM card_reviews
+            GROUP BY card_id
+        ) agg
+        LEFT JOIN (
+            SELECT r.card_id, r.id, r.content,
+                   COALESCE(NULLIF(u.nickname, ''), u.username) AS nick,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY r.card_id
+                       ORDER BY CASE WHEN p.influence IS NULL THEN 1 ELSE 0 END,
+                                p.influence DESC,
+                                r.created_at DESC
+                   ) AS rn
+            FROM card_reviews r
+            JOIN users u ON u.id = r.reviewer_id
+            LEFT JOIN user_profiles p ON p.user_id = u.id
+        ) top ON top.card_id = agg.card_id AND top.rn = 1
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('card_review_stats')
@@ -0,0 +1,95 @@
+"""add game_versions registry and card_reviews.game_version_key
+
+Revision ID: 20261016_game_versions
+Revises: 20261016_card_changes
+Create Date: 2026-10-16
+"""
+import re
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261016_game_versions'
+down_revision = '20261016_card_changes'
+branch_labels = None
+depends_on = None
+
+
+def _sort_key(name):
+    # 与 app/utils/game_versions.py 的 version_sort_key 保持一致
+    parts = [int(p) for p in re.findall(r'\d+', name or '')[:4]]
+    if not parts:
+        return None
+    parts += [0] * (4 - len(parts))
+    key = parts[0]
+    for p in parts[1:]:
+        key = key * 1000 + min(p, 999)
+    return key
+
+
+def upgrade() -> None:
+    op.add_column(
+        'card_reviews',
+        sa.Column('game_version_key', sa.BigInteger(), nullable=True),
+    )
+    op.create_index(
+        'ix_card_reviews_card_version_key',
+        'card_reviews',
+        ['card_id', 'game_version_key'],
+    )
+
+    game_versions = op.create_table(
+        'game_versions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('sort_key', sa.BigInteger(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name'),
+    )
+    op.create_index('ix_game_versions_id', 'game_versions', ['id'])
+    op.create_index('ix_game_versions_sort_key', 'game_versions', ['sort_key'])
+
+    # 回填：不同的版本号只有几十个，逐个解析后按值更新
+    bind = op.get_bind()
+    review_versions = [
+        r[0]
+        for r in bind.execute(
+            sa.text(
+                "SELECT DISTINCT game_version FROM card_reviews "
+                "WHERE game_version IS NOT NULL"
+            )
+        )
+    ]
+    for name in review_versions:
+        bind.execute(
+            sa.text(
+                "UPDATE card_reviews SET game_version_key = :key "
+                "WHERE game_version = :name"
+            ),
+            {"key": _sort_key(name), "name": name},
+        )
+
+    card_versions = [
+        r[0]
+        for r in bind.execute(
+            sa.text("SELECT DISTINCT version FROM cards WHERE version IS NOT NULL")
+        )
+    ]
+    names = sorted({n for n in review_versions + card_versions if n})
+    if names:
+        now = datetime.utcnow()
+        op.bulk_insert(
+            game_versions,
+            [{"name": n, "sort_key": _sort_key(n), "created_at": now} for n in names],
+        )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_game_versions_sort_key', table_name='game_versions')
+    op.drop_index('ix_game_versions_id', table_name='game_versions')
+    op.drop_table('game_versions')
+    op.drop_index('ix_card_reviews_card_version_key', table_name='card_reviews')
+    op.drop_column('card_reviews', 'game_version_key')
@@ -0,0 +1,41 @@
+"""add unique (card_id, reviewer_id) on card_reviews
+
+Revision ID: 20261016_review_unique
+Revises: 20261016_weighted_score
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261016_review_unique'
+down_revision = '20261016_weighted_score'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 并发提交可能已经留下同一人对同一张卡的多条点评：只保留最新的一条
+    op.execute(
+        """
+        DELETE FROM card_reviews
+        WHERE id NOT IN (
+            SELECT keep_id FROM (
+                SELECT MAX(id) AS keep_id
+                FROM card_reviews
+                GROUP BY card_id, reviewer_id
+            ) k
+        )
+        """
+    )
+    # 去重后聚合可能过期：升级完执行一次 python -m app.utils.card_stats 全量重建
+
+    op.create_unique_constraint(
+        'uq_card_reviews_card_reviewer',
+        'card_reviews',
+        ['card_id', 'reviewer_id'],
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_card_reviews_card_reviewer', 'card_reviews', type_='unique')
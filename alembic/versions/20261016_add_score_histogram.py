@@ -0,0 +1,49 @@
+"""add card_review_stats.score_histogram
+
+Revision ID: 20261016_score_histogram
+Revises: 20261016_review_unique
+Create Date: 2026-10-16
+"""
+import json
+import math
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261016_score_histogram'
+down_revision = '20261016_review_unique'
+branch_labels = None
+depends_on = None
+
+# 与 app/utils/card_stats.HISTOGRAM_STEP / HISTOGRAM_BUCKETS 一致
+HISTOGRAM_STEP = 0.5
+HISTOGRAM_BUCKETS = 11
+
+
+def upgrade() -> None:
+    op.add_column(
+        'card_review_stats',
+        sa.Column('score_histogram', sa.JSON(), nullable=True),
+    )
+
+    # 回填：JSON 列各库写法不同，在 Python 里分档后逐卡写回
+    bind = op.get_bind()
+    histograms: dict[int, list[int]] = {}
+    for card_id, score in bind.execute(
+        sa.text("SELECT card_id, score FROM card_reviews")
+    ):
+        bucket = min(
+            max(int(math.floor(score / HISTOGRAM_STEP)), 0), HISTOGRAM_BUCKETS - 1
+        )
+        histograms.setdefault(card_id, [0] * HISTOGRAM_BUCKETS)[bucket] += 1
+
+    update = sa.text(
+        "UPDATE card_review_stats SET score_histogram = :h WHERE card_id = :cid"
+    )
+    for card_id, histogram in histograms.items():
+        bind.execute(update, {"h": json.dumps(histogram), "cid": card_id})
+
+
+def downgrade() -> None:
+    op.drop_column('card_review_stats', 'score_histogram')
@@ -0,0 +1,34 @@
+"""add site_counters
+
+Revision ID: 20261016_site_counters
+Revises: 20261016_card_review_stats
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261016_site_counters'
+down_revision = '20261016_card_review_stats'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'site_counters',
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('value', sa.BigInteger(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('name'),
+    )
+    op.execute(
+        """
+        INSERT INTO site_counters (name, value, updated_at)
+        VALUES ('cards', 1, CURRENT_TIMESTAMP), ('reviews', 1, CURRENT_TIMESTAMP)
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('site_counters')
@@ -0,0 +1,52 @@
+"""add tags table and article_tags.tag_name index
+
+Revision ID: 20261016_tags
+Revises: 20261016_article_excerpt
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261016_tags'
+down_revision = '20261016_article_excerpt'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        op.f('ix_article_tags_tag_name'), 'article_tags', ['tag_name'], unique=False
+    )
+
+    op.create_table(
+        'tags',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('article_count', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name'),
+    )
+    op.create_index(op.f('ix_tags_id'), 'tags', ['id'], unique=False)
+    op.create_index(op.f('ix_tags_article_count'), 'tags', ['article_count'], unique=False)
+
+    # 回填：已用过的标签各一行，计数只算已发布的攻略
+    op.execute(
+        """
+        INSERT INTO tags (name, article_count, updated_at)
+        SELECT t.tag_name,
+               COUNT(DISTINCT CASE WHEN a.status = 'PUBLISHED' THEN a.id END),
+               CURRENT_TIMESTAMP
+        FROM article_tags t
+        JOIN articles a ON a.id = t.article_id
+        GROUP BY t.tag_name
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_tags_article_count'), table_name='tags')
+    op.drop_index(op.f('ix_tags_id'), table_name='tags')
+    op.drop_table('tags')
+    op.drop_index(op.f('ix_article_tags_tag_name'), table_name='article_tags')
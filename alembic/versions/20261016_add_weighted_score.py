@@ -0,0 +1,43 @@
+"""add card_review_stats.weighted_score
+
+Revision ID: 20261016_weighted_score
+Revises: 20261016_game_versions
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261016_weighted_score'
+down_revision = '20261016_game_versions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'card_review_stats',
+        sa.Column('weighted_score', sa.Float(), nullable=True),
+    )
+
+    # 回填：权重 = 1 + ln(1 + 影响力)，与 app/utils/card_stats.review_weight 一致
+    op.execute(
+        """
+        UPDATE card_review_stats
+        SET weighted_score = (
+            SELECT SUM(w.weight * w.score) / SUM(w.weight)
+            FROM (
+                SELECT r.score,
+                       1.0 + LOG(1.0 + CASE WHEN p.influence > 0
+                                            THEN p.influence ELSE 0 END) AS weight
+                FROM card_reviews r
+                LEFT JOIN user_profiles p ON p.user_id = r.reviewer_id
+                WHERE r.card_id = card_review_stats.card_id
+            ) w
+        )
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('card_review_stats', 'weighted_score')
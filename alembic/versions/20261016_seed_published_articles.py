@@ -0,0 +1,30 @@
+"""seed site_counters.published_articles
+
+Revision ID: 20261016_published_articles
+Revises: 20261016_article_views
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261016_published_articles'
+down_revision = '20261016_article_views'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 已发布攻略数由写入方按增量维护，这里先按现有数据补上初始值
+    op.execute("DELETE FROM site_counters WHERE name = 'published_articles'")
+    op.execute(
+        """
+        INSERT INTO site_counters (name, value, updated_at)
+        SELECT 'published_articles', COUNT(*), CURRENT_TIMESTAMP
+        FROM articles WHERE status = 'PUBLISHED'
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM site_counters WHERE name = 'published_articles'")
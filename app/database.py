@@ -11,3 +11,13 @@ engine = create_engine(
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# 数据版本号 / 卡牌变更序号 / 攻略计数 / 版本登记都靠 Session 事件维护：
+# 在这里统一注册，命令行脚本（python -m app.utils.card_stats 等）只要拿
+# SessionLocal，写入就会和 Web 进程一样递增计数器。
+from app.utils import (  # noqa: E402,F401
+    article_counts,
+    card_changes,
+    game_versions,
+    site_counters,
+)
@@ -1,8 +1,11 @@
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
-from app.database import engine
+from app.database import engine, SessionLocal
 from app.models import Base
+from app.utils.card_catalog import get_catalog
+from app.utils.article_views import start_view_flusher, stop_view_flusher
+from app.utils.guide_search import get_guide_index
 from app.routers import (
     auth as auth_router,
     articles as articles_router,
@@ -41,3 +44,35 @@ app.include_router(card_reviews_router.router)
 app.include_router(uploads_router.router)
 # 页面路由
 app.include_router(pages_router.router)
+
+
+@app.on_event("startup")
+def warm_up_card_catalog():
+    """启动时预先加载卡牌目录 + 名字搜索索引，避免第一个请求承担构建开销。"""
+    db = SessionLocal()
+    try:
+        get_catalog(db)
+    finally:
+        db.close()
+
+
+@app.on_event("startup")
+def warm_up_guide_index():
+    """启动时预先构建攻略搜索索引。"""
+    db = SessionLocal()
+    try:
+        get_guide_index(db)
+    finally:
+        db.close()
+
+
+@app.on_event("startup")
+def start_article_view_flusher():
+    """攻略浏览数先记在内存里，由后台线程每隔几秒批量写入。"""
+    start_view_flusher(SessionLocal)
+
+
+@app.on_event("shutdown")
+def flush_article_views():
+    """关闭前把还没写入的浏览数写完。"""
+    stop_view_flusher(SessionLocal)
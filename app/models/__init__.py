@@ -2,12 +2,14 @@ from datetime import datetime
 from enum import Enum
 
 from sqlalchemy import (
+    BigInteger,
     Column,
     Integer,
     String,
     DateTime,
     Text,
     ForeignKey,
+    Index,
     Enum as SAEnum,
     Float,
     Boolean,
@@ -91,6 +93,10 @@ class Article(Base):
     status = Column(SAEnum(ArticleStatus), default=ArticleStatus.DRAFT)
     category = Column(String(50), nullable=True)
     is_featured = Column(Boolean, default=False)
+    # 列表展示用：纯文本摘要 / 字数 / 阅读分钟数，写入时计算（见 app/utils/article_text.py）
+    excerpt = Column(String(200), nullable=True)
+    word_count = Column(Integer, nullable=True)
+    reading_minutes = Column(Integer, nullable=True)
 
     author = relationship("User", back_populates="articles")
     tags = relationship("ArticleTag", back_populates="article")
@@ -104,11 +110,43 @@ class ArticleTag(Base):
     article_id = Column(
         Integer, ForeignKey("articles.id", ondelete="CASCADE"), nullable=False
     )
-    tag_name = Column(String(50), nullable=False)
+    tag_name = Column(String(50), nullable=False, index=True)
 
     article = relationship("Article", back_populates="tags")
 
 
+class ArticleView(Base):
+    """攻略浏览数。浏览先记在进程内缓冲里，每隔几秒按篇合并后批量写入
+    （见 app/utils/article_views.py），不在每次浏览时 UPDATE articles。
+    """
+
+    __tablename__ = "article_views"
+
+    article_id = Column(
+        Integer, ForeignKey("articles.id", ondelete="CASCADE"), primary_key=True
+    )
+    view_count = Column(BigInteger, nullable=False, default=0, index=True)
+    updated_at = Column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+
+
+class Tag(Base):
+    """标签表：每个标签一行，article_count 是使用它的已发布攻略数。
+
+    写攻略时由 app/utils/article_tags.refresh_tag_counts 维护，标签云直接读这里。
+    """
+
+    __tablename__ = "tags"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(50), nullable=False, unique=True)
+    article_count = Column(Integer, nullable=False, default=0, index=True)
+    updated_at = Column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+
+
 class Comment(Base):
     __tablename__ = "comments"
 
@@ -130,6 +168,11 @@ class Comment(Base):
 
 class CardReview(Base):
     __tablename__ = "card_reviews"
+    __table_args__ = (
+        Index("ix_card_reviews_card_version_key", "card_id", "game_version_key"),
+        # 同一人对同一张卡只有一条点评（写入见 app/utils/review_writes.py）
+        UniqueConstraint("card_id", "reviewer_id", name="uq_card_reviews_card_reviewer"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     card_id = Column(Integer, ForeignKey("cards.id", ondelete="CASCADE"), index=True, nullable=False)
@@ -138,6 +181,8 @@ class CardReview(Base):
     score = Column(Float, nullable=False)           # 1-10 或 0-100 都可以
     content = Column(Text, nullable=False)
     game_version = Column(String(32), nullable=True)  # 例如 "29.2"
+    # 可排序的版本键（见 app/utils/game_versions.py），写入时自动维护
+    game_version_key = Column(BigInteger, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     card = relationship("Card", back_populates="reviews")
@@ -161,18 +206,76 @@ class Card(Base):
     arena_win_rates = Column(JSON, default=list)
     short_review = Column(String(255), nullable=True)
     reviewer_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    # 增量同步用：最后一次变化的时间和变更序号（见 app/utils/card_changes.py）
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=True)
+    change_seq = Column(BigInteger, nullable=False, default=0, index=True)
     reviewer = relationship("User")  # 如果你已经有就不要重复写
     reviews = relationship(
         "CardReview",
         back_populates="card",
         cascade="all, delete-orphan",
     )
+    review_stats = relationship(
+        "CardReviewStats",
+        back_populates="card",
+        uselist=False,
+        cascade="all, delete-orphan",
+    )
 
     @property
     def reviewer_nickname(self):
         return self.reviewer.nickname if self.reviewer else None
 
 
+class CardReviewStats(Base):
+    """每张卡的点评聚合（物化表），由 upsert_review 在同一事务里维护。
+
+    列表页 / 详情页直接读这里，不再每次请求对 card_reviews 做 GROUP BY。
+    """
+
+    __tablename__ = "card_review_stats"
+
+    card_id = Column(
+        Integer, ForeignKey("cards.id", ondelete="CASCADE"), primary_key=True
+    )
+    review_count = Column(Integer, nullable=False, default=0)
+    avg_score = Column(Float, nullable=True)
+    # 按点评人影响力加权的均分（权重见 app/utils/card_stats.review_weight）
+    weighted_score = Column(Float, nullable=True)
+    # 评分分布：0~5 分每 0.5 一档，共 11 个计数（见 app/utils/card_stats.histogram_bucket）
+    score_histogram = Column(JSON, nullable=True)
+    # 影响力最高的点评（列表页展示的短评 + 点评人）
+    top_review_id = Column(Integer, nullable=True)
+    top_review_content = Column(Text, nullable=True)
+    top_reviewer_nickname = Column(String(50), nullable=True)
+    updated_at = Column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+
+    card = relationship("Card", back_populates="review_stats")
+
+
+class GameVersion(Base):
+    """出现过的游戏版本号登记表；sort_key 是按数字逐段比较的排序键。"""
+
+    __tablename__ = "game_versions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(50), nullable=False, unique=True)
+    sort_key = Column(BigInteger, nullable=True, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class CardTombstone(Base):
+    """被删除卡牌的墓碑：增量同步时告诉客户端哪些卡要从本地删掉。"""
+
+    __tablename__ = "card_tombstones"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)  # 原 cards.id
+    card_id = Column(Integer, nullable=True)
+    deleted_seq = Column(BigInteger, nullable=False, index=True)
+    deleted_at = Column(DateTime, default=datetime.utcnow)
+
 
 class AchievementStatus(str, Enum):
     ACTIVE = "active"          # 展示在前台
@@ -210,6 +313,28 @@ class HomepageConfig(Base):
     featured_members = Column(JSON, nullable=True)
 
 
+class SiteCounter(Base):
+    """全站计数器（name -> value），主要用作数据版本号。
+
+    - cards：任何 Card 写入都会 +1
+    - reviews：CardReview / CardReviewStats 写入都会 +1
+    - reviewers：User 写入时 +1（只有点评列表的 ETag 读它）
+    - card_changes：卡牌或其点评聚合变化时 +1，同时写进 cards.change_seq
+    - articles：Article / ArticleTag 写入都会 +1
+    - article_listing：攻略的状态 / 精选 / 分类 / 标签变化时 +1
+    - published_articles：已发布攻略数（按增量维护，见 app/utils/article_counts.py）
+    版本号在写入的同一事务里递增，用于 ETag 和多进程间的内存索引失效。
+    """
+
+    __tablename__ = "site_counters"
+
+    name = Column(String(50), primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+
+
 class EmailVerificationCode(Base):
     __tablename__ = "email_verification_codes"
     __table_args__ = (
@@ -2,7 +2,7 @@ from typing import List, Optional
 from pathlib import Path
 from uuid import uuid4
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
 from sqlalchemy import or_
 from sqlalchemy.orm import Session
 
@@ -24,6 +24,19 @@ from app.schemas import (
     AchievementAdminCreate,
     AchievementAdminUpdate,
 )
+from app.utils.article_tags import article_tag_names, refresh_tag_counts
+from app.utils.card_import import (
+    DEFAULT_BATCH_SIZE,
+    FORMATS,
+    MAX_BATCH_SIZE,
+    CardImportError,
+    detect_format,
+    import_card_file,
+)
+from app.utils.card_stats import (
+    rebuild_card_review_stats,
+    refresh_stats_for_reviewer,
+)
 
 # Static upload targets for homepage assets
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -214,31 +227,82 @@ def admin_update_member_profile(
         db.add(profile)
 
     # 只有管理员通过这个接口才能改影响力和当前赛季排名
+    influence_changed = (
+        payload.influence is not None and payload.influence != profile.influence
+    )
     if payload.influence is not None:
         profile.influence = payload.influence
     if payload.current_season_rank is not None:
         profile.current_season_rank = payload.current_season_rank
 
+    # 影响力决定卡牌列表展示哪条点评，只重算该成员点评过的卡
+    if influence_changed:
+        refresh_stats_for_reviewer(db, user_id)
+
     db.commit()
     db.refresh(profile)
     return profile
 
 
+@router.post("/cards/review_stats/rebuild")
+def admin_rebuild_card_review_stats(
+    _: User = Depends(require_admin), db: Session = Depends(get_db)
+):
+    """全量重建卡牌点评聚合表（数据被手工改动后使用）。"""
+
+    n = rebuild_card_review_stats(db)
+    return {"message": "重建完成", "cards": n}
+
+
+@router.post("/cards/import")
+def admin_import_cards(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(
+        None, description="csv / json / jsonl，不传则按文件扩展名判断"
+    ),
+    batch_size: int = Query(DEFAULT_BATCH_SIZE, ge=1, le=MAX_BATCH_SIZE),
+    _: User = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    """批量导入卡牌：按 card_id upsert，返回新增 / 更新 / 未变化 / 失败数。"""
+
+    fmt = format or detect_format(file.filename)
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail="仅支持 csv / json / jsonl 文件")
+    try:
+        report = import_card_file(db, file.file, fmt, batch_size)
+    except CardImportError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return {"message": "导入完成", **report.as_dict()}
+
+
 @router.get("/articles")
 def admin_list_articles(
     _: User = Depends(require_admin), db: Session = Depends(get_db)
 ):
-    articles = db.query(Article).all()
+    # 作者昵称一条 JOIN 取回，不再逐篇懒加载 a.author
+    rows = (
+        db.query(
+            Article.id,
+            Article.title,
+            Article.status,
+            Article.created_at,
+            Article.is_featured,
+            User.nickname,
+        )
+        .join(User, User.id == Article.author_id)
+        .all()
+    )
     return [
         {
-            "id": a.id,
-            "title": a.title,
-            "author": a.author.nickname,
-            "status": a.status.value,
-            "created_at": a.created_at,
-            "is_featured": bool(a.is_featured),
+            "id": r.id,
+            "title": r.title,
+            "author": r.nickname,
+            "status": r.status.value,
+            "created_at": r.created_at,
+            "is_featured": bool(r.is_featured),
         }
-        for a in articles
+        for r in rows
     ]
 
 
@@ -257,6 +321,8 @@ def admin_update_article(
         article.status = ArticleStatus(status_val)
     if "is_featured" in payload:
         article.is_featured = bool(payload.get("is_featured"))
+    if status_val:
+        refresh_tag_counts(db, article_tag_names(db, article.id))
     db.commit()
     return {"message": "更新成功"}
 
@@ -271,6 +337,7 @@ def admin_delete_article(
     if not article:
         raise HTTPException(404, "文章不存在")
     article.status = ArticleStatus.DELETED
+    refresh_tag_counts(db, article_tag_names(db, article.id))
     db.commit()
     return {"message": "删除成功"}
 
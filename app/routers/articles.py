@@ -1,22 +1,101 @@
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import or_, func
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from app.dependencies.auth import get_db, require_elite_member, require_admin, get_current_user
-from app.models import Article, ArticleTag, ArticleStatus, User
+from app.models import Article, ArticleTag, ArticleStatus, ArticleView, User
 from app.schemas import (
     ArticleCreate,
     ArticleUpdate,
     ArticleOut,
     ArticleListItem,
     ArticleListResponse,
+    TagCountOut,
 )
+from app.utils.article_counts import cached_total, filter_key
+from app.utils.article_tags import (
+    TAG_MODES,
+    article_tag_names,
+    get_tag_index,
+    parse_tag_filter,
+    popular_tags,
+    refresh_tag_counts,
+    resolve_tag_names,
+)
+from app.utils.article_text import fill_article_summary
+from app.utils.article_views import record_view, view_count
+from app.utils.guide_search import get_guide_index, refresh_guide_index
 from app.utils.sanitize import sanitize_html
 
 router = APIRouter(prefix="/api/articles", tags=["articles"])
 
+# 列表排序：latest 按发布时间，popular 按已写入的浏览数（见 app/utils/article_views.py）
+SORT_MODES = ("latest", "popular")
+
+# 还没有浏览记录的攻略按 0 算
+_VIEWS = func.coalesce(ArticleView.view_count, 0)
+
+
+def _list_query(db: Session):
+    """列表行的扁平投影：文章列表字段 + 作者昵称 + 浏览数一条 JOIN 取回，content 不读。"""
+
+    return (
+        db.query(
+            Article.id,
+            Article.title,
+            Article.excerpt,
+            Article.word_count,
+            Article.reading_minutes,
+            Article.created_at,
+            User.nickname.label("author_nickname"),
+            _VIEWS.label("view_count"),
+        )
+        .join(User, User.id == Article.author_id)
+        .outerjoin(ArticleView, ArticleView.article_id == Article.id)
+    )
+
+
+def _tags_by_article(db: Session, ids: List[int]) -> dict[int, List[str]]:
+    """一条 IN 查询取回这些文章的全部标签。"""
+
+    tags: dict[int, List[str]] = {}
+    if not ids:
+        return tags
+    for article_id, tag_name in (
+        db.query(ArticleTag.article_id, ArticleTag.tag_name)
+        .filter(ArticleTag.article_id.in_(ids))
+        .order_by(ArticleTag.article_id, ArticleTag.id)
+        .all()
+    ):
+        tags.setdefault(article_id, []).append(tag_name)
+    return tags
+
+
+def _list_items(
+    db: Session, rows: list, highlights: Optional[dict[int, str]] = None
+) -> List[ArticleListItem]:
+    """扁平行 + 批量标签 -> ArticleListItem；查询数与行数无关。"""
+
+    tags = _tags_by_article(db, [r.id for r in rows])
+    highlights = highlights or {}
+    return [
+        ArticleListItem(
+            id=r.id,
+            title=r.title,
+            excerpt=r.excerpt or "",
+            author_nickname=r.author_nickname,
+            created_at=r.created_at,
+            tags=tags.get(r.id, []),
+            word_count=r.word_count,
+            reading_minutes=r.reading_minutes,
+            view_count=r.view_count,
+            highlight=highlights.get(r.id),
+        )
+        for r in rows
+    ]
+
 
 @router.get("", response_model=List[ArticleListItem])
 def list_articles(
@@ -25,29 +104,87 @@ def list_articles(
     featured: Optional[int] = 0,
     db: Session = Depends(get_db),
 ):
-    query = db.query(Article).filter(Article.status == ArticleStatus.PUBLISHED)
+    query = _list_query(db).filter(Article.status == ArticleStatus.PUBLISHED)
 
     if featured:
         query = query.filter(Article.is_featured == True)
 
-    query = query.order_by(Article.created_at.desc())
-    items = query.offset((page - 1) * page_size).limit(page_size).all()
-
-    result: List[ArticleListItem] = []
-    for a in items:
-        tags = [t.tag_name for t in a.tags]
-        excerpt = (a.content[:120] + "...") if len(a.content) > 120 else a.content
-        result.append(
-            ArticleListItem(
-                id=a.id,
-                title=a.title,
-                excerpt=excerpt,
-                author_nickname=a.author.nickname,
-                created_at=a.created_at,
-                tags=tags,
-            )
+    query = query.order_by(Article.created_at.desc(), Article.id.desc())
+    rows = query.offset((page - 1) * page_size).limit(page_size).all()
+
+    return _list_items(db, rows)
+
+
+def _filtered_page(
+    db: Session,
+    page: int,
+    page_size: int,
+    featured: Optional[int],
+    category: Optional[str],
+    sort: str,
+) -> tuple[list, int]:
+    """不带关键词、不带标签时的筛选 + SQL 排序分页，返回 (当页扁平行, 总数)。
+
+    带标签的情况走位图索引，不会到这里。
+    """
+
+    # 筛选条件只规范化一次：SQL 条件和总数缓存的键用同一份值
+    key = filter_key(featured, category)
+    featured, category = key
+    filters = [Article.status == ArticleStatus.PUBLISHED]
+
+    if featured:
+        filters.append(Article.is_featured == True)
+
+    if category:
+        filters.append(Article.category == category)
+
+    # 同样的筛选条件翻页时不再重复 COUNT（见 app/utils/article_counts.py）
+    total = cached_total(
+        db,
+        key,
+        lambda: db.query(func.count(Article.id)).filter(*filters).scalar() or 0,
+    )
+
+    order_by = [Article.created_at.desc(), Article.id.desc()]
+    if sort == "popular":
+        order_by.insert(0, _VIEWS.desc())
+
+    rows = (
+        _list_query(db)
+        .filter(*filters)
+        .order_by(*order_by)
+        .offset((page - 1) * page_size)
+        .limit(page_size)
+        .all()
+    )
+    return rows, total
+
+
+def _by_views(db: Session, ids: List[int]) -> List[int]:
+    """列表顺序的 id 按浏览数倒序重排；浏览数相同的保持列表顺序。"""
+
+    views: dict[int, int] = {}
+    # SQL Server 单条语句参数上限 2100，分批 IN
+    for start in range(0, len(ids), 1000):
+        views.update(
+            db.query(ArticleView.article_id, ArticleView.view_count)
+            .filter(ArticleView.article_id.in_(ids[start : start + 1000]))
+            .all()
         )
-    return result
+    return sorted(ids, key=lambda i: -(views.get(i) or 0))
+
+
+def _rows_in_order(db: Session, ids: List[int]) -> list:
+    """按给定 id 顺序取列表行。"""
+
+    if not ids:
+        return []
+    rank = {aid: n for n, aid in enumerate(ids)}
+    return sorted(
+        _list_query(db).filter(Article.id.in_(ids)).all(),
+        key=lambda r: rank[r.id],
+    )
 
 
 @router.get("/paged", response_model=ArticleListResponse)
@@ -58,9 +195,16 @@ def list_articles_paged(
     search: Optional[str] = None,
     category: Optional[str] = None,
     tag: Optional[str] = None,
+    tag_mode: str = "and",
+    sort: str = "latest",
     db: Session = Depends(get_db),
 ):
-    """攻略列表（带总数 & 筛选），用于前端分页/筛选 UI。"""
+    """攻略列表（带总数 & 筛选），用于前端分页/筛选 UI。
+
+    - tag 可以逗号分隔多个，tag_mode=and 要求全部命中，or 命中任意一个
+    - sort=latest 按发布时间，popular 按浏览数
+    - 带 search 时按相关度排序（忽略 sort），每条附上命中位置的高亮摘要（highlight）
+    """
 
     if page < 1:
         page = 1
@@ -68,71 +212,64 @@ def list_articles_paged(
         page_size = 10
     if page_size > 50:
         page_size = 50
-
-    q = db.query(Article).filter(Article.status == ArticleStatus.PUBLISHED)
-
-    if featured:
-        q = q.filter(Article.is_featured == True)
-
-    if category:
-        q = q.filter(Article.category == category)
-
+    if tag_mode not in TAG_MODES:
+        raise HTTPException(status_code=400, detail="tag_mode 只能是 and 或 or")
+    if sort not in SORT_MODES:
+        raise HTTPException(status_code=400, detail="sort 只能是 latest 或 popular")
+    tags = parse_tag_filter(tag)
+    category = filter_key(featured, category)[1]
+
+    search = (search or "").strip()
+    highlights: dict[int, str] = {}
     if search:
-        like = f"%{search}%"
-        q = q.filter(or_(Article.title.ilike(like), Article.content.ilike(like)))
-
-    if tag:
-        q = q.join(ArticleTag).filter(ArticleTag.tag_name == tag)
-
-    # total：SQL Server 需要 ORDER BY 列出现在 SELECT 中，改用 group_by + 子查询计数
-    id_query = (
-        q.with_entities(Article.id, Article.created_at)
-        .group_by(Article.id, Article.created_at)
-    )
-
-    total = db.query(func.count()).select_from(id_query.subquery()).scalar() or 0
-
-    # 分页拿到 id 列表，再查实体
-    id_rows = (
-        id_query.order_by(Article.created_at.desc(), Article.id.desc())
-        .offset((page - 1) * page_size)
-        .limit(page_size)
-        .all()
-    )
-    ids = [r[0] for r in id_rows]
-
-    items = []
-    if ids:
-        items = (
-            db.query(Article)
-            .filter(Article.id.in_(ids))
-            .order_by(Article.created_at.desc(), Article.id.desc())
-            .all()
+        # 关键词搜索走进程内的倒排索引（BM25 排序），不再 ILIKE 扫正文
+        index = get_guide_index(db)
+        hit_ids = index.search(
+            search,
+            featured=bool(featured),
+            category=category,
+            tags=tags,
+            tag_mode=tag_mode,
         )
-
-    result: List[ArticleListItem] = []
-    for a in items:
-        tags = [t.tag_name for t in a.tags]
-        excerpt = (a.content[:120] + "...") if len(a.content) > 120 else a.content
-        result.append(
-            ArticleListItem(
-                id=a.id,
-                title=a.title,
-                excerpt=excerpt,
-                author_nickname=a.author.nickname,
-                created_at=a.created_at,
-                tags=tags,
-            )
+        total = len(hit_ids)
+        ids = hit_ids[(page - 1) * page_size : page * page_size]
+        highlights = {i: index.snippet(i, search) for i in ids}
+        rows = _rows_in_order(db, ids)
+    elif tags:
+        # 按标签筛选走内存位图：按位与 / 或，总数 = bit_count()，不 JOIN 也不 COUNT；
+        # 按浏览数排序时只对命中的这些文章取浏览数再排
+        index = get_tag_index(db)
+        mask = index.select(
+            tags, mode=tag_mode, featured=bool(featured), category=category
         )
+        total = mask.bit_count()
+        if sort == "popular":
+            ids = _by_views(db, index.page(mask, 0, total))
+            ids = ids[(page - 1) * page_size : page * page_size]
+        else:
+            ids = index.page(mask, (page - 1) * page_size, page_size)
+        rows = _rows_in_order(db, ids)
+    else:
+        rows, total = _filtered_page(db, page, page_size, featured, category, sort)
 
     return ArticleListResponse(
-        items=result,
+        items=_list_items(db, rows, highlights),
         page=page,
         page_size=page_size,
         total=total,
     )
 
 
+@router.get("/tags", response_model=List[TagCountOut])
+def list_popular_tags(
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db),
+):
+    """标签云：使用最多的标签及其已发布攻略数。"""
+
+    return [TagCountOut(name=name, count=n) for name, n in popular_tags(db, limit)]
+
+
 @router.get("/{article_id}", response_model=ArticleOut)
 def get_article(article_id: int, db: Session = Depends(get_db)):
     article = (
@@ -146,6 +283,7 @@ def get_article(article_id: int, db: Session = Depends(get_db)):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="文章不存在"
         )
+    record_view(article.id)
 
     return ArticleOut(
         id=article.id,
@@ -162,6 +300,7 @@ def get_article(article_id: int, db: Session = Depends(get_db)):
             {"id": t.id, "tag_name": t.tag_name}
             for t in article.tags
         ],
+        view_count=view_count(db, article.id),
     )
 
 
@@ -181,17 +320,18 @@ def create_article(
         status=ArticleStatus.PUBLISHED,
         is_featured=payload.is_featured or False,
     )
+    fill_article_summary(article)
     db.add(article)
     db.flush()
 
-    tags = []
-    for tag_name in payload.tags or []:
-        tag = ArticleTag(article_id=article.id, tag_name=tag_name)
-        db.add(tag)
-        tags.append(tag)
+    tag_names = resolve_tag_names(db, payload.tags)
+    for tag_name in tag_names:
+        db.add(ArticleTag(article_id=article.id, tag_name=tag_name))
+    refresh_tag_counts(db, tag_names)
 
     db.commit()
     db.refresh(article)
+    refresh_guide_index(db, article)
 
     return ArticleOut(
         id=article.id,
@@ -223,10 +363,14 @@ def update_article(
     if article.author_id != current_user.id and not is_admin:
         raise HTTPException(403, "仅作者或管理员可编辑")
 
+    # 状态或标签变了，新旧标签的计数都要重算
+    old_tags = article_tag_names(db, article.id)
+
     if payload.title is not None:
         article.title = payload.title
     if payload.content is not None:
         article.content = sanitize_html(payload.content)
+        fill_article_summary(article)
     if payload.category is not None:
         article.category = payload.category
     if payload.status is not None:
@@ -234,15 +378,20 @@ def update_article(
     if payload.is_featured is not None:
         article.is_featured = payload.is_featured
 
+    new_tags = old_tags
     if payload.tags is not None:
+        new_tags = resolve_tag_names(db, payload.tags)
         db.query(ArticleTag).filter(
             ArticleTag.article_id == article.id
         ).delete()
-        for tag_name in payload.tags:
+        for tag_name in new_tags:
             db.add(ArticleTag(article_id=article.id, tag_name=tag_name))
+    if payload.tags is not None or payload.status is not None:
+        refresh_tag_counts(db, old_tags + new_tags)
 
     db.commit()
     db.refresh(article)
+    refresh_guide_index(db, article)
 
     return ArticleOut(
         id=article.id,
@@ -267,5 +416,7 @@ def delete_article(
     if not article:
         raise HTTPException(404, "文章不存在")
     article.status = ArticleStatus.DELETED
+    refresh_tag_counts(db, article_tag_names(db, article.id))
     db.commit()
+    refresh_guide_index(db, article)
     return {"message": "删除成功"}
@@ -1,23 +1,32 @@
 # app/routers/card_reviews.py
-from typing import Optional
+from typing import List, Optional
 
-from datetime import datetime
-
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import asc, desc, func
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import and_, asc, desc, func, or_
 from sqlalchemy.orm import Session
 
 from app.dependencies.auth import get_db, require_member
-from app.models import Card, CardReview, User, UserRole
+from app.models import Card, CardReview, CardReviewStats, User, UserRole
 from app.schemas import (
     CardReviewCardInfo,
     CardReviewItem,
     CardReviewReviewer,
+    CardReviewSummary,
+    CardReviewTop,
     CardReviewsResponse,
     CardReviewUpsert,
     CardReviewMineOut,
     Pagination,
 )
+from app.utils.card_stats import score_histogram
+from app.utils.http_cache import etag_matches, make_etag, not_modified, set_etag
+from app.utils.review_writes import (
+    MAX_REVIEWERS,
+    CardNotFound,
+    ReviewQuotaFull,
+    upsert_card_review,
+)
+from app.utils.site_counters import CARDS, REVIEWERS, REVIEWS, read_counters
 
 router = APIRouter(
     prefix="/api/v1/cards",
@@ -25,6 +34,73 @@ router = APIRouter(
 )
 
 
+# 点评概况一次最多查多少张卡（SQL Server 单条语句参数上限 2100）
+MAX_SUMMARY_CARDS = 500
+
+
+@router.get("/reviews/summary", response_model=List[CardReviewSummary])
+def get_review_summaries(
+    request: Request,
+    response: Response,
+    card_ids: List[str] = Query(..., description="卡牌 id，逗号分隔，如 card_ids=1,2,3"),
+    db: Session = Depends(get_db),
+):
+    """多张卡的点评概况：点评数、均分、评分分布、热门短评，按传入顺序返回。
+
+    全部读物化的 card_review_stats（评分分布在写点评时维护），一条语句与卡牌数量无关。
+    """
+    ids: dict[int, None] = {}
+    for part in ",".join(card_ids).split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            ids[int(part)] = None
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"无效的卡牌 id：{part}")
+    if len(ids) > MAX_SUMMARY_CARDS:
+        raise HTTPException(
+            status_code=400, detail=f"一次最多查询 {MAX_SUMMARY_CARDS} 张卡牌"
+        )
+    wanted = list(ids)
+
+    etag = make_etag("review_summary", read_counters(db, REVIEWS), wanted)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    if not wanted:
+        return []
+
+    stats = {
+        s.card_id: s
+        for s in db.query(CardReviewStats)
+        .filter(CardReviewStats.card_id.in_(wanted))
+        .all()
+    }
+
+    result: list[CardReviewSummary] = []
+    for cid in wanted:
+        st = stats.get(cid)
+        top = None
+        if st is not None and st.top_review_id is not None:
+            top = CardReviewTop(
+                review_id=st.top_review_id,
+                content=st.top_review_content,
+                reviewer_nickname=st.top_reviewer_nickname,
+            )
+        result.append(
+            CardReviewSummary(
+                card_id=cid,
+                review_count=st.review_count if st is not None else 0,
+                average_score=st.avg_score if st is not None else None,
+                weighted_score=st.weighted_score if st is not None else None,
+                histogram=score_histogram(st),
+                top_review=top,
+            )
+        )
+    return result
+
+
 @router.get("/{card_id}/reviews/me", response_model=Optional[CardReviewMineOut])
 def get_my_review(
     card_id: int,
@@ -64,10 +140,6 @@ def upsert_review(
     约束：每张卡最多 5 个不同用户写短评。
     """
 
-    card = db.query(Card).filter(Card.id == card_id).first()
-    if not card:
-        raise HTTPException(status_code=404, detail="卡牌不存在")
-
     content = (payload.content or "").strip()
     if not content:
         raise HTTPException(status_code=400, detail="短评内容不能为空")
@@ -78,60 +150,39 @@ def upsert_review(
     if payload.score < 0 or payload.score > 5:
         raise HTTPException(status_code=400, detail="评分范围为 0~5")
 
-    existing = (
-        db.query(CardReview)
-        .filter(
-            CardReview.card_id == card_id,
-            CardReview.reviewer_id == current_user.id,
+    # 更新 / 名额内新增在一条语句里完成，并发提交也不会超过 5 人
+    try:
+        review_id, written_at = upsert_card_review(
+            db,
+            card_id,
+            current_user.id,
+            payload.score,
+            content,
+            payload.game_version,
         )
-        .first()
-    )
-
-    if existing:
-        existing.score = payload.score
-        existing.content = content
-        existing.game_version = payload.game_version
-        # 这里用 created_at 作为“最后更新时间”，避免额外加字段
-        existing.created_at = datetime.utcnow()
-        db.commit()
-        db.refresh(existing)
-        return CardReviewMineOut(
-            review_id=existing.id,
-            score=existing.score,
-            content=existing.content,
-            created_at=existing.created_at,
-            game_version=existing.game_version,
+    except CardNotFound:
+        raise HTTPException(status_code=404, detail="卡牌不存在")
+    except ReviewQuotaFull:
+        raise HTTPException(
+            status_code=400,
+            detail=f"该卡牌点评名额已满（最多 {MAX_REVIEWERS} 人）",
         )
+    db.commit()
 
-    # 新增：限制每卡最多 5 人
-    cnt = db.query(func.count(CardReview.id)).filter(CardReview.card_id == card_id).scalar() or 0
-    if cnt >= 5:
-        raise HTTPException(status_code=400, detail="该卡牌点评名额已满（最多 5 人）")
-
-    review = CardReview(
-        card_id=card_id,
-        reviewer_id=current_user.id,
+    return CardReviewMineOut(
+        review_id=review_id,
         score=payload.score,
         content=content,
+        created_at=written_at,
         game_version=payload.game_version,
-        created_at=datetime.utcnow(),
-    )
-    db.add(review)
-    db.commit()
-    db.refresh(review)
-
-    return CardReviewMineOut(
-        review_id=review.id,
-        score=review.score,
-        content=review.content,
-        created_at=review.created_at,
-        game_version=review.game_version,
     )
 
 
 @router.get("/{card_id}/reviews", response_model=CardReviewsResponse)
 def get_card_reviews(
     card_id: int,
+    request: Request,
+    response: Response,
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=50),
     sort: str = Query(
@@ -144,74 +195,127 @@ def get_card_reviews(
     ),
     db: Session = Depends(get_db),
 ):
-    # 1. 先拿到卡牌信息
-    card = db.query(Card).filter(Card.id == card_id).first()
+    # 0. ETag = 卡牌 / 点评 / 点评人版本号 + 查询参数；没变就直接 304
+    etag = make_etag(
+        "card_reviews",
+        read_counters(db, CARDS, REVIEWS, REVIEWERS),
+        card_id, page, page_size, sort, min_score, latest_version_only,
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+
+    # 1. 卡牌信息 + 物化的平均分 / 评分分布（card_review_stats），一条语句
+    card = (
+        db.query(Card.id, Card.name, Card.pic, Card.card_class, CardReviewStats)
+        .outerjoin(CardReviewStats, CardReviewStats.card_id == Card.id)
+        .filter(Card.id == card_id)
+        .first()
+    )
     if not card:
         raise HTTPException(status_code=404, detail="卡牌不存在")
 
-    # 2. 构造基础查询
-    query = db.query(CardReview).filter(CardReview.card_id == card_id)
-
+    # 2. 当页点评 + 点评人一条语句取回：
+    #    - 总数用 COUNT(*) OVER ()，不再单独 count()
+    #    - 点评人直接 JOIN，不再逐条懒加载 r.reviewer
+    #    - “只看最新版本”是同一条语句里的标量子查询
+    filters = [CardReview.card_id == card_id]
     if min_score is not None:
-        query = query.filter(CardReview.score >= min_score)
-
+        filters.append(CardReview.score >= min_score)
     if latest_version_only:
-        latest_version_subq = (
+        # 按数字排序键取最新版本（"29.10" > "29.9"），走 (card_id, game_version_key) 索引；
+        # 这张卡的版本号都解析不出排序键时（键全是 NULL）退回按字符串取最大的版本
+        latest_key_subq = (
+            db.query(func.max(CardReview.game_version_key))
+            .filter(CardReview.card_id == card_id)
+            .scalar_subquery()
+        )
+        latest_name_subq = (
             db.query(func.max(CardReview.game_version))
             .filter(CardReview.card_id == card_id)
             .scalar_subquery()
         )
-        query = query.filter(CardReview.game_version == latest_version_subq)
-
-    total = query.count()
+        filters.append(
+            or_(
+                CardReview.game_version_key == latest_key_subq,
+                and_(
+                    latest_key_subq.is_(None),
+                    CardReview.game_version == latest_name_subq,
+                ),
+            )
+        )
 
-    # 3. 排序逻辑
+    # 3. 排序逻辑（同分 / 同时间再按 id，翻页稳定）
     if sort.startswith("time"):
         order_col = CardReview.created_at
     else:
         order_col = CardReview.score
 
     if sort.endswith("desc"):
-        order_by = desc(order_col)
+        order_by = [desc(order_col), desc(CardReview.id)]
     else:
-        order_by = asc(order_col)
-
-    reviews = (
-        query.order_by(order_by)
+        order_by = [asc(order_col), asc(CardReview.id)]
+
+    rows = (
+        db.query(
+            CardReview.id,
+            CardReview.score,
+            CardReview.content,
+            CardReview.created_at,
+            CardReview.game_version,
+            User.id.label("user_id"),
+            User.nickname,
+            User.username,
+            User.role,
+            func.count().over().label("total"),
+        )
+        .join(User, User.id == CardReview.reviewer_id)
+        .filter(*filters)
+        .order_by(*order_by)
         .offset((page - 1) * page_size)
         .limit(page_size)
         .all()
     )
 
-    # 4. 计算平均分
-    avg_score = (
-        db.query(func.avg(CardReview.score))
-        .filter(CardReview.card_id == card_id)
-        .scalar()
-    )
-    average_score = round(avg_score, 1) if avg_score is not None else None
+    if rows:
+        total = rows[0].total
+    elif page == 1:
+        total = 0
+    else:
+        # 页码超出范围时窗口函数拿不到总数，只有这种情况再补一次 count
+        total = (
+            db.query(func.count(CardReview.id))
+            .join(User, User.id == CardReview.reviewer_id)
+            .filter(*filters)
+            .scalar()
+        )
 
-    # 5. 拼装返回结构
+    # 4. 拼装返回结构
+    stats = card.CardReviewStats
     card_info = CardReviewCardInfo(
         id=card.id,
         name=card.name,
         image_url=card.pic,
-        average_score=average_score,
+        average_score=(
+            round(stats.avg_score, 1)
+            if stats is not None and stats.avg_score is not None
+            else None
+        ),
         card_class=card.card_class,
+        score_histogram=score_histogram(stats),
     )
 
     review_items: list[CardReviewItem] = []
-    for r in reviews:
-        u = r.reviewer
+    for r in rows:
         # 简单规则：elite_member / admin 视为“专家”
-        is_expert = u.role in (UserRole.ELITE_MEMBER, UserRole.ADMIN)
+        is_expert = r.role in (UserRole.ELITE_MEMBER, UserRole.ADMIN)
 
         review_items.append(
             CardReviewItem(
                 review_id=r.id,
                 reviewer=CardReviewReviewer(
-                    id=u.id,
-                    name=u.nickname or u.username,
+                    id=r.user_id,
+                    name=r.nickname or r.username,
                     is_expert=is_expert,
                 ),
                 score=r.score,
@@ -1,18 +1,215 @@
 from typing import List, Optional
-import re
+import base64
+import json
+import math
 
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy import distinct, func, case
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Form, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.orm import Session, joinedload, load_only
 
 from app.dependencies.auth import get_db
-from app.models import Card, CardReview, User, UserProfile
-from app.schemas import CardOut
+from app.models import Card, CardReviewStats
+from app.schemas import CardChangesOut, CardFacetsOut, CardOut, CardSuggestOut
+from app.utils.card_analytics import analytics_version, get_win_rate_analytics
+from app.utils.card_changes import changes_since
+from app.utils.card_catalog import SORT_MODES, catalog_version, get_catalog
+from app.utils.card_export import COLUMNS as EXPORT_COLUMNS
+from app.utils.card_export import MEDIA_TYPES as EXPORT_MEDIA_TYPES, iter_export
+from app.utils.card_images import card_thumbs, images_version, sprite_atlases
+from app.utils.card_stats import score_histogram
+from app.utils.http_cache import etag_matches, make_etag, not_modified, set_etag
+from app.utils.site_counters import CARDS, REVIEWERS, REVIEWS, read_counters
 
 router = APIRouter(prefix="/api/cards", tags=["cards"])
 
+
+def _encode_cursor(sort_by: str, sort_order: str, card_id: int, values: list) -> str:
+    """游标对前端是不透明的：排序方式 + 最后一张卡的 id 和排序值。"""
+    raw = json.dumps(
+        {"s": sort_by, "o": sort_order, "id": card_id, "k": values},
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _is_int(v) -> bool:
+    return isinstance(v, int) and not isinstance(v, bool)
+
+
+def _is_number(v) -> bool:
+    return _is_int(v) or (isinstance(v, float) and math.isfinite(v))
+
+
+def _valid_cursor_values(sort_by: str, values: list) -> bool:
+    """排序值的形状要和 CardCatalog.cursor_values 一致，否则按值定位时会出错。"""
+    if sort_by == "class":
+        return (
+            len(values) == 2
+            and (values[0] is None or isinstance(values[0], str))
+            and _is_int(values[1])
+        )
+    if sort_by == "win":
+        return len(values) == 1 and (values[0] is None or _is_int(values[0]))
+    if sort_by in ("score", "weighted"):
+        return len(values) == 1 and (values[0] is None or _is_number(values[0]))
+    return len(values) == 1 and _is_int(values[0])
+
+
+def _decode_cursor(cursor: str, sort_by: str, sort_order: str) -> tuple[int, list]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        card_id = int(data["id"])
+        values = data["k"]
+        same_sort = data["s"] == sort_by and data["o"] == sort_order
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="无效的 cursor")
+    if not same_sort:
+        raise HTTPException(status_code=400, detail="cursor 与当前排序方式不一致")
+    if not isinstance(values, list) or not _valid_cursor_values(sort_by, values):
+        raise HTTPException(status_code=400, detail="无效的 cursor")
+    return card_id, values
+
+
+# /batch 一次最多取多少张卡（SQL Server 单条语句参数上限 2100）
+MAX_BATCH_IDS = 500
+
+
+# CardOut 中直接对应 cards 表列的字段；其余来自点评聚合（card_review_stats）
+_CARD_COLUMNS = (
+    "id",
+    "name",
+    "expansion",
+    "mana_cost",
+    "card_class",
+    "rarity",
+    "version",
+    "pic",
+    "description",
+    "arena_score",
+    "arena_win_rates",
+)
+_REVIEW_FIELDS = (
+    "short_review",
+    "reviewer_nickname",
+    "average_score",
+    "weighted_score",
+    "score_histogram",
+)
+# 缩略图地址来自图片流水线的 manifest，不查数据库
+_THUMB_FIELDS = ("thumb", "srcset")
+CARD_FIELDS = _CARD_COLUMNS + _REVIEW_FIELDS + _THUMB_FIELDS
+
+
+def _parse_fields(raw: Optional[str], allowed: tuple) -> Optional[tuple]:
+    """fields=name,pic,... -> 按 allowed 顺序排好的字段元组（总是带上 id）；不传返回 None。"""
+    if not raw or not raw.strip():
+        return None
+    wanted = {f.strip() for f in raw.split(",") if f.strip()}
+    unknown = wanted.difference(allowed)
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"未知字段：{', '.join(sorted(unknown))}"
+        )
+    wanted.add("id")
+    return tuple(f for f in allowed if f in wanted)
+
+
+def _card_values(c: Card, stats: Optional[CardReviewStats], fields: tuple) -> dict:
+    has_top = stats is not None and stats.top_review_id is not None
+    out = {}
+    if "thumb" in fields or "srcset" in fields:
+        thumb, srcset = card_thumbs(c.id)
+    for f in fields:
+        if f == "short_review":
+            out[f] = stats.top_review_content if has_top else c.short_review
+        elif f == "reviewer_nickname":
+            out[f] = stats.top_reviewer_nickname if has_top else (c.reviewer.nickname if c.reviewer else None)
+        elif f == "average_score":
+            out[f] = stats.avg_score if stats is not None else None
+        elif f == "weighted_score":
+            out[f] = stats.weighted_score if stats is not None else None
+        elif f == "score_histogram":
+            out[f] = score_histogram(stats) if stats is not None else None
+        elif f == "thumb":
+            out[f] = thumb
+        elif f == "srcset":
+            out[f] = srcset
+        else:
+            out[f] = getattr(c, f)
+    return out
+
+
+def _cards_by_ids(db: Session, ids: List[int], fields: Optional[tuple] = None) -> list:
+    """按给定顺序返回卡牌：一条 IN 查卡牌（连带旧的点评人），一条 IN 查物化的点评聚合。
+
+    不存在的 id 直接跳过。传了 fields 时只加载需要的列（description、arena_win_rates
+    这类大字段不读），返回只含这些字段的 dict；否则返回完整的 CardOut。
+    """
+    if not ids:
+        return []
+    wanted = fields or CARD_FIELDS
+
+    q = db.query(Card)
+    if fields is not None:
+        cols = [getattr(Card, f) for f in wanted if f in _CARD_COLUMNS]
+        if "short_review" in wanted or "reviewer_nickname" in wanted:
+            # 没有物化的热门点评时回退到 cards 表上的旧短评 / 点评人
+            cols += [Card.short_review, Card.reviewer_id]
+        q = q.options(load_only(*cols))
+    if "reviewer_nickname" in wanted:
+        q = q.options(joinedload(Card.reviewer))
+    cards = {c.id: c for c in q.filter(Card.id.in_(ids)).all()}
+
+    stats = {}
+    if cards and any(f in _REVIEW_FIELDS for f in wanted):
+        stats = {
+            s.card_id: s
+            for s in db.query(CardReviewStats)
+            .filter(CardReviewStats.card_id.in_(list(cards)))
+            .all()
+        }
+
+    rows = [_card_values(cards[cid], stats.get(cid), wanted) for cid in ids if cid in cards]
+    if fields is not None:
+        return rows
+    # 构造响应模型，避免给 ORM property 赋值
+    return [CardOut(**r) for r in rows]
+
+
+def _projected(items: list, response: Response) -> JSONResponse:
+    """fields 投影后的结果直接输出 JSON（绕过 response_model），带上已设置的缓存 / 游标头。"""
+    headers = {
+        k: v
+        for k, v in response.headers.items()
+        if k.lower() in ("etag", "cache-control", "x-next-cursor")
+    }
+    return JSONResponse(content=items, headers=headers)
+
+
+def _parse_ids(raw: List[str]) -> List[int]:
+    """"1,2,3" / 多个 ids 参数 -> 去重后的 id 列表（保持顺序）。"""
+    ids: dict[int, None] = {}
+    for part in ",".join(raw).split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            ids[int(part)] = None
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"无效的卡牌 id：{part}")
+    if len(ids) > MAX_BATCH_IDS:
+        raise HTTPException(
+            status_code=400, detail=f"一次最多查询 {MAX_BATCH_IDS} 张卡牌"
+        )
+    return list(ids)
+
+
 @router.get("", response_model=List[CardOut])
 def list_cards(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     # 版本筛选（你下拉框用的）
     version: Optional[str] = Query(None, description="按 cards.version 过滤"),
@@ -33,187 +230,291 @@ def list_cards(
         None, description="模糊搜索卡牌名"
     ),
     sort_by: Optional[str] = Query(
-        "mana", description="排序字段：class|win|mana|score"
+        "mana", description="排序字段：class|win|mana|score|weighted"
     ),
     sort_order: str = Query(
         "asc", regex="^(asc|desc)$", description="排序方向"
     ),
     page: int = Query(1, ge=1),
     page_size: int = Query(30, ge=1, le=200),
+    # 游标翻页（无限滚动用）：传上一页响应头里的 X-Next-Cursor，传了就忽略 page
+    cursor: Optional[str] = Query(
+        None, description="上一页返回的 X-Next-Cursor"
+    ),
+    # 字段投影：只返回需要的字段，如 fields=id,name,pic,average_score
+    fields: Optional[str] = Query(
+        None, description="逗号分隔的 CardOut 字段，不传返回全部"
+    ),
 ):
-    # 均分子查询：给“按评分”排序用
-    avg_sub = (
-        db.query(
-            CardReview.card_id.label("cid"),
-            func.avg(CardReview.score).label("avg_score"),
-        )
-        .group_by(CardReview.card_id)
-        .subquery()
+    if sort_by not in SORT_MODES:
+        sort_by = "mana"
+    projection = _parse_fields(fields, CARD_FIELDS)
+
+    after = None
+    if cursor:
+        after = _decode_cursor(cursor, sort_by, sort_order)
+
+    # ETag = 数据版本号 + 查询参数；没变就直接 304，不做任何查询。
+    # 老卡的 reviewer_nickname 直接读 users 表，所以版本号里带上 reviewers
+    cards_v, reviews_v, reviewers_v = read_counters(db, CARDS, REVIEWS, REVIEWERS)
+    version_key = (cards_v, reviews_v)
+    etag = make_etag(
+        "cards", version_key, reviewers_v, images_version(), version, expansion,
+        card_class, rarity, search, sort_by, sort_order, page, page_size, cursor,
+        projection,
     )
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
 
-    query = (
-        db.query(Card, avg_sub.c.avg_score.label("avg_score"))
-        .outerjoin(avg_sub, Card.id == avg_sub.c.cid)
+    # 筛选 + 排序在进程内的目录索引里完成，不再每次点击都发一条 SQL；
+    # 排序规则（含 NULL 排后）与原 SQL 一致，见 app/utils/card_catalog.py
+    catalog = get_catalog(db, version_key)
+    positions, has_more = catalog.page(
+        limit=page_size,
+        offset=(page - 1) * page_size,
+        after=after,
+        version=version,
+        expansion=expansion,
+        card_class=card_class,
+        rarity=rarity,
+        search=search,
+        sort_by=sort_by,
+        sort_order=sort_order,
     )
+    page_ids = [catalog.ids[i] for i in positions]
+
+    if has_more and positions:
+        last = positions[-1]
+        response.headers["X-Next-Cursor"] = _encode_cursor(
+            sort_by,
+            sort_order,
+            catalog.ids[last],
+            catalog.cursor_values(last, sort_by),
+        )
+
+    if projection is not None:
+        return _projected(_cards_by_ids(db, page_ids, projection), response)
+    return _cards_by_ids(db, page_ids)
 
-    if version:
-        query = query.filter(Card.version == version)
-    elif expansion:
-        query = query.filter(Card.expansion == expansion)
 
-    if card_class:
-        query = query.filter(Card.card_class == card_class)
+@router.get("/batch", response_model=List[CardOut])
+def get_cards_batch(
+    request: Request,
+    response: Response,
+    ids: List[str] = Query(..., description="卡牌 id，逗号分隔，如 ids=1,2,3"),
+    fields: Optional[str] = Query(
+        None, description="逗号分隔的 CardOut 字段，不传返回全部"
+    ),
+    db: Session = Depends(get_db),
+):
+    """按 id 批量取卡牌（对比、卡组、梯度表等多卡视图用），按传入顺序返回。"""
+    card_ids = _parse_ids(ids)
+    projection = _parse_fields(fields, CARD_FIELDS)
+    etag = make_etag(
+        "cards_batch",
+        read_counters(db, CARDS, REVIEWS, REVIEWERS),
+        images_version(),
+        card_ids,
+        projection,
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    if projection is not None:
+        return _projected(_cards_by_ids(db, card_ids, projection), response)
+    return _cards_by_ids(db, card_ids)
 
-    if rarity:
-        query = query.filter(Card.rarity == rarity)
 
-    if search:
-        like = f"%{search}%"
-        query = query.filter(Card.name.ilike(like))
+@router.post("/batch", response_model=List[CardOut])
+def post_cards_batch(
+    ids: str = Form(..., description="卡牌 id，逗号分隔"),
+    fields: Optional[str] = Form(None, description="逗号分隔的 CardOut 字段"),
+    db: Session = Depends(get_db),
+):
+    """同 GET /batch，id 很多、URL 放不下时用表单提交。"""
+    card_ids = _parse_ids([ids])
+    projection = _parse_fields(fields, CARD_FIELDS)
+    if projection is not None:
+        return JSONResponse(content=_cards_by_ids(db, card_ids, projection))
+    return _cards_by_ids(db, card_ids)
 
-    # 注意：SQL Server 不支持 NULLS LAST，这里用 case 把 NULL 排在后面
-    def direction(expr):
-        return expr.asc() if sort_order.lower() == "asc" else expr.desc()
 
-    def nulls_last(expr):
-        return case((expr.is_(None), 1), else_=0)
+@router.get("/export")
+def export_cards(
+    db: Session = Depends(get_db),
+    format: str = Query("ndjson", regex="^(ndjson|csv)$", description="ndjson | csv"),
+    version: Optional[str] = Query(None, description="按 cards.version 过滤"),
+    expansion: Optional[str] = Query(None, description="按 expansion 过滤"),
+    card_class: Optional[str] = Query(None, description="按职业过滤"),
+    rarity: Optional[str] = Query(None, description="按稀有度过滤"),
+    search: Optional[str] = Query(None, description="模糊搜索卡牌名"),
+    fields: Optional[str] = Query(None, description="逗号分隔的导出列，不传导出全部"),
+):
+    """流式导出卡牌目录（含均分、点评数），筛选参数与 /api/cards 相同，按 id 排序。"""
+    columns = _parse_fields(fields, EXPORT_COLUMNS) or EXPORT_COLUMNS
+    only_ids = None
+    if search and search.strip():
+        # 名字 / 拼音搜索只有目录的索引能做，先算出命中的 id
+        catalog = get_catalog(db)
+        only_ids = {catalog.ids[i] for i in catalog.search_index.match(search)}
 
-    if sort_by == "class":
-        query = query.order_by(direction(Card.card_class), Card.mana_cost.asc(), Card.name.asc())
-    elif sort_by == "win":
-        query = query.order_by(nulls_last(Card.arena_score), direction(Card.arena_score), Card.name.asc())
-    elif sort_by == "score":
-        query = query.order_by(nulls_last(avg_sub.c.avg_score), direction(avg_sub.c.avg_score), Card.name.asc())
-    else:  # 默认按水晶排序
-        query = query.order_by(direction(Card.mana_cost), Card.name.asc())
-
-    rows = (
-        query.offset((page - 1) * page_size)
-        .limit(page_size)
-        .all()
+    return StreamingResponse(
+        iter_export(
+            format,
+            version=version,
+            expansion=expansion,
+            card_class=card_class,
+            rarity=rarity,
+            only_ids=only_ids,
+            columns=columns,
+        ),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="cards.{format}"',
+        },
     )
 
-    cards = []
-    avg_map: dict[int, float | None] = {}
-    for row in rows:
-        card, avg_score = row
-        cards.append(card)
-        if avg_score is not None:
-            avg_map[card.id] = float(avg_score)
-
-    # 补充点评均分（避免 SQL Server DISTINCT/文本问题，这里单独查均分）
-    card_ids = [c.id for c in cards]
-    top_map = {}
-
-    if card_ids:
-        # 取影响力最高的点评（若影响力为空，则排在后面），用于列表页展示点评人和短评
-        influence_null_last = case((UserProfile.influence.is_(None), 1), else_=0)
-        top_reviews = (
-            db.query(
-                CardReview.card_id,
-                CardReview.content,
-                User.nickname.label("nick"),
-                User.username.label("uname"),
-                UserProfile.influence,
-                CardReview.created_at,
-            )
-            .join(User, User.id == CardReview.reviewer_id)
-            .outerjoin(UserProfile, UserProfile.user_id == User.id)
-            .filter(CardReview.card_id.in_(card_ids))
-            .order_by(influence_null_last, UserProfile.influence.desc(), CardReview.created_at.desc())
-            .all()
-        )
 
-        seen = set()
-        for cid, content, nick, uname, _, _ in top_reviews:
-            if cid in seen:
-                continue
-            seen.add(cid)
-            top_map[cid] = {
-                "content": content,
-                "reviewer": nick or uname or "",
-            }
+@router.get("/changes", response_model=CardChangesOut)
+def card_changes(
+    since: int = Query(0, ge=0, description="客户端本地数据对应的序号，首次同步传 0"),
+    limit: int = Query(MAX_BATCH_IDS, ge=1, le=MAX_BATCH_IDS),
+    after_id: Optional[int] = Query(
+        None, ge=0, description="上一页返回的 after_id（同一序号没拉完时才有）"
+    ),
+    db: Session = Depends(get_db),
+):
+    """增量同步：返回序号 since 之后新增 / 修改的卡牌和被删除的卡牌 id。
 
-    # 构造响应模型，避免给 ORM property 赋值
-    result: list[CardOut] = []
-    for c in cards:
-        top = top_map.get(c.id)
+    客户端把返回的 seq / after_id 存下来作为下次的 since / after_id；
+    has_more 为 true 时接着拉。每页最多 limit 张卡。
+    """
+    seq, next_after, changed_ids, deleted_ids, has_more = changes_since(
+        db, since, limit, after_id
+    )
+    return CardChangesOut(
+        seq=seq,
+        after_id=next_after,
+        upserted=_cards_by_ids(db, changed_ids),
+        deleted=deleted_ids,
+        has_more=has_more,
+    )
+
+
+@router.get("/suggest", response_model=List[CardSuggestOut])
+def suggest_cards(
+    q: str = Query(..., min_length=1, max_length=50, description="名字 / 拼音 / 首字母"),
+    limit: int = Query(10, ge=1, le=30),
+    db: Session = Depends(get_db),
+):
+    """搜索框输入联想：走内存里的 n-gram + 拼音索引，不查数据库。"""
+    catalog = get_catalog(db)
+    meta = catalog.classes.values
+    result: list[CardSuggestOut] = []
+    for i in catalog.suggest(q, limit):
         result.append(
-            CardOut(
-                id=c.id,
-                name=c.name,
-                expansion=c.expansion,
-                mana_cost=c.mana_cost,
-                card_class=c.card_class,
-                rarity=c.rarity,
-                version=c.version,
-                pic=c.pic,
-                description=c.description,
-                arena_score=c.arena_score,
-                arena_win_rates=c.arena_win_rates,
-                short_review=top["content"] if top else c.short_review,
-                reviewer_nickname=top["reviewer"] if top else (c.reviewer.nickname if c.reviewer else None),
-                average_score=avg_map.get(c.id),
+            CardSuggestOut(
+                id=catalog.ids[i],
+                name=catalog.names[i],
+                card_class=meta[catalog.class_codes[i]],
+                mana_cost=catalog.mana[i],
             )
         )
-
     return result
 
-@router.get("/expansions", response_model=List[str])
-def list_versions(db: Session = Depends(get_db)):
+
+@router.get("/facets", response_model=CardFacetsOut)
+def card_facets(
+    request: Request,
+    response: Response,
+    version: Optional[str] = Query(None),
+    expansion: Optional[str] = Query(None),
+    card_class: Optional[str] = Query(None),
+    rarity: Optional[str] = Query(None),
+    search: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+):
+    """版本 / 职业 / 稀有度下拉框 + 当前筛选下每个选项的卡牌数（一次扫描算完）。
+
+    结果按目录版本缓存；ETag 由数据版本号 + 参数决定，没变就回 304。
     """
-    下拉框用的版本列表：
-    - 实际返回的是 cards.version
-    - 排序规则：按 expansion 中 () 里的年份倒序（新的在前）
-      比如 '天马年 (2024)' 会排在 '独狼年 (2023)' 前面
+    version_key = catalog_version(db)
+    etag = make_etag(
+        "facets", version_key, version, expansion, card_class, rarity, search
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    return get_catalog(db, version_key).facets(
+        version=version,
+        expansion=expansion,
+        card_class=card_class,
+        rarity=rarity,
+        search=search,
+    )
+
+
+def _facet_values(
+    name: str, request: Request, response: Response, db: Session
+):
+    version_key = catalog_version(db)
+    etag = make_etag(name, version_key)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    return [f["value"] for f in get_catalog(db, version_key).facets()[name]]
+
+
+@router.get("/analytics/win_rates")
+def win_rate_analytics(request: Request, db: Session = Depends(get_db)):
+    """竞技场胜率分析：按职业 / 稀有度的分位数、均值、趋势斜率，以及每张卡
+    在职业、职业 + 费用段里的名次。
+
+    计算见 app/utils/card_analytics.py；结果连同序列化好的 JSON 按卡牌数据版本缓存，
+    这里直接把字节写回去。
     """
-    # 拿到 version + expansion 的去重组合
-    rows = db.query(distinct(Card.version), Card.expansion).all()
+    version_key = analytics_version(db)
+    etag = make_etag("win_rates", version_key)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    analytics = get_win_rate_analytics(db, version_key)
+    response = Response(content=analytics.body, media_type="application/json")
+    set_etag(response, etag)
+    return response
 
-    items = []
-    for version, expansion in rows:
-        # 没 version 就没必要出现在下拉框里
-        if not version:
-            continue
 
-        year = 0
-        if expansion:
-            # 匹配括号里的 4 位数字年份：(... 2024)
-            m = re.search(r"\((\d{4})\)", expansion)
-            if m:
-                year = int(m.group(1))
-
-        items.append(
-            {
-                "version": version,
-                "expansion": expansion or "",
-                "year": year,
-            }
-        )
+@router.get("/sprites")
+def card_sprites():
+    """各版本的卡牌精灵图和 JSON 图集地址（版本 -> {image, atlas}）。"""
+    return sprite_atlases()
 
-    # 按年份倒序，其次按 version 倒序
-    items.sort(key=lambda x: (x["year"], x["version"]), reverse=True)
 
-    # 前端只需要 version 文本
-    return [item["version"] for item in items]
+@router.get("/expansions", response_model=List[str])
+def list_versions(
+    request: Request, response: Response, db: Session = Depends(get_db)
+):
+    """
+    下拉框用的版本列表：
+    - 实际返回的是 cards.version
+    - 排序规则：按 expansion 中 () 里的年份倒序（新的在前）
+      比如 '天马年 (2024)' 会排在 '独狼年 (2023)' 前面；同年再按版本号倒序，
+      版本号逐段按数字比较（game_versions 登记表，与点评的“最新版本”一致）
+    现在直接读内存目录（见 /facets），不再 SELECT DISTINCT + 逐行正则。
+    """
+    return _facet_values("versions", request, response, db)
 
 @router.get("/classes", response_model=List[str])
-def list_classes(db: Session = Depends(get_db)):
+def list_classes(
+    request: Request, response: Response, db: Session = Depends(get_db)
+):
     """卡牌职业列表"""
-    rows = (
-        db.query(distinct(Card.card_class))
-        .filter(Card.card_class.isnot(None))
-        .all()
-    )
-    return [r[0] for r in rows if r[0]]
+    return _facet_values("classes", request, response, db)
 
 
 @router.get("/rarities", response_model=List[str])
-def list_rarities(db: Session = Depends(get_db)):
+def list_rarities(
+    request: Request, response: Response, db: Session = Depends(get_db)
+):
     """卡牌稀有度列表"""
-    rows = (
-        db.query(distinct(Card.rarity))
-        .filter(Card.rarity.isnot(None))
-        .all()
-    )
-    return [r[0] for r in rows if r[0]]
\ No newline at end of file
+    return _facet_values("rarities", request, response, db)
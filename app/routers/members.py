@@ -16,6 +16,7 @@ from app.schemas import (
     UserProfileUpdate,
     AchievementOut,
 )
+from app.utils.card_stats import refresh_stats_for_reviewer
 import hashlib
 router = APIRouter(prefix="/api", tags=["members"])
 
@@ -163,8 +164,10 @@ def update_my_profile(
     if payload.other_tags is not None:
         profile.other_tags = payload.other_tags
 
-    if payload.nickname is not None:
+    if payload.nickname is not None and payload.nickname != current_user.nickname:
         current_user.nickname = payload.nickname
+        # 卡牌列表展示的点评人昵称是物化的，需要同步刷新
+        refresh_stats_for_reviewer(db, current_user.id)
 
     db.commit()
     db.refresh(profile)
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, Request,HTTPException
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, defer, joinedload
 
 from app.dependencies.auth import get_db, get_current_user_from_cookie
 from app.models import (
@@ -15,6 +15,7 @@ from app.models import (
     UserProfile,
     UserRole,
 )
+from app.utils.article_views import record_view, view_count
 
 templates = Jinja2Templates(directory="app/templates")
 
@@ -53,6 +54,7 @@ async def index(
     # 精选文章 + 成就 + 高分大神
     featured_articles = (
         db.query(Article)
+        .options(defer(Article.content), joinedload(Article.author))
         .filter(
             Article.status == ArticleStatus.PUBLISHED,
             Article.is_featured == True,
@@ -109,6 +111,7 @@ async def guides_page(
 ):
     query = (
         db.query(Article)
+        .options(defer(Article.content))
         .filter(Article.status == ArticleStatus.PUBLISHED)
         .order_by(Article.created_at.desc())
     )
@@ -151,6 +154,7 @@ async def card_detail_page(
         {
             "request": request,
             "card": card,
+            "review_stats": card.review_stats,
             "current_user": current_user,  # 跟其他页面保持一致
             "user": current_user,          # 可要可不要，看模板里用哪个
         },
@@ -331,12 +335,14 @@ async def guide_detail_page(
                 "current_user": current_user,
             },
         )
+    record_view(article.id)
     return templates.TemplateResponse(
         "guide_detail.html",
         {
             "request": request,
             "current_user": current_user,
             "article": article,
+            "view_count": view_count(db, article.id),
         },
     )
 
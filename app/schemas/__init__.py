@@ -118,6 +118,7 @@ class ArticleOut(BaseModel):
     category: Optional[str]
     is_featured: bool
     tags: List[ArticleTagOut]
+    view_count: int = 0
 
     class Config:
         from_attributes = True
@@ -130,6 +131,11 @@ class ArticleListItem(BaseModel):
     author_nickname: str
     created_at: datetime
     tags: List[str]
+    word_count: Optional[int] = None
+    reading_minutes: Optional[int] = None
+    view_count: int = 0
+    # 搜索时命中位置附近的正文（已转义，命中处包 <mark>）
+    highlight: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -142,6 +148,12 @@ class ArticleListResponse(BaseModel):
     total: int
 
 
+class TagCountOut(BaseModel):
+    """标签云：标签 + 使用它的已发布攻略数"""
+    name: str
+    count: int
+
+
 class CommentCreate(BaseModel):
     content: str
 
@@ -180,10 +192,47 @@ class CardOut(BaseModel):
     short_review: Optional[str]
     reviewer_nickname: Optional[str] = None
     average_score: float | None = None
+    # 按点评人影响力加权的均分
+    weighted_score: float | None = None
+    # 评分分布：0~5 分每 0.5 一档，共 11 档；没有点评时为 None
+    score_histogram: Optional[List[int]] = None
+    # 缩略图（见 app/utils/card_images.py）；没生成过时为 None，前端回退到 pic
+    thumb: Optional[str] = None
+    srcset: Optional[str] = None
     class Config:
         from_attributes = True
 
 
+class CardSuggestOut(BaseModel):
+    """搜索框输入联想"""
+    id: int
+    name: str
+    card_class: Optional[str] = None
+    mana_cost: Optional[int] = None
+
+
+class CardFacetItem(BaseModel):
+    value: str
+    count: int
+
+
+class CardFacetsOut(BaseModel):
+    """卡牌页三个下拉框的选项 + 当前筛选下的卡牌数"""
+    versions: List[CardFacetItem]
+    classes: List[CardFacetItem]
+    rarities: List[CardFacetItem]
+
+
+class CardChangesOut(BaseModel):
+    """增量同步：since 之后有变化的卡牌（完整数据）和被删除的卡牌 id"""
+    seq: int
+    # 序号 seq 这一组没拉完时，这一页最后一张卡的 id（下次原样带上）
+    after_id: Optional[int] = None
+    upserted: List[CardOut]
+    deleted: List[int]
+    has_more: bool = False
+
+
 class CardReviewUpsert(BaseModel):
     score: float
     content: str
@@ -209,6 +258,8 @@ class CardReviewCardInfo(BaseModel):
     image_url: Optional[str] = None
     average_score: Optional[float] = None
     card_class: Optional[str] = None
+    # 评分分布：0~5 分每 0.5 一档，共 11 档
+    score_histogram: List[int] = []
 
     class Config:
         from_attributes = True
@@ -232,6 +283,23 @@ class CardReviewItem(BaseModel):
         from_attributes = True
 
 
+class CardReviewTop(BaseModel):
+    review_id: int
+    content: Optional[str] = None
+    reviewer_nickname: Optional[str] = None
+
+
+class CardReviewSummary(BaseModel):
+    """一张卡的点评概况（多卡批量查询用）"""
+    card_id: int
+    review_count: int = 0
+    average_score: Optional[float] = None
+    weighted_score: Optional[float] = None
+    # 0~5 分每 0.5 一档，共 11 档
+    histogram: List[int]
+    top_review: Optional[CardReviewTop] = None
+
+
 class Pagination(BaseModel):
     page: int
     total: int
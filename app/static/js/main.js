@@ -343,6 +343,7 @@ function initGuidesPage() {
   const searchInput = document.getElementById("guide-search");
   const categoryInput = document.getElementById("guide-category");
   const tagInput = document.getElementById("guide-tag");
+  const sortSelect = document.getElementById("guide-sort");
   const btnFilter = document.getElementById("btn-guide-filter");
   const btnReset = document.getElementById("btn-guide-reset");
   const btnPrev = document.getElementById("guides-prev");
@@ -363,6 +364,7 @@ function initGuidesPage() {
     if (searchInput) searchInput.value = s;
     if (categoryInput) categoryInput.value = c;
     if (tagInput) tagInput.value = t;
+    if (sortSelect) sortSelect.value = url.searchParams.get("sort") === "popular" ? "popular" : "latest";
   }
 
   function writeUrlState() {
@@ -374,6 +376,8 @@ function initGuidesPage() {
     else url.searchParams.delete("category");
     if (tagInput && tagInput.value.trim()) url.searchParams.set("tag", tagInput.value.trim());
     else url.searchParams.delete("tag");
+    if (sortSelect && sortSelect.value === "popular") url.searchParams.set("sort", "popular");
+    else url.searchParams.delete("sort");
     window.history.replaceState({}, "", url.toString());
   }
 
@@ -397,14 +401,15 @@ function initGuidesPage() {
       card.innerHTML = `
         <div class="guide-card-head">
           <a class="guide-title" href="/guides/${a.id}">${escapeHtml(a.title)}</a>
-          <div class="meta">作者：${escapeHtml(a.author_nickname || "未知")} · ${created}</div>
+          <div class="meta">作者：${escapeHtml(a.author_nickname || "未知")} · ${created} · ${a.view_count || 0} 次浏览</div>
         </div>
         <div class="guide-excerpt"></div>
         ${tagHtml ? `<div class="guide-tags">${tagHtml}</div>` : ""}
       `;
       const excerptEl = card.querySelector(".guide-excerpt");
-      // 后端已对内容做 sanitize，这里直接渲染 HTML 以保留格式。
-      excerptEl.innerHTML = a.excerpt || "";
+      // 摘要是纯文本；搜索结果的高亮摘要后端已转义，只含 <mark>。
+      if (a.highlight) excerptEl.innerHTML = a.highlight;
+      else excerptEl.textContent = a.excerpt || "";
       listEl.appendChild(card);
     });
   }
@@ -429,6 +434,7 @@ function initGuidesPage() {
     if (s) params.set("search", s);
     if (c) params.set("category", c);
     if (t) params.set("tag", t);
+    if (sortSelect && sortSelect.value === "popular") params.set("sort", "popular");
 
     const res = await fetch(`/api/articles/paged?${params.toString()}`);
     const data = await res.json().catch(() => ({}));
@@ -457,6 +463,14 @@ function initGuidesPage() {
       if (searchInput) searchInput.value = "";
       if (categoryInput) categoryInput.value = "";
       if (tagInput) tagInput.value = "";
+      if (sortSelect) sortSelect.value = "latest";
+      page = 1;
+      load();
+    });
+  }
+
+  if (sortSelect) {
+    sortSelect.addEventListener("change", () => {
       page = 1;
       load();
     });
@@ -663,8 +677,15 @@ async function initCardsPage() {
 
   let page = 1;
   const pageSize = 40;
+  const GRID_FIELDS = [
+    "id", "name", "pic", "card_class", "rarity", "arena_score",
+    "arena_win_rates", "short_review", "reviewer_nickname", "average_score",
+    "thumb", "srcset",
+  ].join(",");
   let loading = false;
   let hasMore = true;
+  // 游标翻页：后端在响应头 X-Next-Cursor 里给出下一页的位置
+  let nextCursor = null;
     let sortOrder = (sortOrderBtn && sortOrderBtn.dataset.order) || "asc";
 
   // 只有“战队成员及以上”才显示点评按钮（后端接口仍会校验权限）
@@ -784,7 +805,11 @@ async function initCardsPage() {
         break;
     }
 
-    const imgSrc = card.pic || "/static/image/Sylv.png";
+    // 有缩略图就用缩略图（WebP srcset + JPEG 兜底），否则回退原图
+    const imgSrc = card.thumb || card.pic || "/static/image/Sylv.png";
+    const srcsetAttr = card.srcset
+      ? `srcset="${card.srcset}" sizes="(max-width: 600px) 45vw, 220px"`
+      : "";
     const nameSafe = escapeHtml(card.name || "");
     const reviewBtn = canReview
       ? `<a class="qk-btn qk-btn-outline card-review-btn" href="/cards/${card.id}#write-review" title="写点评">点评</a>`
@@ -795,6 +820,7 @@ async function initCardsPage() {
         <div class="card-image-wrap">
           <img
             src="${imgSrc}"
+            ${srcsetAttr}
             alt="${nameSafe}"
             class="card-art"
             loading="lazy"
@@ -816,29 +842,49 @@ async function initCardsPage() {
     `;
   }
 
-  async function loadExpansions() {
-    try {
-      const res = await fetch("/api/cards/expansions");
-      if (!res.ok) return;
-      const expansions = await res.json();
-
-      expansionSelect.innerHTML = "";
+  // 三个下拉框的选项 + 当前筛选下的卡牌数，一个请求拿全（浏览器按 ETag 复用）
+  function facetParams() {
+    const { expansion, cardClass, rarity, search } = getFilters();
+    const params = new URLSearchParams();
+    if (expansion) params.append("version", expansion);
+    if (cardClass) params.append("card_class", cardClass);
+    if (rarity) params.append("rarity", rarity);
+    if (search) params.append("search", search);
+    return params;
+  }
 
-      // 按“(年份)”倒序排序
-      expansions.sort((a, b) => {
-        const yearA = parseInt((a.match(/\((\d{4})\)/) || [])[1] || "0", 10);
-        const yearB = parseInt((b.match(/\((\d{4})\)/) || [])[1] || "0", 10);
-        return yearB - yearA;
-      });
+  function applyFacetCounts(select, items) {
+    if (!select) return;
+    const counts = new Map(items.map((f) => [f.value, f.count]));
+    Array.from(select.options).forEach((opt) => {
+      if (!opt.value) return;
+      if (!opt.dataset.label) opt.dataset.label = opt.textContent;
+      const n = counts.get(opt.value) || 0;
+      opt.textContent = `${opt.dataset.label} (${n})`;
+    });
+  }
 
-      for (const exp of expansions) {
-        const option = document.createElement("option");
-        option.value = exp;
-        option.textContent = exp;
-        expansionSelect.appendChild(option);
+  async function loadFacets(initial = false) {
+    try {
+      const res = await fetch(`/api/cards/facets?${facetParams().toString()}`);
+      if (!res.ok) return;
+      const facets = await res.json();
+
+      if (initial) {
+        // 后端已按年份倒序排好
+        expansionSelect.innerHTML = "";
+        for (const f of facets.versions || []) {
+          const option = document.createElement("option");
+          option.value = f.value;
+          option.textContent = f.value;
+          expansionSelect.appendChild(option);
+        }
       }
+      applyFacetCounts(expansionSelect, facets.versions || []);
+      applyFacetCounts(classSelect, facets.classes || []);
+      applyFacetCounts(raritySelect, facets.rarities || []);
     } catch (err) {
-      console.error("加载版本列表失败", err);
+      console.error("加载筛选项失败", err);
     }
   }
 
@@ -851,13 +897,20 @@ async function initCardsPage() {
     if (reset) {
       page = 1;
       hasMore = true;
+      nextCursor = null;
       cardsGrid.innerHTML = "";
     }
 
     const { expansion, cardClass, rarity, search, sortBy, sortOrder } = getFilters();
     const params = new URLSearchParams();
-    params.append("page", String(page));
+    if (nextCursor) {
+      params.append("cursor", nextCursor);
+    } else {
+      params.append("page", String(page));
+    }
     params.append("page_size", String(pageSize));
+    // 网格只用到这些字段，description / 版本信息等不下发
+    params.append("fields", GRID_FIELDS);
     if (expansion) params.append("version", expansion);
     if (cardClass) params.append("card_class", cardClass);
     if (rarity) params.append("rarity", rarity);
@@ -869,6 +922,7 @@ async function initCardsPage() {
       const res = await fetch(`/api/cards?${params.toString()}`);
       if (!res.ok) throw new Error("加载卡牌失败");
       const cards = await res.json();
+      nextCursor = res.headers.get("X-Next-Cursor");
 
       const selectedClass = classSelect ? classSelect.value : "";
       if (cards.length === 0 && page === 1) {
@@ -877,10 +931,12 @@ async function initCardsPage() {
         hasMore = false;
       } else {
         const html = cards
+          // 游标定位的卡牌被删除时后端可能重复返回少量同值卡牌，这里去重
+          .filter((card) => !cardsGrid.querySelector(`[data-card-id="${card.id}"]`))
           .map((card) => buildCardHtml(card, selectedClass))
           .join("");
         cardsGrid.insertAdjacentHTML("beforeend", html);
-        if (cards.length < pageSize) {
+        if (!nextCursor) {
           hasMore = false;
         } else {
           page += 1;
@@ -898,15 +954,22 @@ async function initCardsPage() {
 
   // ---------- 事件监听 ----------
 
-  await loadExpansions();
+  await loadFacets(true);
+  // 初始选中第一个版本后，再按选中的版本刷新一次职业 / 稀有度计数
+  await loadFacets();
   await loadCards(true);
 
-  expansionSelect.addEventListener("change", () => loadCards(true));
+  function onFilterChange() {
+    loadFacets();
+    loadCards(true);
+  }
+
+  expansionSelect.addEventListener("change", onFilterChange);
   if (classSelect) {
-    classSelect.addEventListener("change", () => loadCards(true));
+    classSelect.addEventListener("change", onFilterChange);
   }
   if (raritySelect) {
-    raritySelect.addEventListener("change", () => loadCards(true));
+    raritySelect.addEventListener("change", onFilterChange);
   }
   if (sortSelect) {
     sortSelect.addEventListener("change", () => loadCards(true));
@@ -926,7 +989,7 @@ async function initCardsPage() {
     let timer = null;
     searchInput.addEventListener("input", () => {
       clearTimeout(timer);
-      timer = setTimeout(() => loadCards(true), 300);
+      timer = setTimeout(onFilterChange, 300);
     });
   }
   if (loadMoreBtn) {
@@ -0,0 +1,201 @@
+"""攻略列表总数缓存
+
+攻略分页每翻一页都要对同样的筛选条件重新 COUNT 一遍。这里分两种情况省掉它：
+
+- 不带筛选：直接读 site_counters 里的 published_articles（已发布攻略数，初始值由
+  迁移写入）。它只由写入方在写入的同一事务里维护：新发布 +1、下线 / 删除 -1；遇到
+  算不出增量的写入（批量 UPDATE、改状态前没加载旧值）就在这个事务里重新 COUNT。
+  读取方从不写它——计数器行不存在时（还没跑迁移）直接 COUNT。
+- 带筛选：按规范化后的筛选条件 (featured, category) 缓存在进程内（按标签筛选走
+  位图索引，见 app/utils/article_tags.py，不需要 COUNT）。缓存跟着
+  site_counters 的 article_listing 版本号走——只有影响列表筛选结果的写入
+  （状态、精选、分类、标签）才递增它，改正文、改标题不会让缓存失效。
+
+两个计数器都由 Session 事件自动维护，业务代码不需要手动调用。
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Optional
+
+from sqlalchemy import event, func, inspect, select, update
+from sqlalchemy.orm import Session
+
+from app.models import Article, ArticleStatus, ArticleTag, SiteCounter
+from app.utils.site_counters import bump_counters, read_counters
+
+# 影响列表筛选结果的写入（状态 / 精选 / 分类 / 标签）时 +1
+ARTICLE_LISTING = "article_listing"
+# 已发布攻略数（不是版本号，按增量维护）
+PUBLISHED_ARTICLES = "published_articles"
+
+# 这些列变化会改变某篇文章属于哪些筛选结果
+_LISTING_ATTRS = ("status", "is_featured", "category")
+
+# 进程内最多缓存多少种筛选组合，超出后整体清空
+_MAX_CACHED = 1024
+
+_lock = threading.Lock()
+_cache_version: Optional[int] = None
+_cache: dict[tuple, int] = {}
+
+
+def filter_key(featured: Optional[int], category: Optional[str]) -> tuple:
+    """筛选条件规范化：空串 / 空白视为不筛选。"""
+
+    return (bool(featured), (category or "").strip() or None)
+
+
+def _count_published():
+    return (
+        select(func.count(Article.id))
+        .where(Article.status == ArticleStatus.PUBLISHED)
+        .scalar_subquery()
+    )
+
+
+def published_article_count(db: Session) -> int:
+    """已发布攻略数；计数器行不存在时直接 COUNT（不写回，避免和写入方抢着补）。"""
+
+    value = db.execute(
+        select(SiteCounter.value).where(SiteCounter.name == PUBLISHED_ARTICLES)
+    ).scalar()
+    if value is None:
+        value = db.execute(select(_count_published())).scalar()
+    return int(value or 0)
+
+
+def cached_total(db: Session, key: tuple, compute) -> int:
+    """按筛选条件取总数：不筛选读已发布计数器，否则查进程内缓存，没有再调 compute()。"""
+
+    global _cache_version
+    if key == (False, None):
+        return published_article_count(db)
+
+    version = read_counters(db, ARTICLE_LISTING)[0]
+    with _lock:
+        if _cache_version == version and key in _cache:
+            return _cache[key]
+
+    total = compute()
+    with _lock:
+        if _cache_version != version:
+            _cache.clear()
+            _cache_version = version
+        if len(_cache) >= _MAX_CACHED:
+            _cache.clear()
+        _cache[key] = total
+    return total
+
+
+# ---- 写入时维护 ----
+
+
+def _was_published(obj: Article) -> Optional[bool]:
+    """flush 前这篇文章是否已发布；旧值没加载过时返回 None（算不出增量）。"""
+
+    hist = inspect(obj).attrs.status.history
+    old = hist.deleted or hist.unchanged
+    if not old:
+        return None
+    return old[0] == ArticleStatus.PUBLISHED
+
+
+def _listing_changed(obj: Article) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[a].history.has_changes() for a in _LISTING_ATTRS)
+
+
+def _adjust_published(conn, delta: int) -> None:
+    table = SiteCounter.__table__
+    # 计数器行不存在时不用管：读取方会直接 COUNT
+    conn.execute(
+        update(table)
+        .where(table.c.name == PUBLISHED_ARTICLES)
+        .values(value=table.c.value + delta)
+    )
+
+
+def _recount_published(conn) -> None:
+    """在当前事务里按 articles 重新 COUNT。
+
+    先原地 UPDATE 一次拿到计数器行的锁：别的事务如果正在按增量改它，要等它提交后
+    再 COUNT，才不会把它刚加上的增量覆盖掉。
+    """
+
+    table = SiteCounter.__table__
+    where = table.c.name == PUBLISHED_ARTICLES
+    conn.execute(update(table).where(where).values(value=table.c.value))
+    conn.execute(update(table).where(where).values(value=_count_published()))
+
+
+@event.listens_for(Session, "after_flush")
+def _track_article_counts(session: Session, flush_context) -> None:
+    # after_flush 里 new / dirty / deleted 和属性历史仍是 flush 前的状态
+    listing = False
+    delta = 0
+    unknown = False
+
+    for obj in session.new:
+        if isinstance(obj, Article):
+            listing = True
+            if obj.status == ArticleStatus.PUBLISHED:
+                delta += 1
+        elif isinstance(obj, ArticleTag):
+            listing = True
+    for obj in session.deleted:
+        if isinstance(obj, Article):
+            listing = True
+            was = _was_published(obj)
+            if was is None:
+                unknown = True
+            elif was:
+                delta -= 1
+        elif isinstance(obj, ArticleTag):
+            listing = True
+    for obj in session.dirty:
+        if isinstance(obj, ArticleTag):
+            if session.is_modified(obj, include_collections=False):
+                listing = True
+            continue
+        if not isinstance(obj, Article) or not _listing_changed(obj):
+            continue
+        listing = True
+        hist = inspect(obj).attrs.status.history
+        if not hist.has_changes():
+            continue
+        was = _was_published(obj)
+        if was is None:
+            unknown = True
+            continue
+        now = obj.status == ArticleStatus.PUBLISHED
+        delta += int(now) - int(was)
+
+    if not listing:
+        return
+    bump_counters(session, ARTICLE_LISTING)
+    conn = session.connection()
+    if unknown:
+        _recount_published(conn)
+    elif delta:
+        _adjust_published(conn, delta)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_bulk_article_writes(orm_execute_state) -> None:
+    # query(...).update() / .delete() 不经过 flush：标签的批量删除只影响筛选结果，
+    # 文章的批量写入算不出增量，语句执行完后重新 COUNT（见下面的 after_bulk_*）
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    cls = mapper.class_ if mapper is not None else None
+    if cls is ArticleTag or cls is Article:
+        bump_counters(orm_execute_state.session, ARTICLE_LISTING)
+
+
+@event.listens_for(Session, "after_bulk_update")
+@event.listens_for(Session, "after_bulk_delete")
+def _recount_after_bulk_article_write(context) -> None:
+    if context.mapper.class_ is Article:
+        _recount_published(context.session.connection())
@@ -0,0 +1,304 @@
+"""攻略标签：标签表计数 + 内存位图索引
+
+原来按标签筛选是 `JOIN article_tags WHERE tag_name = ?`（tag_name 上还没有索引），
+一次只能筛一个标签，也没有标签云。现在分两部分：
+
+- tags 表：每个标签一行，article_count = 使用它的已发布攻略数。写攻略（新建 /
+  编辑 / 改状态 / 删除）时调用 `refresh_tag_counts` 按受影响的标签重算，和文章在
+  同一个事务里提交；`/api/articles/tags` 直接按计数读这张表。
+  数据被手工改动后可以全量重建：`python -m app.utils.article_tags`。
+- 位图索引：已发布攻略按列表顺序（发布时间倒序、id 倒序）编号，每个标签 /
+  分类 / 精选各一个 Python int 位图。`tag=a,b&tag_mode=and|or` 就是位图的按位
+  与 / 或，总数是 bit_count()，分页只取前 offset + limit 个置位——不 JOIN、不 COUNT。
+  索引跟着 site_counters 的 article_listing 版本号走（见 app/utils/article_counts.py），
+  状态 / 精选 / 分类 / 标签变了才重建。
+
+标签和分类都不区分大小写：去重、计数归并、位图的键都用 `tag_key` / `category_key`
+（去空白 + casefold），和 SQL Server 默认的不区分大小写排序规则保持一致——否则
+"Mage" / "mage" 在 Python 里是两个标签、在数据库里是同一个（tags.name 唯一键冲突，
+位图和 SQL 结果不一致）。casefold 只用在比较上，存进数据库的是用户看到的写法：
+新标签保留作者第一次写的原样，已有的标签沿用 tags 表里的写法（`resolve_tag_names`）。
+"""
+
+from __future__ import annotations
+
+import threading
+from itertools import islice
+from typing import Iterable, Optional
+
+from sqlalchemy import distinct, func
+from sqlalchemy.orm import Session
+
+from app.models import Article, ArticleStatus, ArticleTag, Tag
+from app.utils.article_counts import ARTICLE_LISTING
+from app.utils.site_counters import read_counters
+
+# 单个标签最长（与 article_tags.tag_name / tags.name 列宽一致）
+MAX_TAG_LENGTH = 50
+
+TAG_MODES = ("and", "or")
+
+
+def tag_key(name: Optional[str]) -> str:
+    """标签的比较键：去掉首尾空白、casefold、截断到列宽。"""
+
+    return (name or "").strip().casefold()[:MAX_TAG_LENGTH].strip()
+
+
+def category_key(name: Optional[str]) -> str:
+    """分类的比较键：去掉首尾空白、casefold。"""
+
+    return (name or "").strip().casefold()
+
+
+def normalize_tags(names: Optional[Iterable[str]]) -> list[str]:
+    """去掉首尾空白、截断到列宽、去掉空标签；按 tag_key 去重，保留第一次出现的写法。"""
+
+    out: dict[str, str] = {}
+    for name in names or []:
+        name = (name or "").strip()[:MAX_TAG_LENGTH].strip()
+        key = tag_key(name)
+        if key and key not in out:
+            out[key] = name
+    return list(out.values())
+
+
+def _tags_by_key(db: Session, names: Iterable[str]) -> dict[str, Tag]:
+    """按 tag_key 取已有的 tags 行。
+
+    tags 表只有每个标签一行，这里用 lower() 比较，不依赖数据库的排序规则。
+    """
+
+    lowered = list({name.lower() for name in names})
+    if not lowered:
+        return {}
+    return {
+        tag_key(t.name): t
+        for t in db.query(Tag).filter(func.lower(Tag.name).in_(lowered)).all()
+    }
+
+
+def resolve_tag_names(db: Session, names: Optional[Iterable[str]]) -> list[str]:
+    """写攻略时用：normalize_tags 后，已有的标签换成 tags 表里的写法。"""
+
+    names = normalize_tags(names)
+    existing = _tags_by_key(db, names)
+    out = []
+    for name in names:
+        tag = existing.get(tag_key(name))
+        out.append(tag.name if tag is not None else name)
+    return out
+
+
+def parse_tag_filter(raw: Optional[str]) -> list[str]:
+    """查询参数 tag=a,b -> ["a", "b"]。"""
+
+    return normalize_tags((raw or "").split(","))
+
+
+# ---- tags 表计数 ----
+
+
+def article_tag_names(db: Session, article_id: int) -> list[str]:
+    return [
+        name
+        for (name,) in db.query(ArticleTag.tag_name)
+        .filter(ArticleTag.article_id == article_id)
+        .all()
+    ]
+
+
+def refresh_tag_counts(db: Session, names: Iterable[str]) -> None:
+    """按 article_tags 重算这些标签的已发布攻略数（不 commit，由调用方统一提交）。"""
+
+    names = normalize_tags(names)
+    if not names:
+        return
+    db.flush()
+    # 写入时已统一成 tags 表里的写法（resolve_tag_names）；老数据里存的是
+    # casefold 后的，一起查，结果一律按 tag_key 归并
+    keys = {tag_key(name): name for name in names}
+    lookup = list(dict.fromkeys(names + list(keys)))
+    counts: dict[str, int] = {}
+    for name, n in (
+        db.query(ArticleTag.tag_name, func.count(distinct(ArticleTag.article_id)))
+        .join(Article, Article.id == ArticleTag.article_id)
+        .filter(
+            ArticleTag.tag_name.in_(lookup),
+            Article.status == ArticleStatus.PUBLISHED,
+        )
+        .group_by(ArticleTag.tag_name)
+        .all()
+    ):
+        key = tag_key(name)
+        counts[key] = counts.get(key, 0) + n
+    existing = _tags_by_key(db, names)
+    for key, name in keys.items():
+        n = counts.get(key, 0)
+        tag = existing.get(key)
+        if tag is None:
+            if not n:
+                continue
+            tag = Tag(name=name, article_count=0)
+            db.add(tag)
+        if tag.article_count != n:
+            tag.article_count = n
+
+
+def popular_tags(db: Session, limit: int) -> list[tuple[str, int]]:
+    """使用最多的标签（只算已发布攻略），同数量按名字排。"""
+
+    return [
+        (name, n)
+        for name, n in db.query(Tag.name, Tag.article_count)
+        .filter(Tag.article_count > 0)
+        .order_by(Tag.article_count.desc(), Tag.name)
+        .limit(limit)
+        .all()
+    ]
+
+
+def rebuild_tag_counts(db: Session) -> int:
+    """全量重建 tags 表的计数，返回标签数。"""
+
+    names = [name for (name,) in db.query(ArticleTag.tag_name).distinct().all()]
+    names += [name for (name,) in db.query(Tag.name).all()]
+    names = normalize_tags(names)
+    # SQL Server 单条语句参数上限 2100，分批 IN
+    for start in range(0, len(names), 1000):
+        refresh_tag_counts(db, names[start : start + 1000])
+    db.commit()
+    return len(names)
+
+
+# ---- 位图索引 ----
+
+
+def _iter_bits(mask: int):
+    """从低位到高位依次给出置位的位置。"""
+
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class TagBitmapIndex:
+    """已发布攻略的标签 / 分类 / 精选位图；第 i 位 = 列表顺序里的第 i 篇。"""
+
+    def __init__(self, version: int):
+        self.version = version
+        self.ids: list[int] = []
+        self.all = 0
+        self.featured = 0
+        self.categories: dict[str, int] = {}
+        self.tags: dict[str, int] = {}
+
+    @classmethod
+    def load(cls, db: Session, version: int) -> "TagBitmapIndex":
+        index = cls(version)
+        featured: list[int] = []
+        categories: dict[str, list[int]] = {}
+        tags: dict[str, list[int]] = {}
+        # 文章和标签用一条 LEFT JOIN 一起读：分两次查询时，中间新发布的文章会
+        # 出现在标签结果里却没有编号
+        pos = -1
+        last_id = None
+        for article_id, is_featured, category, tag_name in (
+            db.query(
+                Article.id, Article.is_featured, Article.category, ArticleTag.tag_name
+            )
+            .outerjoin(ArticleTag, ArticleTag.article_id == Article.id)
+            .filter(Article.status == ArticleStatus.PUBLISHED)
+            .order_by(Article.created_at.desc(), Article.id.desc())
+            .all()
+        ):
+            if article_id != last_id:
+                last_id = article_id
+                pos = len(index.ids)
+                index.ids.append(article_id)
+                if is_featured:
+                    featured.append(pos)
+                category = category_key(category)
+                if category:
+                    categories.setdefault(category, []).append(pos)
+            name = tag_key(tag_name)
+            if name:
+                tags.setdefault(name, []).append(pos)
+
+        n = len(index.ids)
+        index.all = (1 << n) - 1
+        index.featured = cls._mask(featured, n)
+        index.categories = {k: cls._mask(v, n) for k, v in categories.items()}
+        index.tags = {k: cls._mask(v, n) for k, v in tags.items()}
+        return index
+
+    @staticmethod
+    def _mask(positions: list[int], n: int) -> int:
+        # 先在 bytearray 里置位再一次转成 int，比逐个 |= (1 << p) 快得多
+        buf = bytearray((n + 7) // 8)
+        for p in positions:
+            buf[p >> 3] |= 1 << (p & 7)
+        return int.from_bytes(buf, "little")
+
+    def select(
+        self,
+        tags: list[str],
+        mode: str = "and",
+        featured: bool = False,
+        category: Optional[str] = None,
+    ) -> int:
+        """筛选结果的位图；标签和分类按 tag_key / category_key 比较。"""
+
+        mask = self.all
+        if featured:
+            mask &= self.featured
+        category = category_key(category)
+        if category:
+            mask &= self.categories.get(category, 0)
+        if tags:
+            if mode == "or":
+                tag_mask = 0
+                for t in tags:
+                    tag_mask |= self.tags.get(tag_key(t), 0)
+            else:
+                tag_mask = self.all
+                for t in tags:
+                    tag_mask &= self.tags.get(tag_key(t), 0)
+            mask &= tag_mask
+        return mask
+
+    def page(self, mask: int, offset: int, limit: int) -> list[int]:
+        """位图里第 offset 个起的 limit 篇，按列表顺序返回文章 id。"""
+
+        return [self.ids[p] for p in islice(_iter_bits(mask), offset, offset + limit)]
+
+
+_lock = threading.Lock()
+_index: Optional[TagBitmapIndex] = None
+
+
+def get_tag_index(db: Session, version: Optional[int] = None) -> TagBitmapIndex:
+    """返回当前有效的位图索引；article_listing 版本号变化后第一次调用时重建。"""
+
+    global _index
+    if version is None:
+        version = read_counters(db, ARTICLE_LISTING)[0]
+    index = _index
+    if index is not None and index.version == version:
+        return index
+    with _lock:
+        if _index is None or _index.version != version:
+            _index = TagBitmapIndex.load(db, version)
+        return _index
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        n = rebuild_tag_counts(session)
+        print(f"标签计数重建完成：{n} 个标签")
+    finally:
+        session.close()
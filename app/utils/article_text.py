@@ -0,0 +1,109 @@
+"""攻略列表用的摘要 / 字数 / 阅读时长
+
+列表接口原来把每篇攻略的整段 HTML 正文（常常带内嵌图片）读出来，只为了截
+`content[:120]` 当摘要，截断处还可能落在标签中间。现在这些值在写入时算好存在
+articles 表上（excerpt / word_count / reading_minutes），列表查询不再读 content：
+
+- create_article / update_article 里调用 `fill_article_summary`
+- 老数据回填：`python -m app.utils.article_text`（迁移里也会回填一次）
+"""
+
+from __future__ import annotations
+
+import math
+import re
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.orm import Session
+
+from app.models import Article
+from app.utils.sanitize import html_to_text
+from app.utils.site_counters import ARTICLES, bump_counters
+
+# 摘要最多保留的字符数（纯文本，超出部分以 "..." 结尾）
+EXCERPT_LENGTH = 160
+# 阅读速度：每分钟多少字（中文按字、英文按词计）
+WORDS_PER_MINUTE = 400
+
+_CJK_CHAR_RE = re.compile(r"[㐀-䶿一-鿿豈-﫿]")
+_WORD_RE = re.compile(r"[^\W_㐀-䶿一-鿿豈-﫿]+")
+
+
+def summarize(html: str | None) -> tuple[str, int, int]:
+    """正文 HTML -> (纯文本摘要, 字数, 阅读分钟数)；有内容时阅读时长至少 1 分钟。"""
+
+    text = html_to_text(html)
+    if len(text) > EXCERPT_LENGTH:
+        excerpt = text[:EXCERPT_LENGTH].rstrip() + "..."
+    else:
+        excerpt = text
+    words = len(_CJK_CHAR_RE.findall(text)) + len(_WORD_RE.findall(text))
+    minutes = math.ceil(words / WORDS_PER_MINUTE) if words else 0
+    return excerpt, words, max(minutes, 1 if words else 0)
+
+
+def fill_article_summary(article: Article) -> None:
+    """按 article.content 重算摘要三件套（不 commit）。"""
+
+    article.excerpt, article.word_count, article.reading_minutes = summarize(
+        article.content
+    )
+
+
+def backfill_article_summaries(db: Session, batch_size: int = 200) -> int:
+    """重算所有攻略的摘要 / 字数 / 阅读时长，按 id 分批提交，返回处理的篇数。
+
+    用 Core 按主键批量 UPDATE，并显式保留 updated_at——回填不算编辑。
+    """
+
+    table = Article.__table__
+    stmt = (
+        update(table)
+        .where(table.c.id == bindparam("b_id"))
+        .values(
+            excerpt=bindparam("b_excerpt"),
+            word_count=bindparam("b_words"),
+            reading_minutes=bindparam("b_minutes"),
+            updated_at=table.c.updated_at,
+        )
+    )
+
+    done = 0
+    last_id = 0
+    while True:
+        rows = db.execute(
+            select(table.c.id, table.c.content)
+            .where(table.c.id > last_id)
+            .order_by(table.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        params = []
+        for article_id, content in rows:
+            excerpt, words, minutes = summarize(content)
+            params.append(
+                {
+                    "b_id": article_id,
+                    "b_excerpt": excerpt,
+                    "b_words": words,
+                    "b_minutes": minutes,
+                }
+            )
+        db.execute(stmt, params)
+        bump_counters(db, ARTICLES)
+        db.commit()
+        done += len(rows)
+        last_id = rows[-1].id
+    return done
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        n = backfill_article_summaries(session)
+        print(f"攻略摘要回填完成：{n} 篇")
+    finally:
+        session.close()
@@ -0,0 +1,221 @@
+"""攻略浏览数（写缓冲）
+
+每次打开攻略都 UPDATE 一次 articles，在 SQL Server 上热门攻略那一行的锁会被
+所有浏览请求抢。这里浏览只在进程内记一笔：
+
+- `record_view` 在内存字典里给这篇攻略 +1（加锁，只是一次字典操作）
+- 后台线程每 FLUSH_INTERVAL 秒把攻略 -> 增量整体换出来，一个事务里批量写入
+  article_views 表：已有的行 `view_count = view_count + 增量`，没有的行插入；
+  写入失败时增量放回缓冲，下一轮再试
+- 撞上完整性错误（多半是攻略在写入前被物理删除了，外键不通过）时，去掉已经不存在的
+  攻略再写一次，不让一个坏 id 卡住之后所有的写入；其它（暂时性的）错误把增量放回
+  缓冲，同一篇连续失败 MAX_RETRIES 次后丢弃
+- 应用关闭时再写一次，尽量不丢数
+
+多进程部署下每个进程各自缓冲、各自写入，增量相加不会互相覆盖。列表里的浏览数和
+按热度排序读的都是已写入的值，最多落后 FLUSH_INTERVAL 秒。
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.models import Article, ArticleView
+
+logger = logging.getLogger(__name__)
+
+# 后台写入间隔（秒）
+FLUSH_INTERVAL = 5.0
+# SQL Server 单条语句参数上限 2100，IN 查询分批
+_BATCH = 1000
+# 同一篇的增量连续写入失败多少次后丢弃
+MAX_RETRIES = 5
+
+_lock = threading.Lock()
+_pending: dict[int, int] = {}
+# 攻略 id -> 已连续失败的次数
+_retries: dict[int, int] = {}
+
+
+def record_view(article_id: int) -> None:
+    """记一次浏览（只写内存）。"""
+
+    with _lock:
+        _pending[article_id] = _pending.get(article_id, 0) + 1
+
+
+def pending_views(article_id: int) -> int:
+    """本进程里还没写入的浏览数。"""
+
+    with _lock:
+        return _pending.get(article_id, 0)
+
+
+def view_count(db: Session, article_id: int) -> int:
+    """详情页展示用：已写入的浏览数 + 本进程缓冲里的增量。"""
+
+    flushed = db.execute(
+        select(ArticleView.view_count).where(ArticleView.article_id == article_id)
+    ).scalar()
+    return int(flushed or 0) + pending_views(article_id)
+
+
+def _write(db: Session, deltas: dict[int, int]) -> None:
+    table = ArticleView.__table__
+    now = datetime.utcnow()
+    ids = list(deltas)
+    existing: set[int] = set()
+    for start in range(0, len(ids), _BATCH):
+        existing.update(
+            db.execute(
+                select(table.c.article_id).where(
+                    table.c.article_id.in_(ids[start : start + _BATCH])
+                )
+            ).scalars()
+        )
+
+    updates = [
+        {"b_id": aid, "b_delta": n, "b_now": now}
+        for aid, n in deltas.items()
+        if aid in existing
+    ]
+    inserts = [
+        {"article_id": aid, "view_count": n, "updated_at": now}
+        for aid, n in deltas.items()
+        if aid not in existing
+    ]
+    if updates:
+        db.execute(
+            update(table)
+            .where(table.c.article_id == bindparam("b_id"))
+            .values(
+                view_count=table.c.view_count + bindparam("b_delta"),
+                updated_at=bindparam("b_now"),
+            ),
+            updates,
+        )
+    if inserts:
+        db.execute(insert(table), inserts)
+
+
+def _existing_articles(db: Session, ids: list[int]) -> set[int]:
+    alive: set[int] = set()
+    for start in range(0, len(ids), _BATCH):
+        alive.update(
+            db.execute(
+                select(Article.id).where(Article.id.in_(ids[start : start + _BATCH]))
+            ).scalars()
+        )
+    return alive
+
+
+def _requeue(deltas: dict[int, int]) -> None:
+    """增量放回缓冲等下一轮；连续失败太多次的丢弃。"""
+
+    dropped = []
+    with _lock:
+        for aid, n in deltas.items():
+            tries = _retries.get(aid, 0) + 1
+            if tries > MAX_RETRIES:
+                _retries.pop(aid, None)
+                dropped.append(aid)
+                continue
+            _retries[aid] = tries
+            _pending[aid] = _pending.get(aid, 0) + n
+    if dropped:
+        logger.error("攻略浏览数连续 %d 次写入失败，丢弃：%s", MAX_RETRIES, dropped)
+
+
+def flush_views(db: Session) -> int:
+    """把缓冲里的增量写入 article_views 并提交，返回写入的攻略数。
+
+    - 完整性错误：去掉已经不存在的攻略（它们的增量直接丢弃），剩下的再写一次；
+      仍然失败（比如别的进程同时插入了同一篇的行）就按暂时性错误处理
+    - 其它错误：回滚，增量放回缓冲等下一轮（见 _requeue）
+    """
+
+    global _pending
+    with _lock:
+        deltas, _pending = _pending, {}
+    if not deltas:
+        return 0
+    try:
+        try:
+            _write(db, deltas)
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            alive = _existing_articles(db, list(deltas))
+            gone = [aid for aid in deltas if aid not in alive]
+            if gone:
+                logger.warning("攻略已不存在，丢弃它们的浏览数：%s", gone)
+                with _lock:
+                    for aid in gone:
+                        _retries.pop(aid, None)
+            deltas = {aid: n for aid, n in deltas.items() if aid in alive}
+            if deltas:
+                _write(db, deltas)
+                db.commit()
+    except SQLAlchemyError:
+        db.rollback()
+        _requeue(deltas)
+        logger.exception("写入攻略浏览数失败，%d 篇的增量留到下一轮", len(deltas))
+        return 0
+    with _lock:
+        for aid in deltas:
+            _retries.pop(aid, None)
+    return len(deltas)
+
+
+class _Flusher(threading.Thread):
+    def __init__(self, session_factory, interval: float):
+        super().__init__(name="article-views-flusher", daemon=True)
+        self.session_factory = session_factory
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            self.flush_once()
+
+    def flush_once(self) -> None:
+        db = self.session_factory()
+        try:
+            flush_views(db)
+        finally:
+            db.close()
+
+
+_flusher: Optional[_Flusher] = None
+
+
+def start_view_flusher(session_factory, interval: float = FLUSH_INTERVAL) -> None:
+    """启动后台写入线程（应用启动时调用，重复调用无效）。"""
+
+    global _flusher
+    if _flusher is not None and _flusher.is_alive():
+        return
+    _flusher = _Flusher(session_factory, interval)
+    _flusher.start()
+
+
+def stop_view_flusher(session_factory) -> None:
+    """停止后台线程并把剩下的增量写完（应用关闭时调用）。"""
+
+    global _flusher
+    flusher, _flusher = _flusher, None
+    if flusher is not None:
+        flusher.stopped.set()
+        flusher.join(timeout=FLUSH_INTERVAL)
+    db = session_factory()
+    try:
+        flush_views(db)
+    finally:
+        db.close()
@@ -0,0 +1,267 @@
+"""竞技场胜率分析（NumPy 向量化）
+
+`Card.arena_win_rates` 原来只是原样透传给前端。这里把全部卡牌的胜率读成一个
+N×T 的矩阵（每行一张卡，每列一个采样点，右对齐：最后一列是最新的数据，
+缺失用 NaN 填充），整体用 NumPy 计算：
+
+- 每张卡：最新胜率、均值、趋势斜率（对采样点序号做最小二乘，忽略 NaN）
+- 按职业 / 稀有度分组：最新胜率的分位数、均值，以及组内平均曲线的趋势斜率
+- 每张卡在“职业”和“职业 + 费用段”里的名次（胜率高的排前面）
+
+arena_win_rates 的几种存法都兼容：
+- 数字列表 `[52.1, 53.4, ...]`：按时间先后的胜率序列
+- 对象列表 `[{"win_rate": 52.1}, ...]`：取 win_rate / winrate / rate / value
+- 对象 `{"法师": 55.2, ...}`（按职业的胜率）：只有一个采样点，取本职业的值，
+  没有就取各职业平均
+
+结果（包括序列化好的 JSON）按 cards 数据版本号缓存，只在卡牌数据变化后重算；
+点评变化不影响胜率，不会触发重算。
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import threading
+from typing import Any, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.models import Card
+from app.utils.card_catalog import RARITY_ORDER
+from app.utils.site_counters import CARDS, read_counters
+
+PERCENTILES = (10, 25, 50, 75, 90)
+# 费用段：0..6 各自一段，7 费及以上合为一段
+MANA_BUCKETS = ("0", "1", "2", "3", "4", "5", "6", "7+")
+# 每张卡最多保留最近多少个采样点
+MAX_POINTS = 64
+
+_RATE_KEYS = ("win_rate", "winrate", "rate", "value")
+
+
+def _number(value: Any) -> float:
+    if isinstance(value, bool) or value is None:
+        return math.nan
+    try:
+        f = float(value)
+    except (TypeError, ValueError):
+        return math.nan
+    return f if math.isfinite(f) else math.nan
+
+
+def _series(raw: Any, card_class: Optional[str]) -> list[float]:
+    """arena_win_rates（任意一种存法）-> 按时间先后的胜率序列。"""
+
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except json.JSONDecodeError:
+            return []
+    if isinstance(raw, dict):
+        if card_class and card_class in raw:
+            return [_number(raw[card_class])]
+        values = [v for v in map(_number, raw.values()) if not math.isnan(v)]
+        return [sum(values) / len(values)] if values else []
+    if isinstance(raw, list):
+        out = []
+        for item in raw[-MAX_POINTS:]:
+            if isinstance(item, dict):
+                item = next((item[k] for k in _RATE_KEYS if k in item), None)
+            out.append(_number(item))
+        return out
+    return []
+
+
+def _round(values: np.ndarray, digits: int = 2) -> list[Optional[float]]:
+    return [None if math.isnan(v) else v for v in np.round(values, digits).tolist()]
+
+
+def _nanmean_rows(m: np.ndarray) -> np.ndarray:
+    """按行求 nanmean；全是 NaN 的行返回 NaN（不触发 RuntimeWarning）。"""
+
+    valid = ~np.isnan(m)
+    n = valid.sum(axis=1)
+    total = np.where(valid, m, 0.0).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(n > 0, total / np.maximum(n, 1), np.nan)
+
+
+def _slopes(m: np.ndarray) -> np.ndarray:
+    """每行对列序号做最小二乘的斜率（忽略 NaN）；有效点少于 2 个的为 NaN。"""
+
+    if m.shape[1] < 2:
+        return np.full(m.shape[0], np.nan)
+    valid = ~np.isnan(m)
+    w = valid.astype(float)
+    x = np.arange(m.shape[1], dtype=float)
+    y = np.where(valid, m, 0.0)
+    n = w.sum(axis=1)
+    sx = w @ x
+    sy = y.sum(axis=1)
+    sxx = w @ (x * x)
+    sxy = y @ x
+    denom = n * sxx - sx * sx
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slope = (n * sxy - sx * sy) / denom
+    return np.where((n >= 2) & (denom > 0), slope, np.nan)
+
+
+def _group_ranks(groups: np.ndarray, values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """组内名次（1 起，值大的在前，NaN 不参与排名）和组内有效卡牌数。"""
+
+    ranks = np.zeros(len(values), dtype=np.int64)
+    sizes = np.zeros(len(values), dtype=np.int64)
+    has = ~np.isnan(values)
+    idx = np.flatnonzero(has)
+    if not len(idx):
+        return ranks, sizes
+    g, v = groups[idx], values[idx]
+    # 先按组，再按胜率倒序；同组同值按原下标（即 id 序）稳定排列
+    order = np.lexsort((idx, -v, g))
+    g_sorted = g[order]
+    starts = np.flatnonzero(np.r_[True, g_sorted[1:] != g_sorted[:-1]])
+    counts = np.diff(np.r_[starts, len(order)])
+    pos = np.arange(len(order)) - np.repeat(starts, counts)
+    ranks[idx[order]] = pos + 1
+    sizes[idx[order]] = np.repeat(counts, counts)
+    return ranks, sizes
+
+
+def _group_summary(labels: list[str], codes: np.ndarray, m: np.ndarray, latest: np.ndarray) -> list[dict]:
+    out = []
+    for code, label in enumerate(labels):
+        rows = codes == code
+        vals = latest[rows]
+        vals = vals[~np.isnan(vals)]
+        item: dict = {
+            "value": label,
+            "count": int(rows.sum()),
+            "with_data": int(len(vals)),
+            "mean": None,
+            "percentiles": {f"p{p}": None for p in PERCENTILES},
+            "trend_slope": None,
+        }
+        if len(vals):
+            item["mean"] = round(float(vals.mean()), 2)
+            item["percentiles"] = dict(
+                zip(
+                    (f"p{p}" for p in PERCENTILES),
+                    _round(np.percentile(vals, PERCENTILES)),
+                )
+            )
+            # 组内平均曲线（每列对有数据的卡取均值）的斜率
+            curve = _nanmean_rows(m[rows].T)[None, :]
+            item["trend_slope"] = _round(_slopes(curve), 4)[0]
+        out.append(item)
+    return out
+
+
+class WinRateAnalytics:
+    def __init__(self, version: int, payload: dict):
+        self.version = version
+        self.payload = payload
+        self.body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode(
+            "utf-8"
+        )
+
+    @classmethod
+    def load(cls, db: Session, version: int) -> "WinRateAnalytics":
+        rows = (
+            db.query(
+                Card.id,
+                Card.card_class,
+                Card.rarity,
+                Card.mana_cost,
+                Card.arena_win_rates,
+            )
+            .order_by(Card.id.asc())
+            .all()
+        )
+        return cls(version, compute(rows))
+
+
+def compute(rows) -> dict:
+    """rows: (id, card_class, rarity, mana_cost, arena_win_rates) 序列。"""
+
+    n = len(rows)
+    series = [_series(r.arena_win_rates, r.card_class) for r in rows]
+    width = max((len(s) for s in series), default=0) or 1
+
+    # 右对齐填进矩阵：最后一列永远是最新的采样点
+    m = np.full((n, width), np.nan)
+    for i, s in enumerate(series):
+        if s:
+            m[i, width - len(s) :] = s
+
+    # 每行最后一个非 NaN 值 = 最新胜率
+    valid = ~np.isnan(m)
+    last = width - 1 - np.argmax(valid[:, ::-1], axis=1)
+    latest = np.where(valid.any(axis=1), m[np.arange(n), last], np.nan)
+    mean = _nanmean_rows(m)
+    slope = _slopes(m)
+
+    classes = sorted({r.card_class or "" for r in rows})
+    class_code = {c: i for i, c in enumerate(classes)}
+    rarities = sorted(
+        {r.rarity or "" for r in rows},
+        key=lambda v: (RARITY_ORDER.index(v) if v in RARITY_ORDER else len(RARITY_ORDER), v),
+    )
+    rarity_code = {c: i for i, c in enumerate(rarities)}
+
+    class_codes = np.fromiter((class_code[r.card_class or ""] for r in rows), np.int64, n)
+    rarity_codes = np.fromiter((rarity_code[r.rarity or ""] for r in rows), np.int64, n)
+    mana = np.fromiter((r.mana_cost or 0 for r in rows), np.int64, n)
+    bucket = np.clip(mana, 0, len(MANA_BUCKETS) - 1)
+
+    class_rank, class_size = _group_ranks(class_codes, latest)
+    bucket_rank, bucket_size = _group_ranks(class_codes * len(MANA_BUCKETS) + bucket, latest)
+
+    latest_r, mean_r, slope_r = _round(latest), _round(mean), _round(slope, 4)
+    cards = []
+    for i, r in enumerate(rows):
+        cards.append(
+            {
+                "id": r.id,
+                "card_class": r.card_class,
+                "rarity": r.rarity,
+                "mana_bucket": MANA_BUCKETS[bucket[i]],
+                "win_rate": latest_r[i],
+                "mean": mean_r[i],
+                "trend_slope": slope_r[i],
+                "class_rank": int(class_rank[i]) or None,
+                "class_size": int(class_size[i]),
+                "bucket_rank": int(bucket_rank[i]) or None,
+                "bucket_size": int(bucket_size[i]),
+            }
+        )
+
+    return {
+        "percentiles": list(PERCENTILES),
+        "classes": _group_summary(classes, class_codes, m, latest),
+        "rarities": _group_summary(rarities, rarity_codes, m, latest),
+        "cards": cards,
+    }
+
+
+_lock = threading.Lock()
+_analytics: Optional[WinRateAnalytics] = None
+
+
+def analytics_version(db: Session) -> int:
+    """胜率只取决于卡牌数据，用 cards 的版本号即可。"""
+    return read_counters(db, CARDS)[0]
+
+
+def get_win_rate_analytics(db: Session, version: Optional[int] = None) -> WinRateAnalytics:
+    global _analytics
+    if version is None:
+        version = analytics_version(db)
+    cur = _analytics
+    if cur is not None and cur.version == version:
+        return cur
+    with _lock:
+        if _analytics is None or _analytics.version != version:
+            _analytics = WinRateAnalytics.load(db, version)
+        return _analytics
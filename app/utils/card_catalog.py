@@ -0,0 +1,501 @@
+"""卡牌目录内存索引
+
+cards 表不大且很少变化，但卡牌页每点一次筛选都会发一条带 WHERE + ORDER BY 的
+SQL。这里把筛选 / 排序需要的列一次性读进进程内的紧凑列数组：
+
+- version / expansion / card_class / rarity 存成驻留后的整数编码（array('H')）
+- mana_cost / arena_score 存成 array('i')，均分存成 array('d')，NULL 另有标记
+- 每种 (sort_by, sort_order) 的全量排序结果按需计算并缓存，筛选只是顺序扫一遍
+
+排序规则与原先 list_cards 的 SQL 完全一致（包括 nulls_last 的写法）。字符串的
+先后顺序不在 Python 里比较，而是加载时让数据库按 name / card_class 排好序，
+记下名次——这样中文按数据库排序规则（如 SQL Server 的 Chinese_PRC 拼音序）排列，
+和原 SQL 的结果保持一致。同名时再用 id 兜底，保证分页稳定。
+
+名字搜索走同时构建的 n-gram / 拼音索引（app/utils/card_search.py）。
+
+卡牌 / 点评有改动时 site_counters 里的版本号会递增（见 app/utils/site_counters.py），
+下一次查询发现版本号变了就重新加载；多进程部署下也能及时失效。应用启动时会
+预热一次（见 app/main.py）。
+"""
+
+from __future__ import annotations
+
+import bisect
+import math
+import re
+import threading
+from array import array
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.models import Card, CardReviewStats
+from app.utils.card_search import CardSearchIndex
+from app.utils.game_versions import load_sort_keys, version_sort_key
+from app.utils.site_counters import CARDS, REVIEWS, read_counters
+
+SORT_MODES = ("class", "win", "mana", "score", "weighted")
+
+# 稀有度下拉框的固定顺序（与 cards.html 一致），未知的值排在后面
+RARITY_ORDER = ("免费", "普通", "稀有", "史诗", "传说")
+
+_YEAR_RE = re.compile(r"\((\d{4})\)")
+
+_NULL_INT = 0  # arena_score 为 NULL 时数组里的占位值，真正的判断看 _null 标记
+
+
+class _Interner:
+    """字符串 <-> 整数编码，编码 0 预留给 NULL / 空串。"""
+
+    def __init__(self):
+        self.values: list[Optional[str]] = [None]
+        self.codes: dict[Optional[str], int] = {None: 0}
+
+    def code(self, value: Optional[str]) -> int:
+        value = value or None
+        c = self.codes.get(value)
+        if c is None:
+            c = len(self.values)
+            self.codes[value] = c
+            self.values.append(value)
+        return c
+
+    def lookup(self, value: str) -> int:
+        """查询用：不存在的值返回 -1（不会命中任何行）。"""
+        return self.codes.get(value or None, -1)
+
+
+class CardCatalog:
+    def __init__(self, version: tuple[int, int]):
+        self.version = version
+
+        self.ids = array("i")
+        self.names: list[str] = []
+        self.mana = array("i")
+        self.arena_score = array("i")
+        self.arena_score_null = bytearray()
+        self.avg_score = array("d")  # NULL 用 nan 表示
+        self.weighted_score = array("d")  # 影响力加权均分，同上
+
+        self.versions = _Interner()
+        self.expansions = _Interner()
+        self.classes = _Interner()
+        self.rarities = _Interner()
+        self.version_codes = array("H")
+        self.expansion_codes = array("H")
+        self.class_codes = array("H")
+        self.rarity_codes = array("H")
+        self.class_rank = array("H")  # 职业编码 -> 数据库排序下的名次
+        # 版本编码 -> 所属 expansion 括号里的年份，如 '天马年 (2024)' -> 2024
+        self.version_year: dict[int, int] = {}
+        # 版本名 -> game_versions 登记表里的排序键（"29.10" 排在 "29.9" 后面）
+        self.version_sort_keys: dict[str, Optional[int]] = {}
+
+        self.pos_by_id: dict[int, int] = {}
+        self.search_index = CardSearchIndex(())
+        self._orders: dict[tuple[str, str], list[int]] = {}
+        self._ranks: dict[tuple[str, str], array] = {}
+        self._facets: dict[tuple, dict] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # ---------- 加载 ----------
+
+    @classmethod
+    def load(cls, db: Session, version: tuple[int, int]) -> "CardCatalog":
+        cat = cls(version)
+        # 按 name, id 加载：数组下标本身就是“按名字排序”的名次
+        rows = (
+            db.query(
+                Card.id,
+                Card.name,
+                Card.expansion,
+                Card.version,
+                Card.card_class,
+                Card.rarity,
+                Card.mana_cost,
+                Card.arena_score,
+                CardReviewStats.avg_score,
+                CardReviewStats.weighted_score,
+            )
+            .outerjoin(CardReviewStats, CardReviewStats.card_id == Card.id)
+            .order_by(Card.name.asc(), Card.id.asc())
+            .all()
+        )
+        for r in rows:
+            cat._append(r)
+        cat.search_index = CardSearchIndex(cat.names)
+        cat.version_sort_keys = load_sort_keys(db)
+
+        # 职业的先后同样交给数据库排序规则决定
+        class_rows = (
+            db.query(Card.card_class)
+            .distinct()
+            .order_by(Card.card_class.asc())
+            .all()
+        )
+        cat.class_rank = array("H", bytes(2 * len(cat.classes.values)))
+        for rank, (value,) in enumerate(class_rows):
+            code = cat.classes.lookup(value)
+            if code >= 0:
+                cat.class_rank[code] = rank
+        return cat
+
+    def _append(self, r) -> None:
+        self.pos_by_id[r.id] = len(self.ids)
+        self.ids.append(r.id)
+        name = r.name or ""
+        self.names.append(name)
+        self.mana.append(r.mana_cost or 0)
+        if r.arena_score is None:
+            self.arena_score.append(_NULL_INT)
+            self.arena_score_null.append(1)
+        else:
+            self.arena_score.append(r.arena_score)
+            self.arena_score_null.append(0)
+        self.avg_score.append(math.nan if r.avg_score is None else float(r.avg_score))
+        self.weighted_score.append(
+            math.nan if r.weighted_score is None else float(r.weighted_score)
+        )
+        vcode = self.versions.code(r.version)
+        self.version_codes.append(vcode)
+        if r.version:
+            m = _YEAR_RE.search(r.expansion or "")
+            year = int(m.group(1)) if m else 0
+            self.version_year[vcode] = max(year, self.version_year.get(vcode, 0))
+        self.expansion_codes.append(self.expansions.code(r.expansion))
+        self.class_codes.append(self.classes.code(r.card_class))
+        self.rarity_codes.append(self.rarities.code(r.rarity))
+
+    # ---------- 排序 ----------
+
+    def _sorted_positions(self, sort_by: str, sort_order: str) -> list[int]:
+        if sort_by not in SORT_MODES:
+            sort_by = "mana"
+        desc = sort_order.lower() == "desc"
+        key = (sort_by, "desc" if desc else "asc")
+        cached = self._orders.get(key)
+        if cached is not None:
+            return cached
+
+        # 下标已经是 (name, id) 的顺序；多次稳定排序：先排次要键，再排主键
+        # （reverse=True 仍然保持稳定，名字这个兜底键始终是正序）
+        pos = list(range(len(self.ids)))
+
+        if sort_by == "class":
+            mana = self.mana
+            pos.sort(key=lambda i: mana[i])
+            rank = self.class_rank
+            codes = self.class_codes
+            pos.sort(key=lambda i: rank[codes[i]], reverse=desc)
+        elif sort_by == "win":
+            pos = self._sort_nulls_last(
+                pos,
+                lambda i: self.arena_score_null[i] == 1,
+                lambda i: self.arena_score[i],
+                desc,
+            )
+        elif sort_by in ("score", "weighted"):
+            col = self._float_column(sort_by)
+            pos = self._sort_nulls_last(
+                pos,
+                lambda i: math.isnan(col[i]),
+                lambda i: col[i],
+                desc,
+            )
+        else:
+            mana = self.mana
+            pos.sort(key=lambda i: mana[i], reverse=desc)
+
+        self._orders[key] = pos
+        return pos
+
+    def _float_column(self, sort_by: str) -> array:
+        return self.weighted_score if sort_by == "weighted" else self.avg_score
+
+    @staticmethod
+    def _sort_nulls_last(pos, is_null, value, desc) -> list[int]:
+        """等价于 ORDER BY CASE WHEN x IS NULL THEN 1 ELSE 0 END, x ASC|DESC。"""
+        present = [i for i in pos if not is_null(i)]
+        missing = [i for i in pos if is_null(i)]
+        present.sort(key=value, reverse=desc)
+        return present + missing
+
+    def _rank_in_order(self, sort_by: str, sort_order: str) -> array:
+        """下标 -> 在该排序结果中的名次，用于游标定位（O(1)）。"""
+        if sort_by not in SORT_MODES:
+            sort_by = "mana"
+        key = (sort_by, "desc" if sort_order.lower() == "desc" else "asc")
+        cached = self._ranks.get(key)
+        if cached is None:
+            order = self._sorted_positions(sort_by, sort_order)
+            cached = array("i", bytes(4 * len(order)))
+            for rank, i in enumerate(order):
+                cached[i] = rank
+            self._ranks[key] = cached
+        return cached
+
+    def _mono_key(self, sort_by: str, desc: bool):
+        """排序结果在这个键上单调不减（名字兜底键除外），用于按值二分定位。"""
+        sign = -1 if desc else 1
+        if sort_by == "class":
+            rank, codes, mana = self.class_rank, self.class_codes, self.mana
+            return lambda i: (sign * rank[codes[i]], mana[i])
+        if sort_by == "win":
+            null, score = self.arena_score_null, self.arena_score
+            return lambda i: (1, 0) if null[i] else (0, sign * score[i])
+        if sort_by in ("score", "weighted"):
+            col = self._float_column(sort_by)
+            return lambda i: (1, 0.0) if math.isnan(col[i]) else (0, sign * col[i])
+        mana = self.mana
+        return lambda i: (sign * mana[i],)
+
+    # ---------- 游标 ----------
+
+    def cursor_values(self, i: int, sort_by: str) -> list:
+        """游标里保存的原始排序值（卡牌被删掉时用来按值重新定位）。"""
+        if sort_by == "class":
+            return [self.classes.values[self.class_codes[i]], self.mana[i]]
+        if sort_by == "win":
+            return [None if self.arena_score_null[i] else self.arena_score[i]]
+        if sort_by in ("score", "weighted"):
+            v = self._float_column(sort_by)[i]
+            return [None if math.isnan(v) else v]
+        return [self.mana[i]]
+
+    def _start_after(self, sort_by: str, sort_order: str, after_id: int, values: list) -> int:
+        """返回游标之后第一条记录在排序结果中的名次。"""
+        i = self.pos_by_id.get(after_id)
+        if i is not None:
+            return self._rank_in_order(sort_by, sort_order)[i] + 1
+
+        # 游标指向的卡牌已被删除：按排序值二分到同值分组的开头。名字的先后
+        # 由数据库排序规则决定，这里没法比较，宁可重复几张同值的卡也不漏卡
+        # （前端按 id 去重）
+        desc = sort_order.lower() == "desc"
+        sign = -1 if desc else 1
+        if sort_by == "class":
+            code = self.classes.lookup(values[0])
+            if code < 0:
+                return 0
+            target = (sign * self.class_rank[code], int(values[1]))
+        elif sort_by in ("win", "score", "weighted"):
+            target = (1, 0) if values[0] is None else (0, sign * values[0])
+        else:
+            target = (sign * int(values[0]),)
+        order = self._sorted_positions(sort_by, sort_order)
+        return bisect.bisect_left(order, target, key=self._mono_key(sort_by, desc))
+
+    # ---------- 查询 ----------
+
+    def _checks(
+        self,
+        version: Optional[str] = None,
+        expansion: Optional[str] = None,
+        card_class: Optional[str] = None,
+        rarity: Optional[str] = None,
+        search: Optional[str] = None,
+    ) -> list:
+        checks = []
+        if version:
+            code = self.versions.lookup(version)
+            codes = self.version_codes
+            checks.append(lambda i: codes[i] == code)
+        elif expansion:
+            code = self.expansions.lookup(expansion)
+            ecodes = self.expansion_codes
+            checks.append(lambda i: ecodes[i] == code)
+
+        if card_class:
+            ccode = self.classes.lookup(card_class)
+            ccodes = self.class_codes
+            checks.append(lambda i: ccodes[i] == ccode)
+
+        if rarity:
+            rcode = self.rarities.lookup(rarity)
+            rcodes = self.rarity_codes
+            checks.append(lambda i: rcodes[i] == rcode)
+
+        if search and search.strip():
+            # 名字子串 + 拼音 / 首字母，见 app/utils/card_search.py
+            matched = self.search_index.match(search)
+            checks.append(lambda i: i in matched)
+        return checks
+
+    def suggest(self, query: str, limit: int = 10) -> list[int]:
+        """输入联想：按相关度排好的下标。"""
+        return self.search_index.ranked(query, limit)
+
+    def filter_positions(
+        self,
+        sort_by: Optional[str] = "mana",
+        sort_order: str = "asc",
+        **filters,
+    ) -> list[int]:
+        checks = self._checks(**filters)
+        order = self._sorted_positions(sort_by or "mana", sort_order)
+        if not checks:
+            return order
+        return [i for i in order if all(check(i) for check in checks)]
+
+    def page(
+        self,
+        limit: int,
+        offset: int = 0,
+        after: Optional[tuple[int, list]] = None,
+        sort_by: Optional[str] = "mana",
+        sort_order: str = "asc",
+        **filters,
+    ) -> tuple[list[int], bool]:
+        """取一页下标，返回 (下标列表, 后面是否还有)。
+
+        - after=(card id, 排序值)：游标翻页，从该卡之后开始，代价与翻到第几页无关
+        - 否则按 offset 跳过
+        只扫描到凑够 limit + 1 条为止，不会把整个筛选结果物化出来。
+        """
+        sort_by = sort_by if sort_by in SORT_MODES else "mana"
+        order = self._sorted_positions(sort_by, sort_order)
+        checks = self._checks(**filters)
+
+        start = 0
+        skip = offset
+        if after is not None:
+            start = self._start_after(sort_by, sort_order, after[0], after[1])
+            skip = 0
+
+        result: list[int] = []
+        for r in range(start, len(order)):
+            i = order[r]
+            if checks and not all(check(i) for check in checks):
+                continue
+            if skip:
+                skip -= 1
+                continue
+            if len(result) == limit:
+                return result, True
+            result.append(i)
+        return result, False
+
+
+    # ---------- 分面计数 ----------
+
+    def _facet_order(self):
+        """三个下拉框的展示顺序：版本按年份倒序（同年按版本号倒序，逐段按数字比较，
+        与点评的“最新版本”共用 game_versions 的排序键），职业按数据库排序规则，
+        稀有度按 RARITY_ORDER。"""
+
+        def version_order(c):
+            name = self.versions.values[c]
+            key = self.version_sort_keys.get(name)
+            if key is None:
+                key = version_sort_key(name)
+            return (self.version_year.get(c, 0), key is not None, key or 0, name)
+
+        versions = sorted(
+            range(1, len(self.versions.values)), key=version_order, reverse=True
+        )
+        classes = sorted(
+            range(1, len(self.classes.values)), key=lambda c: self.class_rank[c]
+        )
+        known = {v: n for n, v in enumerate(RARITY_ORDER)}
+        rarities = sorted(
+            range(1, len(self.rarities.values)),
+            key=lambda c: (
+                known.get(self.rarities.values[c], len(known)),
+                self.rarities.values[c],
+            ),
+        )
+        return versions, classes, rarities
+
+    def facets(
+        self,
+        version: Optional[str] = None,
+        expansion: Optional[str] = None,
+        card_class: Optional[str] = None,
+        rarity: Optional[str] = None,
+        search: Optional[str] = None,
+    ) -> dict:
+        """版本 / 职业 / 稀有度各自的卡牌数，一次扫描算完。
+
+        每个维度的计数忽略它自己的筛选、只应用其他维度的筛选（常见的分面写法），
+        这样下拉框里切换选项时能看到每个选项会命中多少张卡。结果按参数缓存在
+        当前这份目录上，目录重载后自然失效。
+        """
+        key = (version, None if version else expansion, card_class, rarity, search)
+        cached = self._facets.get(key)
+        if cached is not None:
+            return cached
+
+        dim_checks = self._checks(version=version, expansion=expansion)
+        class_checks = self._checks(card_class=card_class)
+        rarity_checks = self._checks(rarity=rarity)
+        search_checks = self._checks(search=search)
+
+        v_count = [0] * len(self.versions.values)
+        c_count = [0] * len(self.classes.values)
+        r_count = [0] * len(self.rarities.values)
+        vcodes, ccodes, rcodes = self.version_codes, self.class_codes, self.rarity_codes
+
+        for i in range(len(self.ids)):
+            if search_checks and not search_checks[0](i):
+                continue
+            pv = not dim_checks or dim_checks[0](i)
+            pc = not class_checks or class_checks[0](i)
+            pr = not rarity_checks or rarity_checks[0](i)
+            if pc and pr:
+                v_count[vcodes[i]] += 1
+            if pv and pr:
+                c_count[ccodes[i]] += 1
+            if pv and pc:
+                r_count[rcodes[i]] += 1
+
+        versions, classes, rarities = self._facet_order()
+        result = {
+            "versions": [
+                {"value": self.versions.values[c], "count": v_count[c]}
+                for c in versions
+            ],
+            "classes": [
+                {"value": self.classes.values[c], "count": c_count[c]}
+                for c in classes
+            ],
+            "rarities": [
+                {"value": self.rarities.values[c], "count": r_count[c]}
+                for c in rarities
+            ],
+        }
+        if len(self._facets) >= 256:
+            self._facets.clear()
+        self._facets[key] = result
+        return result
+
+
+# ---------- 进程内单例 + 失效 ----------
+
+_lock = threading.Lock()
+_catalog: Optional[CardCatalog] = None
+
+
+def catalog_version(db: Session) -> tuple[int, int]:
+    """目录依赖卡牌和点评均分，两个数据版本号一起决定它是否过期。"""
+    return read_counters(db, CARDS, REVIEWS)
+
+
+def get_catalog(db: Session, version: Optional[tuple[int, int]] = None) -> CardCatalog:
+    """返回当前有效的目录索引；数据版本号变化后第一次调用时重新加载。
+
+    版本号存在数据库里（site_counters），别的进程写了卡牌 / 点评这里也能发现。
+    调用方已经读过版本号（比如算 ETag）时直接传进来，省一次查询。
+    """
+    global _catalog
+    if version is None:
+        version = catalog_version(db)
+    cat = _catalog
+    if cat is not None and cat.version == version:
+        return cat
+    with _lock:
+        if _catalog is None or _catalog.version != version:
+            _catalog = CardCatalog.load(db, version)
+        return _catalog
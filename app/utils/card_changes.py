@@ -0,0 +1,141 @@
+"""卡牌增量同步（变更序号 + 墓碑）
+
+前端把卡牌存在 IndexedDB 里，再次打开卡牌页时只需要问一句“序号 N 之后变了什么”，
+而不是重新下载整页整页的数据：
+
+- 每个写入卡牌的事务从 site_counters 的 card_changes 取一个新序号，
+  写进这次改动过的所有卡牌的 cards.change_seq / updated_at
+- 卡牌的点评聚合（均分、热门短评）变化也算卡牌变化，因为它们在 CardOut 里
+- 删除的卡牌留一条墓碑（card_tombstones），带删除时的序号
+
+序号的递增和 change_seq 的写入都在 Session 事件里完成，与业务写入同一事务，
+业务代码不需要手动调用。Core 批量写入（卡牌导入）自己调用 next_change_seq。
+
+site_counters 的那一行在事务提交前一直被锁着，所以写卡牌的事务是串行拿序号的：
+客户端拿到序号 N 时，不会再有序号 ≤ N 的改动后提交。
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import and_, event, insert, or_, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.models import Card, CardReviewStats, CardTombstone
+from app.utils.site_counters import CARD_CHANGES, next_value, read_counters
+
+
+def next_change_seq(db: Session) -> int:
+    return next_value(db, CARD_CHANGES)
+
+
+def current_change_seq(db: Session) -> int:
+    return read_counters(db, CARD_CHANGES)[0]
+
+
+@event.listens_for(Session, "after_flush")
+def _track_card_changes(session: Session, flush_context) -> None:
+    # after_flush 里 new / dirty / deleted 仍是 flush 前的状态
+    changed: dict[int, Optional[Card]] = {}
+    deleted: list[Card] = []
+
+    for obj in session.new:
+        if isinstance(obj, Card):
+            changed[obj.id] = obj
+        elif isinstance(obj, CardReviewStats):
+            changed.setdefault(obj.card_id, None)
+    for obj in session.dirty:
+        if not session.is_modified(obj, include_collections=False):
+            continue
+        if isinstance(obj, Card):
+            changed[obj.id] = obj
+        elif isinstance(obj, CardReviewStats):
+            changed.setdefault(obj.card_id, None)
+    for obj in session.deleted:
+        if isinstance(obj, Card):
+            deleted.append(obj)
+        elif isinstance(obj, CardReviewStats):
+            changed.setdefault(obj.card_id, None)
+
+    for card in deleted:
+        changed.pop(card.id, None)
+    changed.pop(None, None)
+    if not changed and not deleted:
+        return
+
+    seq = next_change_seq(session)
+    now = datetime.utcnow()
+    conn = session.connection()
+    table = Card.__table__
+    if changed:
+        # 直接走 Core，不把 Card 再标成 dirty（否则会再触发一次 flush 事件）
+        conn.execute(
+            update(table)
+            .where(table.c.id.in_(list(changed)))
+            .values(change_seq=seq, updated_at=now)
+        )
+        for card in changed.values():
+            if card is not None:
+                set_committed_value(card, "change_seq", seq)
+                set_committed_value(card, "updated_at", now)
+    if deleted:
+        conn.execute(
+            insert(CardTombstone.__table__),
+            [
+                {
+                    "id": card.id,
+                    "card_id": card.card_id,
+                    "deleted_seq": seq,
+                    "deleted_at": now,
+                }
+                for card in deleted
+            ],
+        )
+
+
+def changes_since(
+    db: Session, since: int, limit: int, after_id: Optional[int] = None
+) -> tuple[int, Optional[int], list[int], list[int], bool]:
+    """返回 (新的序号, 新的 after_id, 有变化的卡牌 id, 已删除的卡牌 id, 是否还有更多)。
+
+    按 (change_seq, id) 分页，每页最多 limit 张卡。一页截在某个序号中间时返回
+    after_id = 这一页最后一张卡的 id，客户端下次带上 since=seq&after_id=...，
+    只接着拉这个序号里 id 更大的卡；after_id 为空表示序号 seq 之前的改动都已拉完。
+    （迁移把老数据都记成序号 1，首次同步这一组就是整个卡牌库。）
+    """
+
+    # 先读当前序号再查数据：期间新提交的改动最多在下一次被重复返回，不会漏
+    current = current_change_seq(db)
+    if since >= current and after_id is None:
+        return current, None, [], [], False
+
+    cond = Card.change_seq > since
+    if after_id is not None:
+        cond = or_(cond, and_(Card.change_seq == since, Card.id > after_id))
+    rows = (
+        db.query(Card.id, Card.change_seq)
+        .filter(cond)
+        .order_by(Card.change_seq.asc(), Card.id.asc())
+        .limit(limit + 1)
+        .all()
+    )
+    upto, next_after, has_more = max(current, since), None, False
+    if len(rows) > limit:
+        nxt = rows[limit]
+        rows = rows[:limit]
+        upto, has_more = rows[-1].change_seq, True
+        # 下一条还是同一个序号：这一组没拉完，记下位置
+        if nxt.change_seq == upto:
+            next_after = rows[-1].id
+
+    deleted = [
+        r.id
+        for r in db.query(CardTombstone.id)
+        .filter(CardTombstone.deleted_seq > since, CardTombstone.deleted_seq <= upto)
+        .order_by(CardTombstone.deleted_seq.asc(), CardTombstone.id.asc())
+        .all()
+    ]
+    return upto, next_after, [r.id for r in rows], deleted, has_more
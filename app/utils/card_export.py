@@ -0,0 +1,149 @@
+"""卡牌目录导出（NDJSON / CSV，流式）
+
+分析同学以前用 `page_size=200` 一页页扒 /api/cards，几十个请求，每次还要重新
+算一遍均分。这里用一条查询把卡牌 + 物化的点评聚合（card_review_stats）一起取出，
+`stream_results` + `yield_per` 让数据库驱动用服务端游标分批取数，
+边取边编码边写给客户端，内存占用与目录大小无关。
+
+注意：FastAPI 0.106 起 yield 依赖（get_db）会在响应开始发送之前就清理掉，
+所以生成器里自己开 / 关 Session，不能用请求里注入的那个。
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import json
+from typing import Iterator, Optional
+
+from app.database import SessionLocal
+from app.models import Card, CardReviewStats
+
+FORMATS = ("ndjson", "csv")
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson; charset=utf-8",
+    "csv": "text/csv; charset=utf-8",
+}
+
+# 每次从游标取多少行；同时也是每次写给客户端的行数
+CHUNK_SIZE = 500
+
+COLUMNS = (
+    "id",
+    "card_id",
+    "name",
+    "expansion",
+    "mana_cost",
+    "card_class",
+    "rarity",
+    "version",
+    "pic",
+    "description",
+    "arena_score",
+    "arena_win_rates",
+    "average_score",
+    "weighted_score",
+    "review_count",
+)
+
+
+# 导出列 -> 查询列；最后三列来自点评聚合
+_SOURCES = {
+    "id": Card.id,
+    "card_id": Card.card_id,
+    "name": Card.name,
+    "expansion": Card.expansion,
+    "mana_cost": Card.mana_cost,
+    "card_class": Card.card_class,
+    "rarity": Card.rarity,
+    "version": Card.version,
+    "pic": Card.pic,
+    "description": Card.description,
+    "arena_score": Card.arena_score,
+    "arena_win_rates": Card.arena_win_rates,
+    "average_score": CardReviewStats.avg_score.label("average_score"),
+    "weighted_score": CardReviewStats.weighted_score,
+    "review_count": CardReviewStats.review_count,
+}
+_STATS_COLUMNS = ("average_score", "weighted_score", "review_count")
+
+
+def _query(db, columns, version, expansion, card_class, rarity):
+    # 只 SELECT 要导出的列；不需要点评聚合就不 JOIN
+    q = db.query(*(_SOURCES[c] for c in columns))
+    if any(c in _STATS_COLUMNS for c in columns):
+        q = q.outerjoin(CardReviewStats, CardReviewStats.card_id == Card.id)
+    # 与 list_cards 相同：version 优先，没传才看 expansion
+    if version:
+        q = q.filter(Card.version == version)
+    elif expansion:
+        q = q.filter(Card.expansion == expansion)
+    if card_class:
+        q = q.filter(Card.card_class == card_class)
+    if rarity:
+        q = q.filter(Card.rarity == rarity)
+    return (
+        q.order_by(Card.id.asc())
+        .execution_options(stream_results=True)
+        .yield_per(CHUNK_SIZE)
+    )
+
+
+def _record(r) -> dict:
+    d = dict(r._mapping)
+    if "review_count" in d:
+        d["review_count"] = d["review_count"] or 0
+    return d
+
+
+def iter_export(
+    fmt: str,
+    version: Optional[str] = None,
+    expansion: Optional[str] = None,
+    card_class: Optional[str] = None,
+    rarity: Optional[str] = None,
+    only_ids: Optional[set[int]] = None,
+    columns: tuple = COLUMNS,
+) -> Iterator[bytes]:
+    """按 id 顺序逐块产出编码好的字节。
+
+    only_ids：名字搜索（拼音 / 首字母）在 SQL 里做不了，由调用方用目录的搜索索引
+    算出命中的 id 集合传进来，这里边读边过滤。
+    columns：要导出的列（COLUMNS 的子集，需含 id）。
+    """
+
+    db = SessionLocal()
+    try:
+        buf = io.StringIO()
+        writer = None
+        if fmt == "csv":
+            # 带 BOM，Excel 直接打开中文不乱码
+            buf.write("\ufeff")
+            writer = csv.DictWriter(buf, fieldnames=columns, lineterminator="\n")
+            writer.writeheader()
+
+        pending = 0
+        for r in _query(db, columns, version, expansion, card_class, rarity):
+            if only_ids is not None and r.id not in only_ids:
+                continue
+            rec = _record(r)
+            if writer is not None:
+                if "arena_win_rates" in rec:
+                    wr = rec["arena_win_rates"]
+                    rec["arena_win_rates"] = (
+                        "" if wr is None else json.dumps(wr, ensure_ascii=False)
+                    )
+                writer.writerow(rec)
+            else:
+                buf.write(json.dumps(rec, ensure_ascii=False, default=str))
+                buf.write("\n")
+            pending += 1
+            if pending >= CHUNK_SIZE:
+                yield buf.getvalue().encode("utf-8")
+                buf.seek(0)
+                buf.truncate()
+                pending = 0
+        if buf.tell():
+            yield buf.getvalue().encode("utf-8")
+    finally:
+        db.close()
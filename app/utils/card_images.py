@@ -0,0 +1,402 @@
+"""卡牌图片衍生图（缩略图 / WebP / 精灵图）
+
+卡牌网格原来直接加载 `Card.pic` 指向的原图，一张一张下，又大又慢。这里离线生成：
+
+- 每张卡按固定宽度（THUMB_WIDTHS）缩放，各出一份 WebP 和 JPEG
+- 文件名带源图内容哈希：`cards/thumbs/<卡牌id>-<宽度>w-<哈希>.webp`，
+  源图变了文件名就变，静态文件可以放心长缓存
+- 每个版本（cards.version）拼一张精灵图（最小宽度的缩略图），
+  附一个 JSON 图集记录每张卡在图上的位置
+- 结果写进 `cards/manifest.json`；重跑时源图哈希没变、产物还在的卡直接跳过，
+  精灵图也只在该版本的卡牌集合 / 源图有变化时重建
+- http(s) 外链源图在 manifest 里记下 URL + ETag / Last-Modified，重跑时发条件请求，
+  对方回 304 就不再下载
+
+缩放在进程池里并行做（Pillow 是 CPU 密集型的，线程帮不上忙）。
+
+CardOut 的 thumb / srcset 就是从 manifest 查出来的（进程内缓存，文件变了自动重读）；
+没生成过缩略图的卡这两个字段为 None，前端回退到 pic。
+
+命令行用法：
+    python -m app.utils.card_images --workers 4
+    python -m app.utils.card_images --force   # 忽略缓存全部重做
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+try:
+    from PIL import Image  # type: ignore
+except Exception:  # pragma: no cover - 依赖缺失时只能查询，不能生成
+    Image = None
+
+BASE_DIR = Path(__file__).resolve().parent.parent  # app/
+STATIC_DIR = BASE_DIR / "static"
+OUTPUT_DIR = STATIC_DIR / "cards"
+THUMB_DIR = OUTPUT_DIR / "thumbs"
+SPRITE_DIR = OUTPUT_DIR / "sprites"
+MANIFEST_PATH = OUTPUT_DIR / "manifest.json"
+STATIC_URL = "/static"
+
+THUMB_WIDTHS = (160, 320, 480)
+# 网格默认显示的宽度（thumb 字段用这一档的 JPEG 做兜底）
+DEFAULT_WIDTH = 320
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+SPRITE_COLUMNS = 16
+# 改了缩放 / 编码参数时加一，让所有产物重新生成
+PIPELINE_VERSION = 1
+
+FETCH_TIMEOUT = 15
+
+
+def _url(path: Path) -> str:
+    return f"{STATIC_URL}/{path.relative_to(STATIC_DIR).as_posix()}"
+
+
+def _path(url: str) -> Path:
+    return STATIC_DIR / url[len(STATIC_URL) + 1 :]
+
+
+def _slug(value: Optional[str]) -> str:
+    return re.sub(r"[^0-9A-Za-z._-]+", "_", value or "none").strip("_") or "none"
+
+
+def _read_source(
+    pic: str, remote: Optional[dict] = None
+) -> tuple[Optional[bytes], dict]:
+    """pic 可以是站内 /static/... 路径，也可以是 http(s) 外链。
+
+    返回 (源图内容, 外链的缓存校验头)。remote 是上一次记下的校验头：外链据此发
+    条件请求，对方回 304 时内容返回 None。
+    """
+
+    if pic.startswith(STATIC_URL + "/"):
+        path = _path(pic).resolve()
+        if STATIC_DIR.resolve() not in path.parents:
+            raise ValueError(f"非法路径：{pic}")
+        return path.read_bytes(), {}
+    if pic.startswith(("http://", "https://")):
+        req = urllib.request.Request(pic)
+        remote = remote or {}
+        if remote.get("etag"):
+            req.add_header("If-None-Match", remote["etag"])
+        if remote.get("last_modified"):
+            req.add_header("If-Modified-Since", remote["last_modified"])
+        try:
+            with urllib.request.urlopen(req, timeout=FETCH_TIMEOUT) as resp:
+                data = resp.read()
+                headers = resp.headers
+        except urllib.error.HTTPError as exc:
+            if exc.code == 304 and remote:
+                return None, remote
+            raise
+        validators = {
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+        }
+        return data, {k: v for k, v in validators.items() if v}
+    raise ValueError(f"不支持的图片地址：{pic}")
+
+
+def _source_hash(data: bytes) -> str:
+    h = hashlib.sha1(data)
+    h.update(f"|v{PIPELINE_VERSION}|{THUMB_WIDTHS}".encode())
+    return h.hexdigest()[:12]
+
+
+def _resize(img, width: int):
+    if img.width <= width:
+        return img.copy()
+    height = max(1, round(img.height * width / img.width))
+    return img.resize((width, height), Image.LANCZOS)
+
+
+def _render(job: dict) -> dict:
+    """进程池里执行：读源图 -> 判断是否需要重做 -> 各宽度的 WebP / JPEG。"""
+
+    card_id, pic, prev = job["id"], job["pic"], job.get("prev") or {}
+    reusable = (
+        not job.get("force")
+        and prev.get("pic") == pic
+        and all(_path(u).exists() for u in _entry_urls(prev))
+    )
+    try:
+        data, remote = _read_source(pic, prev.get("remote") if reusable else None)
+    except Exception as exc:
+        return {"id": card_id, "status": "failed", "error": str(exc)}
+    if data is None:
+        # 外链没变（304），沿用上一次的产物
+        return {"id": card_id, "status": "unchanged", "entry": prev}
+
+    digest = _source_hash(data)
+    if reusable and prev.get("source_hash") == digest:
+        entry = {**prev, "remote": remote} if remote else prev
+        return {"id": card_id, "status": "unchanged", "entry": entry}
+
+    try:
+        img = Image.open(io.BytesIO(data))
+        img.load()
+    except Exception as exc:
+        return {"id": card_id, "status": "failed", "error": f"无法解析图片：{exc}"}
+    img = img.convert("RGBA")
+
+    entry = {"pic": pic, "source_hash": digest, "webp": {}, "jpg": {}, "size": {}}
+    if remote:
+        entry["remote"] = remote
+    for width in THUMB_WIDTHS:
+        thumb = _resize(img, width)
+        stem = f"{card_id}-{width}w-{digest}"
+
+        webp_path = THUMB_DIR / f"{stem}.webp"
+        thumb.save(webp_path, "WEBP", quality=WEBP_QUALITY, method=4)
+
+        # JPEG 没有透明通道：铺在白底上
+        flat = Image.new("RGB", thumb.size, (255, 255, 255))
+        flat.paste(thumb, mask=thumb.getchannel("A"))
+        jpg_path = THUMB_DIR / f"{stem}.jpg"
+        flat.save(jpg_path, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+
+        entry["webp"][str(width)] = _url(webp_path)
+        entry["jpg"][str(width)] = _url(jpg_path)
+        entry["size"][str(width)] = list(thumb.size)
+    return {"id": card_id, "status": "rendered", "entry": entry}
+
+
+def _entry_urls(entry: dict) -> list[str]:
+    return [u for fmt in ("webp", "jpg") for u in (entry.get(fmt) or {}).values()]
+
+
+def _build_sprite(version: Optional[str], members: list[tuple[int, dict]]) -> dict:
+    """把同一版本的最小宽度缩略图拼成一张 WebP，返回图集信息。"""
+
+    width = str(THUMB_WIDTHS[0])
+    cell_w = max(e["size"][width][0] for _, e in members)
+    cell_h = max(e["size"][width][1] for _, e in members)
+    cols = min(SPRITE_COLUMNS, len(members))
+    rows = (len(members) + cols - 1) // cols
+
+    sheet = Image.new("RGBA", (cols * cell_w, rows * cell_h), (0, 0, 0, 0))
+    frames = {}
+    for i, (card_id, entry) in enumerate(members):
+        x, y = (i % cols) * cell_w, (i // cols) * cell_h
+        with Image.open(_path(entry["webp"][width])) as thumb:
+            sheet.paste(thumb.convert("RGBA"), (x, y))
+        w, h = entry["size"][width]
+        frames[str(card_id)] = {"x": x, "y": y, "w": w, "h": h}
+
+    buf = io.BytesIO()
+    sheet.save(buf, "WEBP", quality=WEBP_QUALITY, method=4)
+    data = buf.getvalue()
+    digest = hashlib.sha1(data).hexdigest()[:12]
+    stem = f"{_slug(version)}-{digest}"
+
+    image_path = SPRITE_DIR / f"{stem}.webp"
+    image_path.write_bytes(data)
+    atlas = {
+        "version": version,
+        "image": _url(image_path),
+        "width": sheet.width,
+        "height": sheet.height,
+        "frames": frames,
+    }
+    atlas_path = SPRITE_DIR / f"{stem}.json"
+    atlas_path.write_text(json.dumps(atlas, ensure_ascii=False), encoding="utf-8")
+    return {"image": atlas["image"], "atlas": _url(atlas_path)}
+
+
+def _load_manifest() -> dict:
+    try:
+        return json.loads(MANIFEST_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_manifest(manifest: dict) -> None:
+    tmp = MANIFEST_PATH.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(manifest, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, MANIFEST_PATH)
+
+
+def build_card_images(db, workers: Optional[int] = None, force: bool = False) -> dict:
+    """生成 / 更新全部卡牌的缩略图和精灵图，返回各状态的计数。"""
+
+    if Image is None:
+        raise RuntimeError("需要安装 Pillow 才能生成卡牌缩略图")
+
+    from app.models import Card
+
+    THUMB_DIR.mkdir(parents=True, exist_ok=True)
+    SPRITE_DIR.mkdir(parents=True, exist_ok=True)
+
+    old = _load_manifest()
+    old_cards = old.get("cards") or {}
+    cards = (
+        db.query(Card.id, Card.pic, Card.version)
+        .filter(Card.pic.isnot(None), Card.pic != "")
+        .order_by(Card.id.asc())
+        .all()
+    )
+    jobs = []
+    for c in cards:
+        prev = old_cards.get(str(c.id))
+        if prev and prev.get("pic") != c.pic:
+            prev = None
+        jobs.append({"id": c.id, "pic": c.pic, "prev": prev, "force": force})
+
+    counts = {"rendered": 0, "unchanged": 0, "failed": 0, "sprites": 0}
+    errors: list[str] = []
+    new_cards: dict[str, dict] = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for result in pool.map(_render, jobs, chunksize=8):
+            counts[result["status"]] += 1
+            if result["status"] == "failed":
+                errors.append(f"卡牌 {result['id']}：{result['error']}")
+                prev = old_cards.get(str(result["id"]))
+                if prev:
+                    # 源图暂时取不到时保留上一次的产物
+                    new_cards[str(result["id"])] = prev
+            else:
+                new_cards[str(result["id"])] = result["entry"]
+
+    # 按版本分组拼精灵图；组内成员和源图哈希都没变就沿用上一次的
+    old_sprites = old.get("sprites") or {}
+    groups: dict[Optional[str], list[tuple[int, dict]]] = {}
+    for c in cards:
+        entry = new_cards.get(str(c.id))
+        if entry:
+            groups.setdefault(c.version, []).append((c.id, entry))
+    sprites = {}
+    for version, members in groups.items():
+        key = hashlib.sha1(
+            json.dumps([(cid, e["source_hash"]) for cid, e in members]).encode()
+        ).hexdigest()[:12]
+        name = version or ""
+        prev = old_sprites.get(name)
+        if (
+            not force
+            and prev
+            and prev.get("key") == key
+            and _path(prev["image"]).exists()
+            and _path(prev["atlas"]).exists()
+        ):
+            sprites[name] = prev
+            continue
+        sprites[name] = {"key": key, **_build_sprite(version, members)}
+        counts["sprites"] += 1
+
+    _write_manifest(
+        {
+            "widths": list(THUMB_WIDTHS),
+            "default_width": DEFAULT_WIDTH,
+            "cards": new_cards,
+            "sprites": sprites,
+        }
+    )
+    _cleanup(new_cards, sprites)
+    counts["errors"] = errors
+    return counts
+
+
+def _cleanup(cards: dict, sprites: dict) -> None:
+    """删掉 manifest 里已经不再引用的旧文件。"""
+
+    keep = {_path(u) for e in cards.values() for u in _entry_urls(e)}
+    keep |= {_path(s[k]) for s in sprites.values() for k in ("image", "atlas")}
+    for folder in (THUMB_DIR, SPRITE_DIR):
+        for path in folder.iterdir():
+            if path.is_file() and path not in keep:
+                path.unlink()
+
+
+# ---------- 查询（接口用） ----------
+
+_lock = threading.Lock()
+_manifest: dict = {}
+_manifest_mtime: Optional[float] = None
+
+
+def _current_manifest() -> dict:
+    global _manifest, _manifest_mtime
+    try:
+        mtime = MANIFEST_PATH.stat().st_mtime
+    except OSError:
+        return {}
+    if mtime != _manifest_mtime:
+        with _lock:
+            if mtime != _manifest_mtime:
+                _manifest = _load_manifest()
+                _manifest_mtime = mtime
+    return _manifest
+
+
+def images_version() -> Optional[float]:
+    """manifest 的修改时间；重新生成缩略图后变化，接口算 ETag 时带上。"""
+
+    _current_manifest()
+    return _manifest_mtime
+
+
+def card_thumbs(card_id: int) -> tuple[Optional[str], Optional[str]]:
+    """(thumb, srcset)：thumb 是默认宽度的 JPEG，srcset 是各宽度的 WebP。
+
+    源图比某一档窄时那一档不会放大，srcset 里写实际宽度；实际宽度相同的几档只留一个。
+    """
+
+    entry = (_current_manifest().get("cards") or {}).get(str(card_id))
+    if not entry:
+        return None, None
+    thumb = entry["jpg"].get(str(DEFAULT_WIDTH))
+    sizes = entry.get("size") or {}
+    candidates: dict[int, str] = {}
+    for w, url in entry["webp"].items():
+        actual = (sizes.get(w) or [int(w)])[0]
+        candidates.setdefault(actual, url)
+    srcset = ", ".join(f"{url} {w}w" for w, url in candidates.items())
+    return thumb, srcset or None
+
+
+def sprite_atlases() -> dict[str, dict]:
+    """版本 -> {image, atlas}，前端网格按版本加载精灵图用。"""
+
+    return {
+        version: {"image": s["image"], "atlas": s["atlas"]}
+        for version, s in (_current_manifest().get("sprites") or {}).items()
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="生成卡牌缩略图 / 精灵图")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--force", action="store_true", help="忽略缓存全部重做")
+    args = parser.parse_args()
+
+    session = SessionLocal()
+    started = time.perf_counter()
+    try:
+        result = build_card_images(session, workers=args.workers, force=args.force)
+    finally:
+        session.close()
+    print(
+        f"卡牌图片处理完成（{time.perf_counter() - started:.1f}s）："
+        f"生成 {result['rendered']}，未变化 {result['unchanged']}，"
+        f"失败 {result['failed']}，精灵图 {result['sprites']}"
+    )
+    for msg in result["errors"]:
+        print("  " + msg)
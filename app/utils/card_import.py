@@ -0,0 +1,421 @@
+"""卡牌批量导入（CSV / JSON / JSONL）
+
+新版本上线时要一次性灌进几千张卡（含 arena_win_rates JSON），以前只能手工写 SQL。
+这里按 `Card.card_id`（全局唯一的官方卡牌 ID）做 upsert：
+
+- 文件边读边处理，每 batch_size 条为一批：先用一条 IN 查询取出已存在的行，
+  逐字段比较后分成 插入 / 更新 / 未变化 三类
+- 插入、更新都用 executemany 一次发出；SQL Server + pyodbc 下打开
+  `fast_executemany`，参数整批打包传给驱动，而不是一行一个往返
+- 每批单独提交，并递增 site_counters 的 cards 版本、给改动的卡牌写上增量同步的
+  变更序号（Core 写入不经过 flush，不会触发自动维护）
+
+记录里没出现的字段不会被改动（JSON / JSONL 可以只给部分字段做增量更新）；
+CSV 的空单元格视为 NULL。
+
+命令行用法：
+    python -m app.utils.card_import cards.jsonl --batch-size 1000
+"""
+
+from __future__ import annotations
+
+import codecs
+import csv
+import json
+from contextlib import contextmanager
+from datetime import datetime
+from dataclasses import dataclass, field
+from typing import IO, Any, Iterable, Iterator, Optional
+
+from sqlalchemy import bindparam, event, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.models import Card
+from app.utils.card_changes import next_change_seq
+from app.utils.game_versions import register_versions
+from app.utils.site_counters import CARDS, bump_counters
+
+FORMATS = ("csv", "json", "jsonl")
+
+DEFAULT_BATCH_SIZE = 500
+# SQL Server 单条语句最多 2100 个参数，IN 查询按批取已有行，批大小不能超过它
+MAX_BATCH_SIZE = 2000
+
+_INT_FIELDS = ("card_id", "mana_cost", "arena_score")
+_STR_FIELDS = (
+    "name",
+    "expansion",
+    "card_class",
+    "rarity",
+    "version",
+    "pic",
+    "description",
+    "short_review",
+)
+IMPORT_FIELDS = _INT_FIELDS + _STR_FIELDS + ("arena_win_rates",)
+# 新插入的卡牌必须有的字段（对应 cards 表的 NOT NULL 列）
+_REQUIRED = ("name", "expansion", "mana_cost", "card_class", "rarity")
+
+_MAX_ERRORS = 50
+
+
+class CardImportError(ValueError):
+    pass
+
+
+@dataclass
+class ImportReport:
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    failed: int = 0
+    errors: list[str] = field(default_factory=list)
+
+    def error(self, line: int, message: str) -> None:
+        self.failed += 1
+        if len(self.errors) < _MAX_ERRORS:
+            self.errors.append(f"第 {line} 条：{message}")
+
+    def as_dict(self) -> dict:
+        return {
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "unchanged": self.unchanged,
+            "failed": self.failed,
+            "errors": self.errors,
+        }
+
+
+# ---------- 读取 ----------
+
+
+def detect_format(filename: Optional[str]) -> Optional[str]:
+    if not filename:
+        return None
+    ext = filename.rsplit(".", 1)[-1].lower()
+    if ext == "ndjson":
+        return "jsonl"
+    return ext if ext in FORMATS else None
+
+
+def _iter_json_array(stream: IO[str], chunk_size: int = 1 << 16) -> Iterator[Any]:
+    """逐个元素解析顶层 JSON 数组，不把整个文件读进内存。"""
+
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    started = False
+    eof = False
+
+    while True:
+        # 跳过空白和分隔符
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            chunk = stream.read(chunk_size)
+            buf, pos = buf[pos:] + chunk, 0
+            eof = not chunk
+
+        if pos >= len(buf):
+            raise CardImportError("JSON 文件不完整")
+        if not started:
+            if buf[pos] != "[":
+                raise CardImportError("JSON 文件顶层必须是数组")
+            started = True
+            pos += 1
+            continue
+        if buf[pos] == "]":
+            return
+
+        try:
+            obj, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise CardImportError("JSON 格式错误")
+            chunk = stream.read(chunk_size)
+            buf, pos = buf[pos:] + chunk, 0
+            eof = not chunk
+            continue
+        # 元素恰好停在缓冲区末尾时可能被截断（如数字），再读一块确认
+        if end == len(buf) and not eof:
+            chunk = stream.read(chunk_size)
+            buf, pos = buf[pos:] + chunk, 0
+            eof = not chunk
+            continue
+        yield obj
+        pos = end
+
+
+def iter_records(stream: IO[str], fmt: str) -> Iterator[Any]:
+    """文本流 -> 逐条原始记录（dict）。"""
+
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+    elif fmt == "jsonl":
+        # 逐行原样交给 _normalize 解析，某一行坏了只影响这一行
+        for line in stream:
+            line = line.strip()
+            if line:
+                yield line
+    elif fmt == "json":
+        yield from _iter_json_array(stream)
+    else:
+        raise CardImportError(f"不支持的格式：{fmt}")
+
+
+# ---------- 规范化 ----------
+
+
+def _to_int(value: Any) -> Optional[int]:
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return None
+    if isinstance(value, bool):
+        raise ValueError
+    if isinstance(value, float):
+        if not value.is_integer():
+            raise ValueError
+        return int(value)
+    text = str(value).strip()
+    try:
+        return int(text)
+    except ValueError:
+        f = float(text)
+        if not f.is_integer():
+            raise
+        return int(f)
+
+
+def _normalize(raw: Any) -> dict:
+    """原始记录 -> 只含 IMPORT_FIELDS 的 dict；格式不对抛 ValueError。"""
+
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except json.JSONDecodeError as exc:
+            raise ValueError(f"JSON 解析失败：{exc.msg}")
+    if not isinstance(raw, dict):
+        raise ValueError("记录必须是对象")
+
+    row: dict = {}
+    for name in _INT_FIELDS:
+        if name in raw:
+            try:
+                row[name] = _to_int(raw[name])
+            except (TypeError, ValueError):
+                raise ValueError(f"{name} 不是整数：{raw[name]!r}")
+    for name in _STR_FIELDS:
+        if name in raw:
+            value = raw[name]
+            value = None if value is None else str(value).strip()
+            row[name] = value or None
+    if "arena_win_rates" in raw:
+        value = raw["arena_win_rates"]
+        if isinstance(value, str):
+            value = value.strip()
+            try:
+                value = json.loads(value) if value else None
+            except json.JSONDecodeError:
+                raise ValueError("arena_win_rates 不是合法 JSON")
+        row["arena_win_rates"] = value
+
+    if row.get("card_id") is None:
+        raise ValueError("缺少 card_id")
+    for name in _REQUIRED:
+        if name in row and row[name] is None:
+            raise ValueError(f"{name} 不能为空")
+    return row
+
+
+# ---------- 写入 ----------
+
+
+@contextmanager
+def _fast_executemany(db: Session):
+    """SQL Server + pyodbc：在本次导入用到的连接上打开 fast_executemany。"""
+
+    conn = db.connection()
+    dialect = conn.dialect
+    if dialect.name != "mssql" or dialect.driver != "pyodbc":
+        yield conn
+        return
+
+    def _enable(conn_, cursor, statement, parameters, context, executemany):
+        if executemany:
+            cursor.fast_executemany = True
+
+    event.listen(conn, "before_cursor_execute", _enable)
+    try:
+        yield conn
+    finally:
+        event.remove(conn, "before_cursor_execute", _enable)
+
+
+def _write_batch(db: Session, batch: list[tuple[int, dict]], report: ImportReport) -> None:
+    table = Card.__table__
+
+    # 同一批里重复的 card_id：后出现的覆盖前面的
+    rows: dict[int, tuple[int, dict]] = {}
+    for line, row in batch:
+        if row["card_id"] in rows:
+            merged = {**rows[row["card_id"]][1], **row}
+            rows[row["card_id"]] = (line, merged)
+        else:
+            rows[row["card_id"]] = (line, row)
+
+    cols = [table.c[name] for name in IMPORT_FIELDS]
+    existing = {
+        r.card_id: r._mapping
+        for r in db.execute(
+            select(*cols).where(table.c.card_id.in_(list(rows)))
+        )
+    }
+
+    inserts: list[dict] = []
+    # 按“要更新哪些列”分组，同一组才能用一条 executemany
+    updates: dict[tuple[str, ...], list[dict]] = {}
+    for card_id, (line, row) in rows.items():
+        old = existing.get(card_id)
+        if old is None:
+            missing = [n for n in _REQUIRED if row.get(n) is None]
+            if missing:
+                report.error(line, f"新卡牌缺少字段 {', '.join(missing)}")
+                continue
+            full = {name: row.get(name) for name in IMPORT_FIELDS}
+            if full["arena_win_rates"] is None:
+                full["arena_win_rates"] = []
+            inserts.append(full)
+            continue
+
+        changed = tuple(
+            name
+            for name in IMPORT_FIELDS
+            if name != "card_id" and name in row and row[name] != old[name]
+        )
+        if not changed:
+            report.unchanged += 1
+            continue
+        params = {f"u_{name}": row[name] for name in changed}
+        params["b_card_id"] = card_id
+        updates.setdefault(changed, []).append(params)
+
+    if not inserts and not updates:
+        return
+
+    # 增量同步的变更序号、版本登记（Core 写入不经过 flush 事件，自己维护）
+    versions = [r["version"] for r in inserts]
+    versions += [p["u_version"] for ps in updates.values() for p in ps if "u_version" in p]
+    register_versions(db, versions)
+    seq = next_change_seq(db)
+    now = datetime.utcnow()
+    with _fast_executemany(db) as conn:
+        if inserts:
+            for row in inserts:
+                row["change_seq"] = seq
+                row["updated_at"] = now
+            conn.execute(insert(table), inserts)
+            report.inserted += len(inserts)
+        for changed, params in updates.items():
+            stmt = (
+                update(table)
+                .where(table.c.card_id == bindparam("b_card_id"))
+                .values(
+                    {
+                        name: bindparam(f"u_{name}", type_=table.c[name].type)
+                        for name in changed
+                    }
+                )
+                .values(change_seq=seq, updated_at=now)
+            )
+            conn.execute(stmt, params)
+            report.updated += len(params)
+    bump_counters(db, CARDS)
+
+
+def import_cards(
+    db: Session,
+    records: Iterable[Any],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> ImportReport:
+    """逐批 upsert 卡牌，每批提交一次；返回插入 / 更新 / 未变化 / 失败计数。"""
+
+    batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+    report = ImportReport()
+    batch: list[tuple[int, dict]] = []
+
+    def flush() -> None:
+        try:
+            _write_batch(db, batch, report)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        batch.clear()
+
+    try:
+        for line, raw in enumerate(records, start=1):
+            try:
+                batch.append((line, _normalize(raw)))
+            except ValueError as exc:
+                report.error(line, str(exc))
+                continue
+            if len(batch) >= batch_size:
+                flush()
+    except csv.Error as exc:
+        raise CardImportError(f"CSV 格式错误：{exc}")
+    if batch:
+        flush()
+    return report
+
+
+def import_card_file(
+    db: Session,
+    stream: IO[bytes],
+    fmt: str,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> ImportReport:
+    """二进制文件流入口（上传文件 / open(..., 'rb')），按 UTF-8（兼容 BOM）解码。"""
+
+    if fmt not in FORMATS:
+        raise CardImportError(f"不支持的格式：{fmt}")
+    # 不用 io.TextIOWrapper：它要求底层流实现 readable() 等 IOBase 方法，
+    # Python 3.10 的 SpooledTemporaryFile（上传文件）没有；StreamReader 只调 read()，
+    # 也不会关闭底层流
+    text = codecs.getreader("utf-8-sig")(stream)
+    try:
+        return import_cards(db, iter_records(text, fmt), batch_size)
+    except UnicodeDecodeError:
+        raise CardImportError("文件不是 UTF-8 编码")
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="批量导入卡牌（按 card_id upsert）")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=FORMATS, default=None)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    fmt = args.format or detect_format(args.path)
+    if fmt is None:
+        parser.error("无法从文件名判断格式，请用 --format 指定")
+
+    session = SessionLocal()
+    started = time.perf_counter()
+    try:
+        with open(args.path, "rb") as f:
+            result = import_card_file(session, f, fmt, args.batch_size)
+    finally:
+        session.close()
+    print(
+        f"卡牌导入完成（{time.perf_counter() - started:.1f}s）："
+        f"新增 {result.inserted}，更新 {result.updated}，"
+        f"未变化 {result.unchanged}，失败 {result.failed}"
+    )
+    for msg in result.errors:
+        print("  " + msg)
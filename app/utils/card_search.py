@@ -0,0 +1,166 @@
+"""卡牌名搜索索引（n-gram + 拼音 / 拼音首字母）
+
+原来的搜索是 `Card.name.ilike('%x%')`，每次全表扫描，而且玩家常敲的是拼音或
+首字母（比如 "xlz" 找“小龙崽”），ilike 根本匹配不到。这里为每张卡建三个字段：
+
+- name：名字（casefold 后），按字符 bigram 建倒排，单字查询用 unigram
+- pinyin：全拼（"xiaolongzai"），只允许从音节边界开始匹配（"longzai" 可以，"ngza" 不行）
+- initials：首字母（"xlz"），任意位置子串匹配
+
+查询时先用 gram 倒排求交集拿候选，再逐个校验并打分：名字命中 > 首字母 > 全拼，
+从开头命中 / 完全相等额外加分。
+
+拼音转换用 pypinyin；没装的环境里只按名字搜索。
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, Optional
+
+try:
+    from pypinyin import lazy_pinyin  # type: ignore
+except Exception:  # pragma: no cover - 依赖缺失时降级
+    lazy_pinyin = None
+
+
+# 字段权重：名字命中最可信，其次首字母，最后全拼
+_W_NAME = 30
+_W_INITIALS = 20
+_W_PINYIN = 10
+_BONUS_PREFIX = 5
+_BONUS_EXACT = 8
+
+
+def _grams(text: str) -> set[str]:
+    if len(text) < 2:
+        return {text} if text else set()
+    return {text[i : i + 2] for i in range(len(text) - 1)}
+
+
+def _syllables(name: str) -> list[str]:
+    """名字 -> 音节列表；非中文的字母 / 数字逐个作为一个“音节”，其余符号丢弃。"""
+
+    if lazy_pinyin is None:
+        return []
+    parts = lazy_pinyin(name, errors=lambda s: list(s))
+    return [p.lower() for p in parts if p.strip() and p.isalnum()]
+
+
+class _Field:
+    """单个字段的 gram 倒排：unigram + bigram -> 文档下标集合。"""
+
+    def __init__(self):
+        self.texts: list[str] = []
+        self.postings: dict[str, set[int]] = {}
+
+    def add(self, doc: int, text: str) -> None:
+        self.texts.append(text)
+        for ch in set(text):
+            self.postings.setdefault(ch, set()).add(doc)
+        for g in _grams(text):
+            self.postings.setdefault(g, set()).add(doc)
+
+    def candidates(self, q: str) -> set[int]:
+        sets = []
+        for g in _grams(q):
+            s = self.postings.get(g)
+            if not s:
+                return set()
+            sets.append(s)
+        sets.sort(key=len)
+        result = set(sets[0])
+        for s in sets[1:]:
+            result &= s
+            if not result:
+                break
+        return result
+
+
+class CardSearchIndex:
+    """文档下标与 CardCatalog 的下标一致（由 catalog 在加载时构建）。"""
+
+    def __init__(self, names: Iterable[str]):
+        self.name = _Field()
+        self.pinyin = _Field()
+        self.initials = _Field()
+        # 全拼里每个音节的起始偏移，用于“只从音节边界匹配”
+        self.boundaries: list[frozenset[int]] = []
+
+        for doc, raw in enumerate(names):
+            self.name.add(doc, (raw or "").casefold())
+            syl = _syllables(raw or "")
+            starts, offset = [], 0
+            for s in syl:
+                starts.append(offset)
+                offset += len(s)
+            self.pinyin.add(doc, "".join(syl))
+            self.initials.add(doc, "".join(s[0] for s in syl))
+            self.boundaries.append(frozenset(starts))
+
+    def _score(self, doc: int, q_name: str, q: str, ascii_query: bool) -> int:
+        best = 0
+        text = self.name.texts[doc]
+        pos = text.find(q_name)
+        if pos >= 0:
+            best = _W_NAME + (_BONUS_PREFIX if pos == 0 else 0) + (
+                _BONUS_EXACT if text == q_name else 0
+            )
+        if not ascii_query:
+            return best
+
+        text = self.initials.texts[doc]
+        pos = text.find(q)
+        if pos >= 0:
+            best = max(
+                best,
+                _W_INITIALS
+                + (_BONUS_PREFIX if pos == 0 else 0)
+                + (_BONUS_EXACT if text == q else 0),
+            )
+
+        text = self.pinyin.texts[doc]
+        starts = self.boundaries[doc]
+        pos = text.find(q)
+        while pos >= 0 and pos not in starts:
+            pos = text.find(q, pos + 1)
+        if pos >= 0:
+            best = max(
+                best,
+                _W_PINYIN
+                + (_BONUS_PREFIX if pos == 0 else 0)
+                + (_BONUS_EXACT if text == q else 0),
+            )
+        return best
+
+    def scored(self, query: str) -> dict[int, int]:
+        """返回 {文档下标: 分数}，只包含真正命中的文档。"""
+
+        # 名字按原样（含中间空格）匹配，拼音 / 首字母去掉空格匹配
+        q_name = (query or "").strip().casefold()
+        q = "".join(q_name.split())
+        if not q:
+            return {}
+        ascii_query = q.isascii() and q.isalnum()
+
+        candidates = self.name.candidates(q_name)
+        if ascii_query:
+            candidates |= self.initials.candidates(q)
+            candidates |= self.pinyin.candidates(q)
+
+        result = {}
+        for doc in candidates:
+            s = self._score(doc, q_name, q, ascii_query)
+            if s:
+                result[doc] = s
+        return result
+
+    def match(self, query: str) -> set[int]:
+        return set(self.scored(query))
+
+    def ranked(self, query: str, limit: Optional[int] = None) -> list[int]:
+        """按相关度排序：分数高的在前，同分名字短的在前，再按下标（名字序）。"""
+
+        scores = self.scored(query)
+        texts = self.name.texts
+        docs = sorted(scores, key=lambda d: (-scores[d], len(texts[d]), d))
+        return docs if limit is None else docs[:limit]
@@ -0,0 +1,202 @@
+"""卡牌点评聚合（card_review_stats）维护工具
+
+列表页原来每次请求都要对整张 card_reviews 做 GROUP BY 求均分，再把当页所有点评
+按影响力排序拉回来挑第一条。现在这些结果物化在 card_review_stats 里：
+
+- 写点评时调用 `refresh_card_review_stats`，和点评本身在同一个事务里提交；
+- 成员影响力 / 昵称变化时调用 `refresh_stats_for_reviewer`，只重算他点评过的卡
+  （一条 IN 查询取回这些卡的全部点评）；
+- 数据被手工改动后可以全量重建：`python -m app.utils.card_stats`
+  （或管理后台 POST /api/admin/cards/review_stats/rebuild）。
+"""
+
+from __future__ import annotations
+
+import math
+from datetime import datetime
+
+from sqlalchemy import case
+from sqlalchemy.orm import Session
+
+from app.models import CardReview, CardReviewStats, User, UserProfile
+
+
+# 评分分布：0~5 分，每 0.5 一档，共 11 档（第 i 档是 [i/2, i/2 + 0.5)，5 分单独一档）
+HISTOGRAM_STEP = 0.5
+HISTOGRAM_BUCKETS = 11
+
+
+def histogram_bucket(score: float) -> int:
+    return min(max(int(math.floor(score / HISTOGRAM_STEP)), 0), HISTOGRAM_BUCKETS - 1)
+
+
+def score_histogram(stats: CardReviewStats | None) -> list[int]:
+    """物化的评分分布；还没有点评的卡返回全 0。"""
+
+    if stats is None or not stats.score_histogram:
+        return [0] * HISTOGRAM_BUCKETS
+    return list(stats.score_histogram)
+
+
+def review_weight(influence: int | None) -> float:
+    """加权均分里一条点评的权重：1 + ln(1 + 影响力)，影响力为空 / 负数按 0 算。
+
+    取对数是为了让高影响力成员更有分量，但不至于一个人说了算。
+    """
+
+    return 1.0 + math.log1p(max(influence or 0, 0))
+
+
+def _top_review_order():
+    """影响力高的点评优先（影响力为空排在后面），同影响力取最新的。"""
+
+    influence_null_last = case((UserProfile.influence.is_(None), 1), else_=0)
+    return (
+        influence_null_last,
+        UserProfile.influence.desc(),
+        CardReview.created_at.desc(),
+    )
+
+
+def _review_rows(db: Session):
+    return (
+        db.query(
+            CardReview.card_id,
+            CardReview.id,
+            CardReview.score,
+            CardReview.content,
+            User.nickname,
+            User.username,
+            UserProfile.influence,
+        )
+        .join(User, User.id == CardReview.reviewer_id)
+        .outerjoin(UserProfile, UserProfile.user_id == User.id)
+    )
+
+
+def _fill_stats(stats: CardReviewStats, rows) -> None:
+    """rows 已按 _top_review_order 排好序，第一条即列表页展示的点评。
+
+    只给真正变了的列赋值（updated_at 也只在有变化时刷新），没变的行 flush 时
+    不会被当成修改，不递增版本号、不进增量同步。
+    """
+
+    scores = [r.score for r in rows]
+    top = rows[0]
+    weights = [review_weight(r.influence) for r in rows]
+    histogram = [0] * HISTOGRAM_BUCKETS
+    for x in scores:
+        histogram[histogram_bucket(x)] += 1
+    values = {
+        "review_count": len(scores),
+        "avg_score": sum(scores) / len(scores),
+        "weighted_score": sum(w * x for w, x in zip(weights, scores)) / sum(weights),
+        # JSON 列原地修改不会被察觉，每次赋一个新列表
+        "score_histogram": histogram,
+        "top_review_id": top.id,
+        "top_review_content": top.content,
+        "top_reviewer_nickname": top.nickname or top.username or "",
+    }
+    changed = False
+    for name, value in values.items():
+        if getattr(stats, name) != value:
+            setattr(stats, name, value)
+            changed = True
+    if changed:
+        stats.updated_at = datetime.utcnow()
+
+
+def _refresh_cards(db: Session, card_ids: list[int]) -> None:
+    """按 card_reviews 重算这些卡的聚合行：一条查询取回全部点评，再逐卡写回。"""
+
+    db.flush()
+    rows = (
+        _review_rows(db)
+        .filter(CardReview.card_id.in_(card_ids))
+        .order_by(CardReview.card_id, *_top_review_order())
+        .all()
+    )
+    grouped: dict[int, list] = {}
+    for r in rows:
+        grouped.setdefault(r.card_id, []).append(r)
+
+    existing = {
+        s.card_id: s
+        for s in db.query(CardReviewStats)
+        .filter(CardReviewStats.card_id.in_(card_ids))
+        .all()
+    }
+    for cid in card_ids:
+        stats = existing.get(cid)
+        card_rows = grouped.get(cid)
+        if not card_rows:
+            if stats is not None:
+                db.delete(stats)
+            continue
+        if stats is None:
+            stats = CardReviewStats(card_id=cid)
+            db.add(stats)
+        _fill_stats(stats, card_rows)
+
+
+def refresh_card_review_stats(db: Session, card_id: int) -> CardReviewStats | None:
+    """按 card_reviews 重算一张卡的聚合行（不 commit，由调用方统一提交）。"""
+
+    _refresh_cards(db, [card_id])
+    stats = db.get(CardReviewStats, card_id)
+    return stats if stats is not None and stats not in db.deleted else None
+
+
+def refresh_stats_for_reviewer(db: Session, user_id: int) -> int:
+    """某个成员的影响力 / 昵称变了：只重算他点评过的卡，返回重算的卡数。"""
+
+    card_ids = [
+        cid
+        for (cid,) in db.query(CardReview.card_id)
+        .filter(CardReview.reviewer_id == user_id)
+        .distinct()
+        .all()
+    ]
+    # SQL Server 单条语句参数上限 2100，分批 IN
+    for start in range(0, len(card_ids), 1000):
+        _refresh_cards(db, card_ids[start : start + 1000])
+    return len(card_ids)
+
+
+def rebuild_card_review_stats(db: Session) -> int:
+    """全量重建 card_review_stats，返回有点评的卡牌数量。
+
+    逐行比对后写回（不整表 DELETE），只有真正变了的卡会递增 reviews 版本号、
+    进入卡牌增量同步。
+    """
+
+    rows = _review_rows(db).order_by(CardReview.card_id, *_top_review_order()).all()
+
+    grouped: dict[int, list] = {}
+    for r in rows:
+        grouped.setdefault(r.card_id, []).append(r)
+
+    existing = {s.card_id: s for s in db.query(CardReviewStats).all()}
+    for cid, stats in existing.items():
+        if cid not in grouped:
+            db.delete(stats)
+    for cid, card_rows in grouped.items():
+        stats = existing.get(cid)
+        if stats is None:
+            stats = CardReviewStats(card_id=cid)
+            db.add(stats)
+        _fill_stats(stats, card_rows)
+
+    db.commit()
+    return len(grouped)
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        n = rebuild_card_review_stats(session)
+        print(f"card_review_stats 重建完成：{n} 张卡")
+    finally:
+        session.close()
@@ -0,0 +1,107 @@
+"""游戏版本号：可排序的整数键 + 版本登记表（game_versions）
+
+版本号是字符串（"29.2"、"29.10"、"29.2.3"），按字符串比较 "29.10" 会排在
+"29.9" 前面，MAX(game_version) 也用不上索引。这里把版本号解析成一个整数键：
+
+    29.10.2 -> ((29 * 1000 + 10) * 1000 + 2) * 1000 + 0
+
+最多取四段，第一段之后每段 < 1000；没有数字的版本号键为 None。
+
+- card_reviews.game_version_key 与 game_version 一起保存，(card_id, game_version_key)
+  上有索引，“只看最新版本”变成一次索引查找
+- game_versions 登记出现过的所有版本（卡牌的 cards.version 和点评的 game_version），
+  卡牌页版本下拉框（list_versions）和点评筛选共用同一套排序
+
+ORM 写入时由 Session 事件自动维护，Core 批量写入（卡牌导入）调用 register_versions。
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import event, exists, insert, literal, select
+from sqlalchemy.orm import Session
+
+from app.models import Card, CardReview, GameVersion
+
+_PARTS_RE = re.compile(r"\d+")
+_MAX_PARTS = 4
+_PART_LIMIT = 1000
+
+
+def version_sort_key(name: Optional[str]) -> Optional[int]:
+    if not name:
+        return None
+    parts = [int(p) for p in _PARTS_RE.findall(name)[:_MAX_PARTS]]
+    if not parts:
+        return None
+    parts += [0] * (_MAX_PARTS - len(parts))
+    key = parts[0]
+    for p in parts[1:]:
+        key = key * _PART_LIMIT + min(p, _PART_LIMIT - 1)
+    return key
+
+
+# 本进程已确认登记过的版本名，避免每次 flush 都查库
+_known: set[str] = set()
+_known_lock = threading.Lock()
+
+
+def register_versions(db: Session, names: Iterable[Optional[str]]) -> None:
+    """确保这些版本号在 game_versions 里有记录（已有的跳过），不提交事务。"""
+
+    pending: set[str] = db.info.setdefault("game_versions_pending", set())
+    names = {n for n in names if n} - _known - pending
+    if not names:
+        return
+    table = GameVersion.__table__
+    conn = db.connection()
+    now = datetime.utcnow()
+    for name in sorted(names):
+        # INSERT ... SELECT ... WHERE NOT EXISTS：已存在时什么都不做
+        conn.execute(
+            insert(table).from_select(
+                ["name", "sort_key", "created_at"],
+                select(
+                    literal(name),
+                    literal(version_sort_key(name)),
+                    literal(now),
+                ).where(~exists().where(table.c.name == name)),
+            )
+        )
+    # 提交之后才算真正登记上（见下面的 after_commit）
+    pending.update(names)
+
+
+def load_sort_keys(db: Session) -> dict[str, Optional[int]]:
+    return dict(db.query(GameVersion.name, GameVersion.sort_key).all())
+
+
+@event.listens_for(Session, "before_flush")
+def _sync_game_versions(session: Session, flush_context, instances) -> None:
+    names: set[str] = set()
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, CardReview):
+            key = version_sort_key(obj.game_version)
+            if obj.game_version_key != key:
+                obj.game_version_key = key
+            names.add(obj.game_version)
+        elif isinstance(obj, Card):
+            names.add(obj.version)
+    register_versions(session, names)
+
+
+@event.listens_for(Session, "after_commit")
+def _remember_committed(session: Session) -> None:
+    pending = session.info.pop("game_versions_pending", None)
+    if pending:
+        with _known_lock:
+            _known.update(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_pending(session: Session) -> None:
+    session.info.pop("game_versions_pending", None)
@@ -0,0 +1,340 @@
+"""攻略全文搜索索引（倒排 + BM25）
+
+原来的搜索是 `title ILIKE '%x%' OR content ILIKE '%x%'`：每次把所有已发布攻略的
+正文整列扫一遍，而且正文是 HTML，搜 "span"、"img" 这类词会命中标签本身。
+这里在进程内为已发布的攻略建一个倒排索引：
+
+- 正文先去掉 HTML（app/utils/sanitize.html_to_text），标题和正文一起建索引，
+  标题里的词按 _TITLE_WEIGHT 倍词频计（BM25F 的简化写法）
+- 分词：连续的中文按字 bigram 切（单个汉字就是它自己），字母 / 数字按词切，
+  都先 casefold；查询用同样的规则切词。建索引时中文段的每个字还会单独入索引
+  （只进倒排表、不计入文档长度），这样只搜一个字（"法"）也能命中
+- 查询的所有词都要命中（与原来的子串匹配语义接近），从最短的倒排表开始求交集，
+  只给候选文档打 BM25 分——耗时取决于命中数，而不是攻略总数
+- 摘要：在纯文本里找第一个命中位置，截一段上下文，命中处用 <mark> 包起来
+
+攻略有改动时 site_counters 的 articles 版本号会递增，下一次查询发现版本号变了
+就重新加载（多进程部署下也能失效）。create_article / update_article 提交后调用
+`refresh_guide_index` 直接在本进程的索引上增量更新，省掉一次全量重建。
+"""
+
+from __future__ import annotations
+
+import html
+import math
+import re
+import threading
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.models import Article, ArticleStatus, ArticleTag
+from app.utils.article_tags import category_key, tag_key
+from app.utils.sanitize import html_to_text
+from app.utils.site_counters import ARTICLES, read_counters
+
+# BM25 参数
+_K1 = 1.2
+_B = 0.75
+# 标题里的词按几倍词频计
+_TITLE_WEIGHT = 3
+
+# 摘要长度（字符）和命中位置前保留的上下文
+SNIPPET_LENGTH = 120
+_SNIPPET_LEAD = 30
+
+_CJK = "㐀-䶿一-鿿豈-﫿"
+_WORD_RE = re.compile(rf"[{_CJK}]+|[^\W_{_CJK}]+")
+_CJK_RE = re.compile(rf"[{_CJK}]")
+
+
+def _segments(text: str) -> list[str]:
+    """casefold 后切成连续的中文段 / 字母数字词。"""
+
+    return _WORD_RE.findall((text or "").casefold())
+
+
+def tokenize(text: str) -> list[str]:
+    """中文段按字 bigram，其余按词；保留重复（用来算词频）。"""
+
+    tokens: list[str] = []
+    for seg in _segments(text):
+        if _CJK_RE.match(seg) and len(seg) > 1:
+            tokens.extend(seg[i : i + 2] for i in range(len(seg) - 1))
+        else:
+            tokens.append(seg)
+    return tokens
+
+
+def _unigrams(text: str) -> list[str]:
+    """多字中文段里的单字（单字段 tokenize 已经给过了），只用于建索引。"""
+
+    return [
+        ch
+        for seg in _segments(text)
+        if _CJK_RE.match(seg) and len(seg) > 1
+        for ch in seg
+    ]
+
+
+class _Doc:
+    __slots__ = (
+        "id",
+        "title",
+        "text",
+        "created_at",
+        "category",
+        "is_featured",
+        "tags",
+        "tf",
+        "length",
+    )
+
+    def __init__(self, article_id, title, text, created_at, category, is_featured, tags):
+        self.id = article_id
+        self.title = title or ""
+        self.text = text
+        self.created_at = created_at or datetime.min
+        self.category = category_key(category)
+        self.is_featured = bool(is_featured)
+        self.tags = frozenset(tag_key(t) for t in tags)
+
+        tf: dict[str, int] = {}
+        title_tokens = tokenize(self.title)
+        for t in title_tokens + _unigrams(self.title):
+            tf[t] = tf.get(t, 0) + _TITLE_WEIGHT
+        body_tokens = tokenize(text)
+        for t in body_tokens + _unigrams(text):
+            tf[t] = tf.get(t, 0) + 1
+        self.tf = tf
+        self.length = _TITLE_WEIGHT * len(title_tokens) + len(body_tokens)
+
+
+class GuideSearchIndex:
+    """已发布攻略的倒排索引。读写都在 _lock 内完成（增量更新会改倒排表）。"""
+
+    def __init__(self, version: int):
+        self.version = version
+        self.docs: dict[int, _Doc] = {}
+        self.postings: dict[str, dict[int, int]] = {}
+        self.total_length = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, db: Session, version: int) -> "GuideSearchIndex":
+        index = cls(version)
+        tags: dict[int, list[str]] = {}
+        for article_id, tag_name in (
+            db.query(ArticleTag.article_id, ArticleTag.tag_name)
+            .join(Article, Article.id == ArticleTag.article_id)
+            .filter(Article.status == ArticleStatus.PUBLISHED)
+            .all()
+        ):
+            tags.setdefault(article_id, []).append(tag_name)
+
+        rows = (
+            db.query(
+                Article.id,
+                Article.title,
+                Article.content,
+                Article.created_at,
+                Article.category,
+                Article.is_featured,
+            )
+            .filter(Article.status == ArticleStatus.PUBLISHED)
+            .yield_per(200)
+        )
+        for r in rows:
+            index._add(
+                _Doc(
+                    r.id,
+                    r.title,
+                    html_to_text(r.content),
+                    r.created_at,
+                    r.category,
+                    r.is_featured,
+                    tags.get(r.id, ()),
+                )
+            )
+        return index
+
+    # ---- 维护 ----
+
+    def _add(self, doc: _Doc) -> None:
+        self.docs[doc.id] = doc
+        self.total_length += doc.length
+        for term, n in doc.tf.items():
+            self.postings.setdefault(term, {})[doc.id] = n
+
+    def _remove(self, article_id: int) -> None:
+        doc = self.docs.pop(article_id, None)
+        if doc is None:
+            return
+        self.total_length -= doc.length
+        for term in doc.tf:
+            plist = self.postings.get(term)
+            if plist is None:
+                continue
+            plist.pop(article_id, None)
+            if not plist:
+                del self.postings[term]
+
+    def upsert(self, article: Article) -> None:
+        """按文章当前状态更新索引：已发布的（重新）入索引，其余的移出。"""
+
+        doc = None
+        if article.status == ArticleStatus.PUBLISHED:
+            doc = _Doc(
+                article.id,
+                article.title,
+                html_to_text(article.content),
+                article.created_at,
+                article.category,
+                article.is_featured,
+                [t.tag_name for t in article.tags],
+            )
+        with self._lock:
+            self._remove(article.id)
+            if doc is not None:
+                self._add(doc)
+
+    # ---- 查询 ----
+
+    def search(
+        self,
+        query: str,
+        featured: bool = False,
+        category: Optional[str] = None,
+        tags: Optional[list[str]] = None,
+        tag_mode: str = "and",
+    ) -> list[int]:
+        """返回命中的文章 id，按 BM25 分数从高到低（同分新发布的在前）。"""
+
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        # 和文档一侧一样按比较键筛（不区分大小写）
+        category = category_key(category)
+        tags = {tag_key(t) for t in tags or ()}
+
+        with self._lock:
+            plists = []
+            for term in terms:
+                plist = self.postings.get(term)
+                if not plist:
+                    return []
+                plists.append(plist)
+            plists.sort(key=len)
+
+            candidates = set(plists[0])
+            for plist in plists[1:]:
+                candidates.intersection_update(plist)
+                if not candidates:
+                    return []
+
+            n_docs = len(self.docs)
+            avg_len = self.total_length / n_docs if n_docs else 1.0
+            idf = [
+                math.log(1.0 + (n_docs - len(p) + 0.5) / (len(p) + 0.5)) for p in plists
+            ]
+
+            scored = []
+            for doc_id in candidates:
+                doc = self.docs[doc_id]
+                if featured and not doc.is_featured:
+                    continue
+                if category and doc.category != category:
+                    continue
+                if tags:
+                    if tag_mode == "or":
+                        if doc.tags.isdisjoint(tags):
+                            continue
+                    elif not doc.tags.issuperset(tags):
+                        continue
+                norm = _K1 * (1.0 - _B + _B * doc.length / avg_len)
+                score = 0.0
+                for w, plist in zip(idf, plists):
+                    tf = plist[doc_id]
+                    score += w * tf * (_K1 + 1.0) / (tf + norm)
+                scored.append((score, doc.created_at, doc_id))
+
+        scored.sort(reverse=True)
+        return [doc_id for _, _, doc_id in scored]
+
+    def snippet(self, article_id: int, query: str, length: int = SNIPPET_LENGTH) -> str:
+        """命中位置附近的一段正文（已转义，命中处包 <mark>）；正文没命中时取开头。"""
+
+        with self._lock:
+            doc = self.docs.get(article_id)
+        if doc is None:
+            return ""
+        text = doc.text
+
+        # 优先高亮查询里完整的词 / 中文段，正文里没有时再退到 bigram
+        words = sorted(set(_segments(query)), key=len, reverse=True)
+        folded = text.casefold()
+        if not any(w in folded for w in words):
+            words = sorted(set(tokenize(query)), key=len, reverse=True)
+        if not words:
+            return html.escape(text[:length])
+        pattern = re.compile("|".join(re.escape(w) for w in words), re.I)
+
+        m = pattern.search(text)
+        start = max(0, m.start() - _SNIPPET_LEAD) if m else 0
+        end = min(len(text), start + length)
+        window = text[start:end]
+
+        parts = []
+        pos = 0
+        for hit in pattern.finditer(window):
+            parts.append(html.escape(window[pos : hit.start()]))
+            parts.append(f"<mark>{html.escape(hit.group(0))}</mark>")
+            pos = hit.end()
+        parts.append(html.escape(window[pos:]))
+        out = "".join(parts)
+        if start > 0:
+            out = "…" + out
+        if end < len(text):
+            out += "…"
+        return out
+
+
+_lock = threading.Lock()
+_index: Optional[GuideSearchIndex] = None
+
+
+def guides_version(db: Session) -> int:
+    return read_counters(db, ARTICLES)[0]
+
+
+def get_guide_index(db: Session, version: Optional[int] = None) -> GuideSearchIndex:
+    """返回当前有效的搜索索引；articles 版本号变化后第一次调用时重新加载。"""
+
+    global _index
+    if version is None:
+        version = guides_version(db)
+    index = _index
+    if index is not None and index.version == version:
+        return index
+    with _lock:
+        if _index is None or _index.version != version:
+            _index = GuideSearchIndex.load(db, version)
+        return _index
+
+
+def refresh_guide_index(db: Session, article: Article) -> None:
+    """写文章的事务提交后调用：本进程的索引只落后这一次写入时直接增量更新。
+
+    版本号差得更多说明别的进程也改过攻略，不做处理，下一次查询会整体重建。
+    """
+
+    index = _index
+    if index is None:
+        return
+    version = guides_version(db)
+    with _lock:
+        if index is not _index or index.version not in (version, version - 1):
+            return
+        index.upsert(article)
+        index.version = version
@@ -0,0 +1,190 @@
+"""卡牌短评写入（一条语句完成“更新或在名额内新增”）
+
+原来的写法是：查卡牌 -> 查自己有没有写过 -> 数这张卡已有几条 -> 插入，四次往返，
+而且“数完再插”之间没有任何锁，几个人同时提交时一张卡可以超过 5 个点评人。
+
+现在：
+- card_reviews 上有 (card_id, reviewer_id) 唯一约束，同一人不会有两条
+- SQL Server 上用一条 MERGE：已写过就更新；没写过时只有卡牌存在且名额未满才插入。
+  名额在 USING 子查询里用 (UPDLOCK, HOLDLOCK) 数，锁住这张卡的点评范围，
+  并发的新增会在这里排队，数到的一定是最新的条数
+- 其它数据库（本地 sqlite 等）先 `SELECT ... FOR UPDATE` 锁住卡牌这一行（同一张卡的
+  提交在这里排队，作用和 MERGE 里的 UPDLOCK 一样；sqlite 没有行锁，靠它的写锁），
+  再 UPDATE，没更新到再 INSERT ... SELECT ... WHERE，插入撞上唯一约束（同一人并发
+  提交）就回头再 UPDATE 一次
+
+“一次往返”只指点评本身的写入 + 名额检查。写入走 Core，不经过 ORM 的 flush 事件，
+所以之后还要单独执行：版本登记（已登记过的版本不发语句）、reviews 计数器 +1、
+以及 refresh_card_review_stats 重算这张卡的聚合（要读这张卡的全部点评，没法并进
+MERGE），它们和点评在同一个事务里提交。
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import exists, func, insert, literal, select, text, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models import Card, CardReview
+from app.utils.card_stats import refresh_card_review_stats
+from app.utils.game_versions import register_versions, version_sort_key
+from app.utils.site_counters import REVIEWS, bump_counters
+
+# 每张卡最多几个不同的点评人
+MAX_REVIEWERS = 5
+
+
+class CardNotFound(LookupError):
+    pass
+
+
+class ReviewQuotaFull(Exception):
+    pass
+
+
+_MERGE = text(
+    """
+    MERGE card_reviews WITH (HOLDLOCK) AS t
+    USING (
+        SELECT :card_id AS card_id,
+               :reviewer_id AS reviewer_id,
+               (SELECT COUNT(*) FROM card_reviews WITH (UPDLOCK, HOLDLOCK)
+                WHERE card_id = :card_id) AS taken,
+               (SELECT COUNT(*) FROM cards WHERE id = :card_id) AS card_exists
+    ) AS s
+    ON t.card_id = s.card_id AND t.reviewer_id = s.reviewer_id
+    WHEN MATCHED THEN
+        UPDATE SET score = :score,
+                   content = :content,
+                   game_version = :game_version,
+                   game_version_key = :game_version_key,
+                   created_at = :created_at
+    WHEN NOT MATCHED BY TARGET AND s.taken < :quota AND s.card_exists = 1 THEN
+        INSERT (card_id, reviewer_id, score, content, game_version,
+                game_version_key, created_at)
+        VALUES (:card_id, :reviewer_id, :score, :content, :game_version,
+                :game_version_key, :created_at)
+    OUTPUT inserted.id;
+    """
+)
+
+
+def _update(db: Session, params: dict) -> Optional[int]:
+    t = CardReview.__table__
+    conn = db.connection()
+    stmt = (
+        update(t)
+        .where(t.c.card_id == params["card_id"], t.c.reviewer_id == params["reviewer_id"])
+        .values(
+            score=params["score"],
+            content=params["content"],
+            game_version=params["game_version"],
+            game_version_key=params["game_version_key"],
+            created_at=params["created_at"],
+        )
+    )
+    if conn.dialect.update_returning:
+        return conn.execute(stmt.returning(t.c.id)).scalar()
+    if not conn.execute(stmt).rowcount:
+        return None
+    return _lookup_id(db, params)
+
+
+def _insert(db: Session, params: dict) -> Optional[int]:
+    t = CardReview.__table__
+    cols = ["card_id", "reviewer_id", "score", "content", "game_version",
+            "game_version_key", "created_at"]
+    taken = (
+        select(func.count())
+        .select_from(t)
+        .where(t.c.card_id == params["card_id"])
+        .scalar_subquery()
+    )
+    stmt = insert(t).from_select(
+        cols,
+        select(*(literal(params[c], t.c[c].type) for c in cols)).where(
+            taken < MAX_REVIEWERS,
+            exists().where(Card.__table__.c.id == params["card_id"]),
+        ),
+    )
+    conn = db.connection()
+    if conn.dialect.insert_returning:
+        return conn.execute(stmt.returning(t.c.id)).scalar()
+    if not conn.execute(stmt).rowcount:
+        return None
+    return _lookup_id(db, params)
+
+
+def _lookup_id(db: Session, params: dict) -> Optional[int]:
+    t = CardReview.__table__
+    return db.connection().execute(
+        select(t.c.id).where(
+            t.c.card_id == params["card_id"], t.c.reviewer_id == params["reviewer_id"]
+        )
+    ).scalar()
+
+
+def _lock_card(db: Session, card_id: int) -> bool:
+    """锁住卡牌这一行直到事务结束，返回卡牌是否存在。"""
+
+    t = Card.__table__
+    stmt = select(t.c.id).where(t.c.id == card_id).with_for_update()
+    return db.connection().execute(stmt).first() is not None
+
+
+def _upsert_generic(db: Session, params: dict) -> Optional[int]:
+    if not _lock_card(db, params["card_id"]):
+        return None
+    review_id = _update(db, params)
+    if review_id is not None:
+        return review_id
+    try:
+        with db.begin_nested():
+            return _insert(db, params)
+    except IntegrityError:
+        # 同一人的另一次提交刚刚插入了：改成更新它
+        return _update(db, params)
+
+
+def upsert_card_review(
+    db: Session,
+    card_id: int,
+    reviewer_id: int,
+    score: float,
+    content: str,
+    game_version: Optional[str],
+) -> tuple[int, datetime]:
+    """写入 / 覆盖一条短评，返回 (review_id, 写入时间)；不 commit，由调用方提交。
+
+    卡牌不存在抛 CardNotFound，名额已满（且本人没写过）抛 ReviewQuotaFull。
+    """
+
+    now = datetime.utcnow()
+    params = {
+        "card_id": card_id,
+        "reviewer_id": reviewer_id,
+        "score": score,
+        "content": content,
+        "game_version": game_version,
+        "game_version_key": version_sort_key(game_version),
+        # 这里用 created_at 作为“最后更新时间”，避免额外加字段
+        "created_at": now,
+    }
+    if db.connection().dialect.name == "mssql":
+        review_id = db.connection().execute(_MERGE, {**params, "quota": MAX_REVIEWERS}).scalar()
+    else:
+        review_id = _upsert_generic(db, params)
+
+    if review_id is None:
+        # 只有失败时才多查一次，区分两种原因
+        if db.get(Card, card_id) is None:
+            raise CardNotFound(card_id)
+        raise ReviewQuotaFull(card_id)
+
+    register_versions(db, [game_version])
+    bump_counters(db, REVIEWS)
+    refresh_card_review_stats(db, card_id)
+    return review_id, now
@@ -8,11 +8,36 @@
 
 from __future__ import annotations
 
+import html as _html
 import re
 
 
 _SCRIPT_RE = re.compile(r"<\s*script[^>]*>.*?<\s*/\s*script\s*>", re.I | re.S)
 _ON_EVENT_ATTR_RE = re.compile(r"\son[a-zA-Z]+\s*=\s*([\"']).*?\1", re.I | re.S)
+_STYLE_RE = re.compile(r"<\s*style[^>]*>.*?<\s*/\s*style\s*>", re.I | re.S)
+_BLOCK_TAG_RE = re.compile(
+    r"<\s*/?\s*(?:p|br|div|li|ul|ol|h[1-6]|hr|blockquote|pre|img|tr|td|th|table)\b[^>]*>",
+    re.I,
+)
+_TAG_RE = re.compile(r"<[^>]*>")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def html_to_text(html: str | None) -> str:
+    """攻略正文 HTML -> 纯文本（用于搜索索引、摘要）。
+
+    去掉 script / style 整块和所有标签：块级标签换成空格（避免相邻段落粘在一起），
+    行内标签（strong / a / span ...）直接去掉；反转义实体，连续空白压成一个空格。
+    """
+
+    if not html:
+        return ""
+    text = _SCRIPT_RE.sub(" ", html)
+    text = _STYLE_RE.sub(" ", text)
+    text = _BLOCK_TAG_RE.sub(" ", text)
+    text = _TAG_RE.sub("", text)
+    text = _html.unescape(text)
+    return _SPACE_RE.sub(" ", text).strip()
 
 
 def sanitize_html(html: str | None) -> str:
@@ -0,0 +1,133 @@
+"""数据版本号（site_counters 表）
+
+卡牌 / 点评相关的 GET 接口要给浏览器发 ETag、内存里的卡牌目录 / 攻略索引要知道别的进程
+有没有改过数据，都需要一个跨进程、单调递增的版本号。这里用 Session 事件自动维护：
+flush 里只要有被关注的模型发生变化，就在同一个事务里把对应计数器 +1，
+业务代码不需要手动调用。
+
+读取只是一次按主键的小查询，比真正执行列表查询便宜得多。
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.models import (
+    Article,
+    ArticleTag,
+    Card,
+    CardReview,
+    CardReviewStats,
+    SiteCounter,
+    User,
+)
+
+CARDS = "cards"
+REVIEWS = "reviews"
+# 点评人昵称 / 角色（点评列表展示用）；卡牌目录不读它，用户写入不会让目录重载
+REVIEWERS = "reviewers"
+# 卡牌增量同步的变更序号（见 app/utils/card_changes.py）
+CARD_CHANGES = "card_changes"
+# 攻略（含标签）；攻略搜索索引据此失效（见 app/utils/guide_search.py）
+ARTICLES = "articles"
+
+# 模型 -> 它变化时要递增的计数器
+_WATCHED: dict[type, str] = {
+    Card: CARDS,
+    CardReview: REVIEWS,
+    CardReviewStats: REVIEWS,
+    # 点评列表里展示点评人昵称 / 专家标识
+    User: REVIEWERS,
+    Article: ARTICLES,
+    ArticleTag: ARTICLES,
+}
+
+
+def read_counters(db: Session, *names: str) -> tuple[int, ...]:
+    """按顺序返回计数器的当前值，不存在的记为 0。"""
+
+    rows = dict(
+        db.execute(
+            select(SiteCounter.name, SiteCounter.value).where(
+                SiteCounter.name.in_(names)
+            )
+        ).all()
+    )
+    return tuple(int(rows.get(n) or 0) for n in names)
+
+
+def bump_counters(db: Session, *names: str) -> None:
+    """手动递增计数器：给不经过 ORM flush 的 Core 批量写入用（如卡牌导入）。"""
+
+    _bump(db, set(names))
+
+
+def next_value(db: Session, name: str) -> int:
+    """递增计数器（每个事务只递增一次）并返回本事务拿到的值，用作变更序号。"""
+
+    values: dict[str, int] = db.info.setdefault("site_counters_values", {})
+    if name not in values:
+        _bump(db, {name})
+        values[name] = read_counters(db, name)[0]
+    return values[name]
+
+
+def _bump(session: Session, names: set[str]) -> None:
+    # 同一个事务里每个计数器只递增一次
+    done: set[str] = session.info.setdefault("site_counters_bumped", set())
+    conn = session.connection()
+    now = datetime.utcnow()
+    for name in sorted(names - done):
+        res = conn.execute(
+            update(SiteCounter.__table__)
+            .where(SiteCounter.__table__.c.name == name)
+            .values(value=SiteCounter.__table__.c.value + 1, updated_at=now)
+        )
+        if res.rowcount == 0:
+            conn.execute(
+                insert(SiteCounter.__table__).values(
+                    name=name, value=1, updated_at=now
+                )
+            )
+        done.add(name)
+
+
+def _changed_counters(session: Session) -> set[str]:
+    names: set[str] = set()
+    for obj in list(session.new) + list(session.deleted):
+        name = _WATCHED.get(type(obj))
+        if name:
+            names.add(name)
+    for obj in session.dirty:
+        name = _WATCHED.get(type(obj))
+        if name and session.is_modified(obj, include_collections=False):
+            names.add(name)
+    return names
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_after_flush(session: Session, flush_context) -> None:
+    # after_flush 里 new / dirty / deleted 仍是 flush 前的状态
+    names = _changed_counters(session)
+    if names:
+        _bump(session, names)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _bump_on_bulk(orm_execute_state) -> None:
+    # query(...).update() / .delete() 不经过 flush，单独兜底
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        name = _WATCHED.get(mapper.class_) if mapper is not None else None
+        if name:
+            _bump(orm_execute_state.session, {name})
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _reset_bumped(session: Session) -> None:
+    session.info.pop("site_counters_bumped", None)
+    session.info.pop("site_counters_values", None)
@@ -0,0 +1,110 @@
+"""测试公共夹具：用临时 SQLite 文件代替 SQL Server，每个用例前重建表。"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+
+_DB_DIR = tempfile.mkdtemp(prefix="qkl-tests-")
+os.environ["SQLALCHEMY_DATABASE_URL"] = f"sqlite:///{_DB_DIR}/test.db"
+os.environ.setdefault("EMAIL_SENDER", "test@example.com")
+os.environ.setdefault("EMAIL_PASSWORD", "test")
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app.database import SessionLocal, engine  # noqa: E402
+from app.models import Base, User, UserRole  # noqa: E402
+from app.utils import (  # noqa: E402
+    article_counts,
+    article_tags,
+    article_views,
+    card_catalog,
+    guide_search,
+)
+from app.utils.security import create_access_token  # noqa: E402
+
+
+def _reset_process_caches():
+    card_catalog._catalog = None
+    guide_search._index = None
+    article_tags._index = None
+    article_counts._cache.clear()
+    article_counts._cache_version = None
+    article_views._pending.clear()
+    article_views._retries.clear()
+
+
+@pytest.fixture(autouse=True)
+def _fresh_database():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    _reset_process_caches()
+    yield
+    _reset_process_caches()
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client():
+    import app.main
+
+    # 不进入 with：不跑启动事件（预热索引、浏览数后台线程）
+    return TestClient(app.main.app)
+
+
+@pytest.fixture
+def make_user(db):
+    def _make(username: str, role: UserRole = UserRole.USER, nickname=None) -> User:
+        user = User(
+            username=username,
+            password_hash="x",
+            nickname=nickname or username,
+            email=f"{username}@example.com",
+            role=role,
+        )
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        return user
+
+    return _make
+
+
+@pytest.fixture
+def auth_headers():
+    def _headers(user: User) -> dict:
+        token = create_access_token(
+            user_id=user.id, username=user.username, role=user.role
+        )
+        return {"Authorization": f"Bearer {token}"}
+
+    return _headers
+
+
+@pytest.fixture
+def count_queries():
+    """with count_queries() as statements: ... 记下这段时间发出的 SQL。"""
+
+    @contextmanager
+    def _count():
+        statements: list[str] = []
+
+        def _record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", _record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", _record)
+
+    return _count
@@ -0,0 +1,64 @@
+from sqlalchemy import insert, select
+
+from app.models import Article, ArticleStatus, SiteCounter
+from app.utils.article_counts import PUBLISHED_ARTICLES, published_article_count
+
+
+def _stored(db):
+    return db.execute(
+        select(SiteCounter.value).where(SiteCounter.name == PUBLISHED_ARTICLES)
+    ).scalar()
+
+
+def _article(author, status=ArticleStatus.PUBLISHED):
+    return Article(title="t", content="", author_id=author.id, status=status)
+
+
+def test_read_path_counts_without_writing(db, make_user):
+    author = make_user("author")
+    db.add_all([_article(author), _article(author, ArticleStatus.DRAFT)])
+    db.commit()
+
+    assert published_article_count(db) == 1
+    assert _stored(db) is None
+
+
+def test_writers_maintain_seeded_counter(db, make_user):
+    author = make_user("author")
+    # 迁移写入的初始值
+    db.execute(insert(SiteCounter.__table__).values(name=PUBLISHED_ARTICLES, value=0))
+    db.commit()
+
+    a, b = _article(author), _article(author)
+    db.add_all([a, b, _article(author, ArticleStatus.DRAFT)])
+    db.commit()
+    assert _stored(db) == 2
+
+    a.status = ArticleStatus.DELETED
+    db.commit()
+    assert _stored(db) == 1
+
+    # 旧值没加载过：算不出增量，在写入事务里重新 COUNT
+    db.expire(b, ["status"])
+    b.status = ArticleStatus.DRAFT
+    db.commit()
+    assert _stored(db) == 0
+
+    db.query(Article).filter(Article.status == ArticleStatus.DRAFT).update(
+        {Article.status: ArticleStatus.PUBLISHED}, synchronize_session=False
+    )
+    db.commit()
+    assert _stored(db) == published_article_count(db) == 2
+
+
+def test_category_filter_and_cached_total_agree(client, db, make_user):
+    author = make_user("author")
+    article = _article(author)
+    article.category = "竞技场"
+    db.add_all([article, _article(author)])
+    db.commit()
+
+    for category in ("竞技场", " 竞技场 ", "竞技场"):
+        body = client.get("/api/articles/paged", params={"category": category}).json()
+        assert body["total"] == 1
+        assert [item["id"] for item in body["items"]] == [article.id]
@@ -0,0 +1,65 @@
+"""列表接口的查询数不随文章数增长（没有逐行懒加载）。"""
+
+import pytest
+
+from app.models import Article, ArticleStatus, ArticleTag, UserRole
+
+
+def _seed(db, authors, n):
+    for i in range(n):
+        article = Article(
+            title=f"攻略 {i}",
+            content=f"<p>第 {i} 篇</p>",
+            author_id=authors[i % len(authors)].id,
+            status=ArticleStatus.PUBLISHED,
+            category="竞技场",
+            is_featured=i % 2 == 0,
+        )
+        db.add(article)
+        db.flush()
+        db.add_all(
+            [
+                ArticleTag(article_id=article.id, tag_name="mage"),
+                ArticleTag(article_id=article.id, tag_name=f"t{i}"),
+            ]
+        )
+    db.commit()
+
+
+@pytest.mark.parametrize(
+    "url, params",
+    [
+        ("/api/articles", {"page_size": 50}),
+        ("/api/articles", {"page_size": 50, "featured": 1}),
+        ("/api/articles/paged", {"page_size": 50}),
+        ("/api/articles/paged", {"page_size": 50, "category": "竞技场"}),
+        ("/api/articles/paged", {"page_size": 50, "tag": "mage"}),
+        ("/api/articles/paged", {"page_size": 50, "tag": "mage", "sort": "popular"}),
+        ("/api/articles/paged", {"page_size": 50, "sort": "popular"}),
+        ("/api/articles/paged", {"page_size": 50, "search": "攻略"}),
+        ("/api/admin/articles", {}),
+    ],
+)
+def test_list_query_count_is_constant(
+    client, db, make_user, auth_headers, count_queries, url, params
+):
+    admin = make_user("admin", UserRole.ADMIN)
+    authors = [admin] + [make_user(f"author{i}") for i in range(3)]
+    headers = auth_headers(admin)
+
+    def measure(expected_items):
+        # 先请求一次让进程内索引 / 总数缓存就位，再数第二次的查询
+        assert client.get(url, params=params, headers=headers).status_code == 200
+        with count_queries() as statements:
+            resp = client.get(url, params=params, headers=headers)
+        assert resp.status_code == 200, resp.text
+        body = resp.json()
+        items = body["items"] if isinstance(body, dict) else body
+        assert len(items) >= expected_items
+        return len(statements)
+
+    _seed(db, authors, 3)
+    small = measure(1)
+    _seed(db, authors, 30)
+    large = measure(15)
+    assert 0 < large == small
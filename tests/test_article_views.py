@@ -0,0 +1,53 @@
+import pytest
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.database import engine
+from app.models import Article, ArticleStatus, ArticleView
+from app.utils import article_views
+from app.utils.article_views import MAX_RETRIES, flush_views, record_view
+
+
+@pytest.fixture
+def fk_session():
+    # sqlite 默认不检查外键：在这条连接上打开，模拟 SQL Server 的外键约束
+    conn = engine.connect()
+    conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+    session = Session(bind=conn)
+    try:
+        yield session
+    finally:
+        session.close()
+        conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+        conn.close()
+
+
+def test_deleted_article_does_not_block_other_views(db, fk_session, make_user):
+    author = make_user("author")
+    article = Article(
+        title="t", content="", author_id=author.id, status=ArticleStatus.PUBLISHED
+    )
+    db.add(article)
+    db.commit()
+
+    record_view(article.id)
+    record_view(article.id)
+    record_view(999999)  # 写入前已被物理删除
+
+    assert flush_views(fk_session) == 1
+    assert article_views._pending == {}
+    assert db.get(ArticleView, article.id).view_count == 2
+
+
+def test_transient_failures_are_retried_then_dropped(db, monkeypatch):
+    def _fail(db, deltas):
+        raise OperationalError("UPDATE article_views", {}, Exception("timeout"))
+
+    monkeypatch.setattr(article_views, "_write", _fail)
+    record_view(1)
+    for _ in range(MAX_RETRIES):
+        assert flush_views(db) == 0
+        assert article_views._pending == {1: 1}
+    assert flush_views(db) == 0
+    assert article_views._pending == {}
+    assert article_views._retries == {}
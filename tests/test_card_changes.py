@@ -0,0 +1,56 @@
+from app.models import Card
+
+
+def _cards(db, n, prefix):
+    rows = [
+        Card(
+            name=f"{prefix}{i}",
+            expansion="基础",
+            mana_cost=i,
+            card_class="法师",
+            rarity="普通",
+        )
+        for i in range(n)
+    ]
+    # 同一个事务写入：共用一个变更序号
+    db.add_all(rows)
+    db.commit()
+    return rows
+
+
+def _sync(client, since=0, after_id=None, limit=5):
+    seen, pages = [], 0
+    while True:
+        params = {"since": since, "limit": limit}
+        if after_id is not None:
+            params["after_id"] = after_id
+        body = client.get("/api/cards/changes", params=params).json()
+        pages += 1
+        assert len(body["upserted"]) <= limit
+        seen.extend(c["id"] for c in body["upserted"])
+        since, after_id = body["seq"], body["after_id"]
+        if not body["has_more"]:
+            return seen, since, pages
+
+
+def test_one_sequence_group_larger_than_limit_is_paged(client, db):
+    first = _cards(db, 12, "老卡")
+    seen, seq, pages = _sync(client)
+    assert seen == [c.id for c in first]
+    assert pages == 3
+
+    second = _cards(db, 3, "新卡")
+    first[0].mana_cost = 9
+    db.commit()
+    seen, _, _ = _sync(client, since=seq)
+    assert sorted(seen) == sorted([c.id for c in second] + [first[0].id])
+
+
+def test_deleted_cards_reported_once(client, db):
+    cards = _cards(db, 7, "卡")
+    _, seq, _ = _sync(client)
+    db.delete(cards[2])
+    db.commit()
+    body = client.get("/api/cards/changes", params={"since": seq}).json()
+    assert body["deleted"] == [cards[2].id]
+    assert body["upserted"] == []
@@ -0,0 +1,79 @@
+import base64
+import json
+
+import pytest
+
+from app.models import Card
+
+
+def _cursor(data: dict) -> str:
+    raw = json.dumps(data).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+@pytest.fixture
+def cards(db):
+    rows = [
+        Card(
+            name=f"卡牌{i}",
+            expansion="基础",
+            mana_cost=i,
+            card_class="法师" if i % 2 else "猎人",
+            rarity="普通",
+            arena_score=50 + i if i % 3 else None,
+        )
+        for i in range(6)
+    ]
+    db.add_all(rows)
+    db.commit()
+    return rows
+
+
+@pytest.mark.parametrize("sort_by", ["class", "win", "mana", "score", "weighted"])
+def test_next_cursor_round_trips(client, cards, sort_by):
+    params = {"sort_by": sort_by, "page_size": 4}
+    first = client.get("/api/cards", params=params)
+    assert first.status_code == 200
+    cursor = first.headers["x-next-cursor"]
+
+    second = client.get("/api/cards", params={**params, "cursor": cursor})
+    assert second.status_code == 200
+    ids = [c["id"] for c in first.json()] + [c["id"] for c in second.json()]
+    assert sorted(ids) == sorted(c.id for c in cards)
+
+
+@pytest.mark.parametrize(
+    "sort_by, k",
+    [
+        ("mana", []),
+        ("mana", ["3"]),
+        ("mana", [True]),
+        ("mana", [1, 2]),
+        ("mana", {"0": 1}),
+        ("class", ["法师"]),
+        ("class", [3, 1]),
+        ("class", ["法师", None]),
+        ("win", [1.5]),
+        ("score", ["high"]),
+        ("weighted", [None, None]),
+    ],
+)
+def test_malformed_cursor_values_are_rejected(client, cards, sort_by, k):
+    # 指向不存在的卡，逼着按排序值定位
+    cursor = _cursor({"s": sort_by, "o": "asc", "id": 999999, "k": k})
+    resp = client.get(
+        "/api/cards", params={"sort_by": sort_by, "sort_order": "asc", "cursor": cursor}
+    )
+    assert resp.status_code == 400
+
+
+@pytest.mark.parametrize(
+    "sort_by, k",
+    [("mana", [2]), ("class", ["法师", 1]), ("win", [None]), ("score", [4.5])],
+)
+def test_cursor_for_deleted_card_is_located_by_value(client, cards, sort_by, k):
+    cursor = _cursor({"s": sort_by, "o": "asc", "id": 999999, "k": k})
+    resp = client.get(
+        "/api/cards", params={"sort_by": sort_by, "sort_order": "asc", "cursor": cursor}
+    )
+    assert resp.status_code == 200
@@ -0,0 +1,87 @@
+import io
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from app.utils import card_images
+
+PIL = pytest.importorskip("PIL.Image")
+
+
+def _png(width: int, height: int) -> bytes:
+    buf = io.BytesIO()
+    PIL.new("RGB", (width, height), (200, 30, 30)).save(buf, "PNG")
+    return buf.getvalue()
+
+
+@pytest.fixture
+def static_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(card_images, "STATIC_DIR", tmp_path)
+    monkeypatch.setattr(card_images, "THUMB_DIR", tmp_path / "cards" / "thumbs")
+    monkeypatch.setattr(
+        card_images, "MANIFEST_PATH", tmp_path / "cards" / "manifest.json"
+    )
+    monkeypatch.setattr(card_images, "_manifest_mtime", None)
+    (tmp_path / "cards" / "thumbs").mkdir(parents=True)
+    return tmp_path
+
+
+@pytest.fixture
+def image_server():
+    state = {"body": _png(300, 400), "etag": '"v1"', "downloads": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.headers.get("If-None-Match") == state["etag"]:
+                self.send_response(304)
+                self.end_headers()
+                return
+            state["downloads"] += 1
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("ETag", state["etag"])
+            self.send_header("Content-Length", str(len(state["body"])))
+            self.end_headers()
+            self.wfile.write(state["body"])
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    state["url"] = f"http://127.0.0.1:{server.server_port}/card.png"
+    yield state
+    server.shutdown()
+
+
+def test_srcset_uses_actual_widths(static_dir, image_server):
+    result = card_images._render({"id": 7, "pic": image_server["url"]})
+    assert result["status"] == "rendered"
+    entry = result["entry"]
+    card_images._write_manifest({"cards": {"7": entry}})
+
+    thumb, srcset = card_images.card_thumbs(7)
+    assert thumb == entry["jpg"]["320"]
+    # 源图只有 300px：320 / 480 两档都是原尺寸，只留一个，标实际宽度
+    assert srcset == f"{entry['webp']['160']} 160w, {entry['webp']['320']} 300w"
+
+
+def test_remote_source_is_not_downloaded_again_when_unchanged(static_dir, image_server):
+    first = card_images._render({"id": 7, "pic": image_server["url"]})
+    assert first["entry"]["remote"] == {"etag": '"v1"'}
+    assert image_server["downloads"] == 1
+
+    again = card_images._render(
+        {"id": 7, "pic": image_server["url"], "prev": first["entry"]}
+    )
+    assert again["status"] == "unchanged"
+    assert image_server["downloads"] == 1
+
+    image_server["body"], image_server["etag"] = _png(600, 800), '"v2"'
+    changed = card_images._render(
+        {"id": 7, "pic": image_server["url"], "prev": first["entry"]}
+    )
+    assert changed["status"] == "rendered"
+    assert changed["entry"]["remote"] == {"etag": '"v2"'}
+    assert image_server["downloads"] == 2
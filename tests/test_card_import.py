@@ -0,0 +1,61 @@
+import io
+
+from app.models import Card, UserRole
+from app.utils.card_import import import_card_file
+
+CSV = (
+    "﻿card_id,name,expansion,mana_cost,card_class,rarity,arena_win_rates\r\n"
+    '101,火球术,基础,4,法师,普通,"[52.1, 53.4]"\r\n'
+    '102,"奥术\r\n飞弹",基础,1,法师,普通,\r\n'
+).encode("utf-8")
+
+
+class _ReadOnlyStream:
+    """只有 read()：模拟 Python 3.10 上没有 readable() 的 SpooledTemporaryFile。"""
+
+    def __init__(self, data: bytes):
+        self._buf = io.BytesIO(data)
+
+    def read(self, size=-1):
+        return self._buf.read(size)
+
+
+def test_import_reads_streams_without_iobase_methods(db):
+    report = import_card_file(db, _ReadOnlyStream(CSV), "csv")
+    assert (report.inserted, report.failed) == (2, 0), report.errors
+    fireball = db.query(Card).filter(Card.card_id == 101).one()
+    assert fireball.arena_win_rates == [52.1, 53.4]
+    assert db.query(Card).filter(Card.card_id == 102).one().name == "奥术\r\n飞弹"
+
+
+def test_import_endpoint(client, make_user, auth_headers, db):
+    admin = make_user("admin", UserRole.ADMIN)
+    resp = client.post(
+        "/api/admin/cards/import",
+        files={"file": ("cards.csv", CSV, "text/csv")},
+        headers=auth_headers(admin),
+    )
+    assert resp.status_code == 200, resp.text
+    assert resp.json()["inserted"] == 2
+
+    lines = b'{"card_id": 101, "arena_score": 80}\n{"card_id": "x"}\n'
+    resp = client.post(
+        "/api/admin/cards/import",
+        params={"format": "jsonl"},
+        files={"file": ("cards.txt", lines, "application/octet-stream")},
+        headers=auth_headers(admin),
+    )
+    assert resp.status_code == 200, resp.text
+    body = resp.json()
+    assert (body["updated"], body["failed"]) == (1, 1)
+    assert db.query(Card.arena_score).filter(Card.card_id == 101).scalar() == 80
+
+
+def test_import_endpoint_rejects_non_utf8(client, make_user, auth_headers):
+    admin = make_user("admin", UserRole.ADMIN)
+    resp = client.post(
+        "/api/admin/cards/import",
+        files={"file": ("cards.csv", "card_id,name\n1,火球术\n".encode("gbk"))},
+        headers=auth_headers(admin),
+    )
+    assert resp.status_code == 400
@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models import Card, CardReview
+
+
+@pytest.fixture
+def card(db):
+    card = Card(
+        name="火球术", expansion="基础", mana_cost=4, card_class="法师", rarity="普通"
+    )
+    db.add(card)
+    db.commit()
+    return card
+
+
+def _review(db, card, user, version, minutes=0):
+    db.add(
+        CardReview(
+            card_id=card.id,
+            reviewer_id=user.id,
+            score=4.0,
+            content=f"{user.username} 的点评",
+            game_version=version,
+            created_at=datetime(2026, 1, 1) + timedelta(minutes=minutes),
+        )
+    )
+    db.commit()
+
+
+def _versions(client, card):
+    body = client.get(
+        f"/api/v1/cards/{card.id}/reviews", params={"latest_version_only": True}
+    ).json()
+    return sorted(r["game_version"] for r in body["reviews"])
+
+
+def test_latest_version_only_orders_numerically(client, db, card, make_user):
+    for i, version in enumerate(["29.9", "29.10", "29.10", None]):
+        _review(db, card, make_user(f"u{i}"), version, i)
+    assert _versions(client, card) == ["29.10", "29.10"]
+
+
+def test_latest_version_only_falls_back_to_names_without_keys(
+    client, db, card, make_user
+):
+    # 版本号里没有数字，排序键全是 NULL：按字符串取最大的版本
+    for i, version in enumerate(["beta", "gamma", "gamma"]):
+        _review(db, card, make_user(f"u{i}"), version, i)
+    assert _versions(client, card) == ["gamma", "gamma"]
+
+
+def test_review_list_query_count_does_not_depend_on_page_size(
+    client, db, card, make_user, count_queries
+):
+    for i in range(60):
+        _review(db, card, make_user(f"u{i}"), "29.10", i)
+
+    def measure(page_size):
+        url = f"/api/v1/cards/{card.id}/reviews"
+        params = {"page_size": page_size, "latest_version_only": True}
+        with count_queries() as statements:
+            resp = client.get(url, params=params)
+        assert resp.status_code == 200
+        assert len(resp.json()["reviews"]) == page_size
+        return len(statements)
+
+    assert 0 < measure(1) == measure(50)
@@ -0,0 +1,49 @@
+import os
+import subprocess
+import sys
+
+from app.models import Card, CardReview, CardReviewStats
+from app.utils.card_stats import rebuild_card_review_stats
+from app.utils.site_counters import CARD_CHANGES, REVIEWS, read_counters
+
+
+def test_session_listeners_registered_by_database_module():
+    # 命令行脚本只 import app.database + 自己的模块，也要带上计数器监听
+    code = (
+        "import sys, app.database; "
+        "missing = [m for m in ('app.utils.site_counters', 'app.utils.card_changes', "
+        "'app.utils.article_counts') if m not in sys.modules]; "
+        "sys.exit(str(missing) if missing else 0)"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        capture_output=True,
+        text=True,
+    )
+    assert proc.returncode == 0, proc.stderr
+
+
+def test_rebuild_bumps_counters_only_when_stats_change(db, make_user):
+    reviewer = make_user("alice")
+    card = Card(
+        name="火球术", expansion="基础", mana_cost=4, card_class="法师", rarity="普通"
+    )
+    db.add(card)
+    db.commit()
+    db.add(CardReview(card_id=card.id, reviewer_id=reviewer.id, score=4.0, content="好"))
+    db.commit()
+    # 模拟聚合行被手工删掉
+    db.query(CardReviewStats).delete()
+    db.commit()
+
+    before = read_counters(db, REVIEWS, CARD_CHANGES)
+    assert rebuild_card_review_stats(db) == 1
+    after = read_counters(db, REVIEWS, CARD_CHANGES)
+    assert after[0] > before[0]
+    assert after[1] > before[1]
+    assert db.get(CardReviewStats, card.id).review_count == 1
+
+    # 再跑一次什么都没变：版本号不动，缓存 / ETag 不失效
+    assert rebuild_card_review_stats(db) == 1
+    assert read_counters(db, REVIEWS, CARD_CHANGES) == after
@@ -0,0 +1,33 @@
+from app.models import Article, ArticleStatus
+from app.utils.guide_search import get_guide_index, tokenize
+
+
+def _publish(db, author, title, content):
+    article = Article(
+        title=title,
+        content=content,
+        author_id=author.id,
+        status=ArticleStatus.PUBLISHED,
+    )
+    db.add(article)
+    db.commit()
+    return article
+
+
+def test_tokenize_splits_cjk_into_bigrams():
+    assert tokenize("法师 Tempo") == ["法师", "tempo"]
+    assert tokenize("火球术") == ["火球", "球术"]
+    assert tokenize("法") == ["法"]
+
+
+def test_single_character_query_matches(db, make_user):
+    author = make_user("writer")
+    mage = _publish(db, author, "竞技场法师攻略", "<p>前期多拿<b>火球术</b></p>")
+    _publish(db, author, "猎人开局", "<p>低费随从优先</p>")
+
+    index = get_guide_index(db)
+    assert index.search("法") == [mage.id]
+    assert index.search("球") == [mage.id]
+    assert index.search("法师") == [mage.id]
+    assert index.search("鱼") == []
+    assert "<mark>球</mark>" in index.snippet(mage.id, "球")
@@ -0,0 +1,110 @@
+import threading
+
+from sqlalchemy import event, func
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.sql import Insert, Select, Update
+
+from app.database import SessionLocal, engine
+from app.models import Card, CardReview, CardReviewStats
+from app.utils.review_writes import (
+    _MERGE,
+    MAX_REVIEWERS,
+    ReviewQuotaFull,
+    upsert_card_review,
+)
+
+
+def _card(db):
+    card = Card(
+        name="火球术", expansion="基础", mana_cost=4, card_class="法师", rarity="普通"
+    )
+    db.add(card)
+    db.commit()
+    return card
+
+
+def test_quota_holds_under_concurrent_submissions(db, make_user):
+    # 端到端：数据库文件 + 每个线程一个连接（sqlite 上排队靠它的写锁，
+    # 行锁语义见下面两个用例）
+    card = _card(db)
+    users = [make_user(f"u{i}") for i in range(MAX_REVIEWERS * 3)]
+
+    barrier = threading.Barrier(len(users))
+    results: list = []
+    lock = threading.Lock()
+
+    def submit(user_id: int) -> None:
+        session = SessionLocal()
+        try:
+            barrier.wait()
+            try:
+                upsert_card_review(session, card.id, user_id, 4.0, "好", None)
+                session.commit()
+                outcome = "ok"
+            except ReviewQuotaFull:
+                session.rollback()
+                outcome = "full"
+        except Exception as exc:  # 记下来在主线程里断言
+            session.rollback()
+            outcome = exc
+        finally:
+            session.close()
+        with lock:
+            results.append(outcome)
+
+    threads = [threading.Thread(target=submit, args=(u.id,)) for u in users]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert [r for r in results if r not in ("ok", "full")] == []
+    taken = (
+        db.query(func.count(CardReview.id))
+        .filter(CardReview.card_id == card.id)
+        .scalar()
+    )
+    assert taken <= MAX_REVIEWERS
+    assert results.count("ok") == taken == MAX_REVIEWERS
+    assert db.get(CardReviewStats, card.id).review_count == MAX_REVIEWERS
+
+
+def test_generic_path_locks_card_row_before_counting(db, make_user):
+    card = _card(db)
+    user = make_user("alice")
+    statements = []
+
+    def _record(conn, clauseelement, multiparams, params, execution_options):
+        statements.append(clauseelement)
+
+    event.listen(engine, "before_execute", _record)
+    try:
+        upsert_card_review(db, card.id, user.id, 4.0, "好", None)
+    finally:
+        event.remove(engine, "before_execute", _record)
+    db.commit()
+
+    writes = [
+        i
+        for i, stmt in enumerate(statements)
+        if isinstance(stmt, (Insert, Update)) and stmt.table.name == "card_reviews"
+    ]
+    locks = [
+        i
+        for i, stmt in enumerate(statements)
+        if isinstance(stmt, Select) and stmt._for_update_arg is not None
+    ]
+    # 数名额的 INSERT ... SELECT 之前先拿到卡牌行锁，同一张卡的提交排队
+    assert locks and writes and locks[0] < writes[0]
+    lock = statements[locks[0]]
+    assert [t.name for t in lock.get_final_froms()] == ["cards"]
+    assert "FOR UPDATE" in str(lock.compile(dialect=postgresql.dialect()))
+
+
+def test_mssql_merge_counts_quota_under_range_lock():
+    sql = " ".join(_MERGE.text.split())
+    # 名额在 MERGE 的 USING 里用 UPDLOCK + HOLDLOCK 数：并发的新增在这里排队，
+    # 数完到插入之间别人插不进这张卡的点评范围
+    assert "FROM card_reviews WITH (UPDLOCK, HOLDLOCK) WHERE card_id = :card_id" in sql
+    assert "s.taken < :quota" in sql
+    assert sql.index("UPDLOCK") < sql.index("INSERT")
@@ -0,0 +1,36 @@
+from app.models import Card
+from app.utils.card_catalog import catalog_version
+from app.utils.site_counters import REVIEWERS, read_counters
+
+
+def test_user_write_bumps_reviewers_but_not_catalog_version(db, make_user):
+    user = make_user("bob")
+    before_catalog = catalog_version(db)
+    before_reviewers = read_counters(db, REVIEWERS)[0]
+
+    user.nickname = "鲍勃"
+    db.commit()
+
+    assert catalog_version(db) == before_catalog
+    assert read_counters(db, REVIEWERS)[0] == before_reviewers + 1
+
+
+def test_review_list_etag_follows_reviewer_changes(client, db, make_user):
+    card = Card(
+        name="奥术飞弹", expansion="基础", mana_cost=1, card_class="法师", rarity="普通"
+    )
+    db.add(card)
+    db.commit()
+    user = make_user("carol")
+
+    list_etag = client.get(f"/api/v1/cards/{card.id}/reviews").headers["etag"]
+    catalog_etag = client.get("/api/cards").headers["etag"]
+    before_catalog = catalog_version(db)
+
+    user.nickname = "卡罗尔"
+    db.commit()
+
+    assert client.get(f"/api/v1/cards/{card.id}/reviews").headers["etag"] != list_etag
+    # 卡牌列表里老卡的 reviewer_nickname 读的是 users 表：ETag 要变，目录索引不用重建
+    assert client.get("/api/cards").headers["etag"] != catalog_etag
+    assert catalog_version(db) == before_catalog